@@ -1,7 +1,11 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import Optional
 from gtts import gTTS
-from langdetect import detect, LangDetectException
+from fast_langid import detect_language as identify_language
+from audio_codec import audio_options_error, encode_tts_audio
 from googletrans import Translator
 import os
 from io import BytesIO
@@ -22,6 +26,9 @@ DEFAULT_LANGUAGE = 'en'
 
 class TTSRequest(BaseModel):
     text: str
+    format: str = "mp3"  # "mp3" or "opus"
+    bitrate: Optional[int] = None  # Opus bitrate in kbit/s
+    raw: bool = False  # Return the audio bytes instead of base64 in JSON
 
 def translate_text(text, target_language=DEFAULT_LANGUAGE):
     translator = Translator()
@@ -34,9 +41,7 @@ def translate_text(text, target_language=DEFAULT_LANGUAGE):
 
 def detect_language(text):
     try:
-        return detect(text)
-    except LangDetectException:
-        return DEFAULT_LANGUAGE
+        return identify_language(text, default=DEFAULT_LANGUAGE)
     except Exception as e:
         print(f"Language detection error: {e}")
         return DEFAULT_LANGUAGE
@@ -52,8 +57,23 @@ def text_to_speech(text, lang=DEFAULT_LANGUAGE):
         print(f"TTS error: {e}")
         raise HTTPException(status_code=500, detail="TTS generation failed")
 
+async def audio_response(audio_data, request: TTSRequest):
+    """Encode the gTTS MP3 in the requested format, as base64 JSON or raw bytes"""
+    try:
+        # The Opus transcode runs ffmpeg; keep it off the event loop
+        audio_data, mime_type = await run_in_threadpool(encode_tts_audio, audio_data, request.format, request.bitrate)
+    except Exception as e:
+        print(f"Audio encoding error: {e}")
+        raise HTTPException(status_code=500, detail="Audio encoding failed")
+    if request.raw:
+        return Response(content=audio_data, media_type=mime_type)
+    return {"audio": base64.b64encode(audio_data).decode('utf-8'), "format": request.format, "mime_type": mime_type}
+
 @app.post("/tts")
 async def generate_tts(request: TTSRequest):
+    options_error = audio_options_error(request.format, request.bitrate)
+    if options_error:
+        raise HTTPException(status_code=400, detail=options_error)
     text_to_speak = request.text
     detected_language = detect_language(text_to_speak)
 
@@ -62,13 +82,13 @@ async def generate_tts(request: TTSRequest):
         translated_text = translate_text(text_to_speak)
         if translated_text:
             audio_data = text_to_speech(translated_text, DEFAULT_LANGUAGE)
-            return {"audio": base64.b64encode(audio_data).decode('utf-8')}
+            return await audio_response(audio_data, request)
         else:
             raise HTTPException(status_code=500, detail="Translation failed")
     else:
         print(f"Text is in default language ({DEFAULT_LANGUAGE})")
         audio_data = text_to_speech(text_to_speak, DEFAULT_LANGUAGE)
-        return {"audio": base64.b64encode(audio_data).decode('utf-8')}
+        return await audio_response(audio_data, request)
 
 if __name__ == "__main__":
     import uvicorn
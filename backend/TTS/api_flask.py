@@ -1,6 +1,7 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from gtts import gTTS
-from langdetect import detect, LangDetectException
+from fast_langid import detect_language as identify_language
+from audio_codec import audio_options_error, encode_tts_audio
 from googletrans import Translator
 import os
 import base64
@@ -22,9 +23,7 @@ def translate_text(text, target_language=DEFAULT_LANGUAGE):
 
 def detect_language(text):
     try:
-        return detect(text)
-    except LangDetectException:
-        return DEFAULT_LANGUAGE
+        return identify_language(text, default=DEFAULT_LANGUAGE)
     except Exception as e:
         print(f"Language detection error: {e}")
         return DEFAULT_LANGUAGE
@@ -40,11 +39,26 @@ def text_to_speech(text, lang=DEFAULT_LANGUAGE):
         print(f"TTS error: {e}")
         return None
 
+def audio_response(audio_data, data):
+    """Encode the gTTS MP3 in the requested format, as base64 JSON or raw bytes"""
+    output_format = data.get('format', 'mp3')
+    try:
+        audio_data, mime_type = encode_tts_audio(audio_data, output_format, data.get('bitrate'))
+    except Exception as e:
+        print(f"Audio encoding error: {e}")
+        return jsonify({'error': 'Audio encoding failed'}), 500
+    if data.get('raw'):
+        return Response(audio_data, mimetype=mime_type), 200
+    return jsonify({'audio': base64.b64encode(audio_data).decode('utf-8'), 'format': output_format, 'mime_type': mime_type}), 200
+
 @app.route('/tts', methods=['POST'])
 def tts_endpoint():
     data = request.get_json()
     if not data or 'text' not in data:
         return jsonify({'error': 'Missing "text" in request'}), 400
+    options_error = audio_options_error(data.get('format', 'mp3'), data.get('bitrate'))
+    if options_error:
+        return jsonify({'error': options_error}), 400
 
     text_to_speak = data['text']
     detected_language = detect_language(text_to_speak)
@@ -55,7 +69,7 @@ def tts_endpoint():
         if translated_text:
             audio_data = text_to_speech(translated_text, DEFAULT_LANGUAGE)
             if audio_data:
-                return jsonify({'audio': base64.b64encode(audio_data).decode('utf-8')}), 200
+                return audio_response(audio_data, data)
             else:
                 return jsonify({'error': 'TTS failed after translation'}), 500
         else:
@@ -64,7 +78,7 @@ def tts_endpoint():
         print(f"Text is in default language ({DEFAULT_LANGUAGE})")
         audio_data = text_to_speech(text_to_speak, DEFAULT_LANGUAGE)
         if audio_data:
-            return jsonify({'audio': base64.b64encode(audio_data).decode('utf-8')}), 200
+            return audio_response(audio_data, data)
         else:
             return jsonify({'error': 'TTS failed'}), 500
 
@@ -0,0 +1,55 @@
+# Output codecs for TTS replies
+# gTTS produces MP3; for drivers on slow links we can re-encode to Opus in Ogg,
+# which stays intelligible for speech at 16-24 kbit/s.
+import subprocess
+from typing import Optional
+
+OUTPUT_FORMATS = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg; codecs=opus",
+}
+DEFAULT_OPUS_BITRATE_KBPS = 24
+OPUS_BITRATE_RANGE_KBPS = (6, 64)
+
+
+def audio_options_error(output_format, bitrate_kbps) -> Optional[str]:
+    """Why a request's format/bitrate cannot be served, or None; checked before any TTS work"""
+    if output_format not in OUTPUT_FORMATS:
+        return f"Unsupported format {output_format!r}; use one of: {', '.join(OUTPUT_FORMATS)}"
+    if bitrate_kbps is not None and (isinstance(bitrate_kbps, bool) or not isinstance(bitrate_kbps, int)):
+        return "bitrate must be an integer (kbit/s)"
+    return None
+
+
+def clamp_bitrate(bitrate_kbps) -> int:
+    low, high = OPUS_BITRATE_RANGE_KBPS
+    return max(low, min(high, int(bitrate_kbps or DEFAULT_OPUS_BITRATE_KBPS)))
+
+
+def mp3_to_opus(mp3_bytes: bytes, bitrate_kbps: int = DEFAULT_OPUS_BITRATE_KBPS) -> bytes:
+    """Transcode an MP3 to mono Ogg Opus tuned for speech (libopus, VoIP mode)"""
+    result = subprocess.run([
+        'ffmpeg',
+        '-nostdin',
+        '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-ac', '1',
+        '-c:a', 'libopus',
+        '-b:a', f'{clamp_bitrate(bitrate_kbps)}k',
+        '-application', 'voip',
+        '-f', 'ogg',
+        'pipe:1'
+    ], input=mp3_bytes, capture_output=True)
+
+    if result.returncode != 0:
+        raise Exception(f"FFmpeg Opus encoding failed: {result.stderr.decode(errors='replace')}")
+    return result.stdout
+
+
+def encode_tts_audio(mp3_bytes: bytes, output_format: str = "mp3", bitrate_kbps=None):
+    """Return (audio bytes, mime type) in the requested format (see audio_options_error)"""
+    if output_format == "opus":
+        return mp3_to_opus(mp3_bytes, bitrate_kbps), OUTPUT_FORMATS["opus"]
+    if output_format == "mp3":
+        return mp3_bytes, OUTPUT_FORMATS["mp3"]
+    raise ValueError(f"Unsupported output format: {output_format!r}")
@@ -1,11 +1,11 @@
 # langdetect_with_fallback.py
-from langdetect import detect
+from fast_langid import detect_language
 
 DEFAULT_LANGUAGE = 'en'  # Set English as the default language
 
 def detect_and_fallback(text, default_lang=DEFAULT_LANGUAGE):
     try:
-        detected_lang = detect(text)
+        detected_lang = detect_language(text, default=default_lang)
         if detected_lang == default_lang:
             return detected_lang
         else:
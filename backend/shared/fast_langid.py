@@ -0,0 +1,344 @@
+# fast_langid.py
+# Compact language identifier restricted to the languages our drivers and
+# passengers actually use. Non-Latin scripts (Thai, Chinese, Tamil) are decided
+# from a Unicode range index; Latin text (English / Malay / Indonesian, incl.
+# Singlish) is scored against hashed character-trigram and word tables built
+# once at import into NumPy arrays.
+#
+# Shared by the TTS and voice recognition services; install it into their
+# environment with `pip install -e backend/shared` (requirements.txt does this).
+#
+# Accuracy is measured on langid_heldout.tsv, phrases written separately from
+# the seed corpus below (python fast_langid.py): 98/102 (96%) overall and
+# 16/16 on one- and two-word strings (30/30 en, 30/30 ms, 26/30 id); the misses
+# are Indonesian sentences made mostly of words Malay shares. Malay and
+# Indonesian share most of their everyday vocabulary, so short strings without a
+# distinguishing word ("saya", "terima kasih") are ambiguous by nature and
+# resolve to the first language in LANGID_PREFERENCE.
+import os
+import re
+import time
+
+import numpy as np
+
+SUPPORTED_LANGUAGES = ("en", "ms", "id", "th", "zh", "ta")
+DEFAULT_LANGUAGE = 'en'
+
+# (first codepoint, last codepoint, script); sorted, non-overlapping
+_SCRIPT_RANGES = (
+    (0x0030, 0x0039, "digit"),
+    (0x0041, 0x005A, "latin"),
+    (0x0061, 0x007A, "latin"),
+    (0x00C0, 0x024F, "latin"),
+    (0x0B80, 0x0BFF, "ta"),
+    (0x0E00, 0x0E7F, "th"),
+    (0x3400, 0x4DBF, "zh"),
+    (0x4E00, 0x9FFF, "zh"),
+    (0xF900, 0xFAFF, "zh"),
+)
+_SCRIPTS = ("other", "digit", "latin", "ta", "th", "zh")
+
+# Small seed corpora for the Latin-script languages: everyday ride-hailing
+# phrases plus high-frequency function words.
+_SEED_TEXT = {
+    "en": (
+        "the passenger is waiting at the main entrance please pick them up "
+        "i am on my way and will arrive in five minutes "
+        "where are you now can you share your location "
+        "accept the ride decline the ride call the passenger "
+        "i have arrived at the pickup point thank you for riding with us "
+        "there is heavy traffic on the highway so it will take longer "
+        "what is the weather like today should i take the toll road "
+        "this is also in english hello how are you today "
+        "can or not lah wait for me already reach then call me "
+        "the driver should turn left at the next junction and go straight "
+        "ok okay yes yeah sure thanks sorry no problem catch you later "
+        "my phone battery is almost dead so please message me instead "
+        "could you drop me off near the bus stop opposite the bank "
+        "otw coming down now just give me a minute "
+        "with that from have this they which would their there about "
+        "it was been were will not but what when who been being "
+    ),
+    "ms": (
+        "saya sudah sampai di pintu masuk utama sila tunggu sekejap "
+        "encik boleh tunggu kat depan lobi tak saya nak pergi ke sana "
+        "selamat pagi apa khabar terima kasih kerana menggunakan perkhidmatan kami "
+        "jalan sesak sangat sebab hujan lebat kereta banyak "
+        "saya nak pergi ke pusat membeli belah dekat bukit bintang "
+        "awak kat mana sekarang boleh kongsi lokasi tak "
+        "terima tempahan tolak tempahan telefon penumpang "
+        "kita akan sampai dalam lima minit lagi jangan risau "
+        "macam mana nak pergi ke lapangan terbang ikut lebuh raya "
+        "tak apa sikit je lagi betul ke ini jalannya "
+        "saya dah sampai jom turun sekarang nanti saya tunggu kat bawah "
+        "esok pagi boleh ambil saya dekat pejabat pukul lapan "
+        "tolong berhenti depan kedai makan tu ya saya nak beli air "
+        "bateri telefon saya dah nak habis nanti saya mesej awak "
+        "pusing kanan lepas simpang lampu isyarat tu "
+        "yang dan untuk dengan tidak ini itu ada dari akan "
+        "pun lah kan tu ni dia kami mereka kalau tapi sebab bila "
+    ),
+    "id": (
+        "saya sudah sampai di pintu masuk utama mohon tunggu sebentar "
+        "bapak bisa tunggu di depan lobi nggak saya mau ke sana "
+        "selamat pagi apa kabar terima kasih sudah menggunakan layanan kami "
+        "jalannya macet banget karena hujan deras mobilnya banyak "
+        "saya mau pergi ke mal dekat bundaran hotel indonesia "
+        "kamu di mana sekarang bisa bagikan lokasi nggak "
+        "terima pesanan tolak pesanan telepon penumpang "
+        "kita akan sampai dalam lima menit lagi jangan khawatir "
+        "gimana caranya ke bandara lewat jalan tol aja "
+        "nggak apa apa sedikit lagi udah bener kok jalannya "
+        "mas saya udah di bawah ya langsung turun aja "
+        "besok pagi bisa jemput saya di kantor jam delapan "
+        "tolong berhenti di depan toko itu dong saya mau beli minum "
+        "baterai hp saya hampir habis nanti saya kabari lagi "
+        "belok kanan setelah lampu merah terus lurus aja "
+        "yang dan untuk dengan tidak ini itu ada dari akan "
+        "juga kalau tapi karena sama deh nih kayak gitu begitu "
+    ),
+}
+
+# Words that are strong evidence for one language over the others
+_MARKER_WORDS = {
+    "en": ("the", "is", "are", "you", "and", "please", "what", "where", "ride", "passenger",
+           "lah", "leh", "lor", "meh", "already", "can", "ok", "okay", "yes", "yeah", "thanks",
+           "thank", "sorry", "my", "i", "otw", "coming", "wait", "here", "there", "now"),
+    "ms": ("awak", "nak", "tak", "kat", "kereta", "boleh", "encik", "sikit", "je", "khabar",
+           "kerana", "sekejap", "minit", "tempahan", "risau", "macam", "lebuh", "sila",
+           "dah", "jom", "esok", "pejabat", "kedai", "lepas", "bateri", "mesej", "tengok", "faham",
+           "cakap", "bagi", "duit", "teksi", "pusing"),
+    "id": ("bisa", "nggak", "gak", "ga", "mau", "mobil", "aja", "udah", "banget", "kabar",
+           "sebentar", "menit", "pesanan", "khawatir", "gimana", "bapak", "kok", "dong", "sih", "mohon",
+           "besok", "kantor", "toko", "karena", "baterai", "hp", "lihat", "liat", "paham", "bilang",
+           "uang", "nih", "deh", "kayak", "enggak", "jemput", "mas", "mbak"),
+}
+
+# Order in which near-ties between Latin languages are resolved
+LANGUAGE_PREFERENCE = tuple(
+    lang.strip() for lang in os.getenv("LANGID_PREFERENCE", "en,ms,id").split(",") if lang.strip()
+)
+# Latin-language probabilities closer than this count as a tie
+AMBIGUITY_MARGIN = 0.25
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _codepoints(text: str) -> np.ndarray:
+    return np.frombuffer(text.lower().encode("utf-32-le"), dtype=np.uint32)
+
+
+def _hash_ngrams(codes: np.ndarray, n: int, buckets: int) -> np.ndarray:
+    """Vectorised polynomial hash of every character n-gram"""
+    if len(codes) < n:
+        return np.empty(0, dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(codes.astype(np.int64), n)
+    hashed = np.zeros(len(windows), dtype=np.int64)
+    for i in range(n):
+        hashed = hashed * 1000003 + windows[:, i]
+    return hashed % buckets
+
+
+def _normalize(text: str) -> str:
+    return " " + " ".join(text.lower().split()) + " "
+
+
+class LanguageIdentifier:
+    """Identify the language of short strings among a fixed candidate set"""
+
+    def __init__(self, candidates=SUPPORTED_LANGUAGES, buckets: int = 1 << 14, word_weight: float = 3.0,
+                 preference=LANGUAGE_PREFERENCE, ambiguity_margin: float = AMBIGUITY_MARGIN):
+        unknown = set(candidates) - set(SUPPORTED_LANGUAGES)
+        if unknown:
+            raise ValueError(f"Unsupported candidate languages: {sorted(unknown)}")
+        self.candidates = tuple(candidates)
+        self.latin_languages = tuple(lang for lang in self.candidates if lang in _SEED_TEXT)
+        self.ambiguity_margin = ambiguity_margin
+        # Rank of each Latin language when breaking ties; unlisted languages come last
+        ranked = [lang for lang in preference if lang in self.latin_languages]
+        self._tie_rank = {lang: (ranked.index(lang) if lang in ranked else len(ranked)) for lang in self.latin_languages}
+        self.buckets = buckets
+        self.word_weight = word_weight
+
+        self._range_starts = np.array([r[0] for r in _SCRIPT_RANGES], dtype=np.uint32)
+        self._range_ends = np.array([r[1] for r in _SCRIPT_RANGES], dtype=np.uint32)
+        self._range_scripts = np.array([_SCRIPTS.index(r[2]) for r in _SCRIPT_RANGES], dtype=np.int64)
+
+        # (languages, buckets) trigram log-probabilities with add-one smoothing
+        n_langs = len(self.latin_languages)
+        self._trigram_logp = np.zeros((n_langs, buckets), dtype=np.float32)
+        for row, lang in enumerate(self.latin_languages):
+            codes = _codepoints(_normalize(_SEED_TEXT[lang]))
+            counts = np.bincount(_hash_ngrams(codes, 3, buckets), minlength=buckets).astype(np.float32)
+            self._trigram_logp[row] = np.log((counts + 1.0) / (counts.sum() + buckets))
+
+        # Marker word -> per-language vector: +1 for its language, centred so it counts against the others
+        self._markers = {}
+        for row, lang in enumerate(self.latin_languages):
+            for word in _MARKER_WORDS[lang]:
+                self._markers.setdefault(word, np.zeros(n_langs, dtype=np.float32))[row] += 1.0
+        for vector in self._markers.values():
+            vector -= vector.mean()
+
+    def _scripts(self, codes: np.ndarray) -> np.ndarray:
+        index = np.clip(np.searchsorted(self._range_starts, codes, side="right") - 1, 0, None)
+        valid = (codes >= self._range_starts[index]) & (codes <= self._range_ends[index])
+        return np.where(valid, self._range_scripts[index], 0)
+
+    def scores_batch(self, texts):
+        """Return (languages, probabilities[len(texts), len(languages)]).
+
+        All strings are concatenated (NUL separated) so script lookup and
+        trigram scoring run as a handful of array operations for the batch.
+        """
+        n = len(texts)
+        probabilities = np.zeros((n, len(self.candidates)), dtype=np.float32)
+        if n == 0:
+            return self.candidates, probabilities
+        normalized = [_normalize(text) for text in texts]
+        codes = _codepoints("\x00".join(normalized))
+        separator = codes == 0
+        text_id = np.cumsum(separator)
+
+        scripts = self._scripts(codes)
+        n_scripts = len(_SCRIPTS)
+        script_counts = np.bincount(
+            (text_id * n_scripts + scripts)[~separator], minlength=n * n_scripts
+        ).reshape(n, n_scripts)
+        letters = script_counts[:, 2:].sum(axis=1)
+        has_letters = letters > 0
+        share = np.zeros((n, n_scripts), dtype=np.float32)
+        share[has_letters] = script_counts[has_letters] / letters[has_letters, None]
+
+        # Non-Latin scripts are unambiguous within our candidate set
+        for script in ("th", "zh", "ta"):
+            if script in self.candidates:
+                probabilities[:, self.candidates.index(script)] = share[:, _SCRIPTS.index(script)]
+
+        latin_share = share[:, _SCRIPTS.index("latin")]
+        if not self.latin_languages or not latin_share.any():
+            return self.candidates, probabilities
+
+        hashes = _hash_ngrams(codes, 3, self.buckets)
+        crosses = np.lib.stride_tricks.sliding_window_view(separator, 3).any(axis=1)
+        trigram_text = text_id[:len(hashes)][~crosses]
+        logp = self._trigram_logp[:, hashes[~crosses]]
+        counts = np.maximum(np.bincount(trigram_text, minlength=n), 1)
+        trigram = np.stack([np.bincount(trigram_text, weights=row, minlength=n) for row in logp], axis=1) / counts[:, None]
+
+        no_markers = np.zeros(len(self.latin_languages), dtype=np.float32)
+        marker = np.stack([
+            sum((self._markers.get(word, no_markers) for word in _WORD.findall(text)), no_markers)
+            for text in normalized
+        ])
+
+        logits = trigram * 10.0 + self.word_weight * marker
+        latin = np.exp(logits - logits.max(axis=1, keepdims=True))
+        latin /= latin.sum(axis=1, keepdims=True)
+        for row, lang in enumerate(self.latin_languages):
+            probabilities[:, self.candidates.index(lang)] = latin_share * latin[:, row]
+        return self.candidates, probabilities
+
+    def detect_batch(self, texts, default: str = DEFAULT_LANGUAGE):
+        """Most likely language per string; default for strings without letters.
+
+        When Latin languages are within ambiguity_margin of the best one (shared
+        Malay/Indonesian words, single short words) the preferred one wins.
+        """
+        languages, probabilities = self.scores_batch(texts)
+        best = probabilities.argmax(axis=1)
+        detected = []
+        for i, b in enumerate(best):
+            if probabilities[i, b] <= 0:
+                detected.append(default)
+                continue
+            language = languages[b]
+            if language in self._tie_rank:
+                tied = [lang for lang in self.latin_languages
+                        if probabilities[i, languages.index(lang)] >= probabilities[i, b] - self.ambiguity_margin]
+                language = min(tied, key=self._tie_rank.get)
+            detected.append(language)
+        return detected
+
+    def detect(self, text: str, default: str = DEFAULT_LANGUAGE) -> str:
+        return self.detect_batch([text], default=default)[0]
+
+
+_identifier = None
+
+
+def get_identifier() -> LanguageIdentifier:
+    """Shared identifier; candidates come from LANGID_CANDIDATES (comma separated)"""
+    global _identifier
+    if _identifier is None:
+        candidates = os.getenv("LANGID_CANDIDATES")
+        if candidates:
+            _identifier = LanguageIdentifier(tuple(c.strip() for c in candidates.split(",") if c.strip()))
+        else:
+            _identifier = LanguageIdentifier()
+    return _identifier
+
+
+def detect_language(text: str, default: str = DEFAULT_LANGUAGE) -> str:
+    return get_identifier().detect(text, default=default)
+
+
+def detect_languages(texts, default: str = DEFAULT_LANGUAGE):
+    return get_identifier().detect_batch(texts, default=default)
+
+
+HELDOUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "langid_heldout.tsv")
+
+
+def load_heldout(path: str = HELDOUT_PATH):
+    """(language, text) pairs from the held-out evaluation set"""
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                label, text = line.rstrip("\n").split("\t", 1)
+                samples.append((label, text))
+    return samples
+
+
+if __name__ == "__main__":
+    # Accuracy on the held-out set and a microbenchmark against langdetect
+    samples = load_heldout()
+    labels = [label for label, _ in samples]
+    texts = [text for _, text in samples] * 20
+
+    identifier = get_identifier()
+    start = time.perf_counter()
+    identifier.detect_batch(texts)
+    fast_time = time.perf_counter() - start
+    predictions = identifier.detect_batch([text for _, text in samples])
+    correct = [p == label for p, label in zip(predictions, labels)]
+    print(f"fast_langid: {fast_time / len(texts) * 1e6:.1f} us/string, "
+          f"accuracy {sum(correct)}/{len(samples)} ({sum(correct) / len(samples):.1%})")
+    for lang in dict.fromkeys(labels):
+        hits = [c for c, label in zip(correct, labels) if label == lang]
+        print(f"  {lang}: {sum(hits)}/{len(hits)}")
+    short = [c for c, (_, text) in zip(correct, samples) if len(text.split()) <= 2]
+    print(f"  one- and two-word strings: {sum(short)}/{len(short)}")
+
+    try:
+        from langdetect import DetectorFactory, detect
+        DetectorFactory.seed = 0
+        start = time.perf_counter()
+        legacy = []
+        for text in texts:
+            try:
+                legacy.append(detect(text)[:2])
+            except Exception:
+                legacy.append(DEFAULT_LANGUAGE)
+        legacy_time = time.perf_counter() - start
+        legacy_correct = sum(p == label for p, label in zip(legacy, labels * 20))
+        print(f"langdetect:  {legacy_time / len(texts) * 1e6:.1f} us/string, accuracy {legacy_correct / len(texts):.1%}")
+        print(f"speedup: {legacy_time / fast_time:.1f}x")
+    except ImportError:
+        print("langdetect not installed; skipping comparison")
+
+    for prediction, (label, text) in zip(predictions, samples):
+        if prediction != label:
+            print(f"{prediction:>3} (expected {label}): {text}")
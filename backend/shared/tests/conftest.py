@@ -0,0 +1,5 @@
+# Lets the tests run from a checkout without `pip install -e backend/shared`
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
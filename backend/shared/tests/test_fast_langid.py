@@ -0,0 +1,41 @@
+import re
+
+from fast_langid import LanguageIdentifier, _SEED_TEXT, detect_language, load_heldout
+
+
+def test_heldout_phrases_are_not_in_the_seed_corpus():
+    seed = " " + " ".join(" ".join(text.split()) for text in _SEED_TEXT.values()) + " "
+    for _, text in load_heldout():
+        words = re.findall(r"[\w']+", text.lower())
+        if len(words) >= 3:  # single words are bound to overlap
+            assert f" {' '.join(words)} " not in seed, text
+
+
+def test_heldout_accuracy():
+    samples = load_heldout()
+    predictions = LanguageIdentifier().detect_batch([text for _, text in samples])
+    correct = sum(p == label for p, (label, _) in zip(predictions, samples))
+    # 98/102 when measured; see the module header
+    assert correct / len(samples) >= 0.94
+
+
+def test_short_english_is_not_indonesian():
+    for text in ("ok", "okay", "yes", "thanks", "sorry", "otw"):
+        assert detect_language(text) == "en", text
+
+
+def test_shared_malay_indonesian_words_follow_the_preference():
+    for text in ("saya", "terima kasih"):
+        assert LanguageIdentifier(preference=("ms", "id")).detect(text) == "ms"
+        assert LanguageIdentifier(preference=("id", "ms")).detect(text) == "id"
+
+
+def test_distinguishing_words_override_the_preference():
+    identifier = LanguageIdentifier(preference=("ms", "id"))
+    assert identifier.detect("saya udah sampai, nggak usah telepon") == "id"
+    assert identifier.detect("saya dah sampai, tak payah call") == "ms"
+
+
+def test_non_latin_scripts_and_empty_strings():
+    identifier = LanguageIdentifier()
+    assert identifier.detect_batch(["ขอบคุณครับ", "谢谢", "நன்றி", "123", ""]) == ["th", "zh", "ta", "en", "en"]
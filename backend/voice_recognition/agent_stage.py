@@ -0,0 +1,169 @@
+# Agent stage helpers: ride-evaluation cache, speculative follow-ups and an offline stand-in agent
+import asyncio
+import hashlib
+import json
+import os
+from typing import Optional
+
+from result_cache import AsyncLRUCache
+from segment_stream import normalize_text
+
+# Fields that differ between drivers looking at the same ride and do not change the evaluation
+RIDE_CACHE_IGNORED_FIELDS = tuple(
+    f.strip() for f in os.getenv("RIDE_CACHE_IGNORED_FIELDS", "request_id,timestamp,request_time").split(",") if f.strip()
+)
+
+# The same ride is offered to several drivers within a short window
+RIDE_EVALUATION_CACHE = AsyncLRUCache(
+    max_entries=int(os.getenv("RIDE_CACHE_MAX_ENTRIES", 512)),
+    ttl_seconds=float(os.getenv("RIDE_CACHE_TTL_SECONDS", 120.0))
+)
+
+
+def ride_cache_key(ride_details: dict) -> str:
+    """Canonical key for a ride: key order, whitespace and volatile fields do not matter"""
+    canonical = {k: v for k, v in ride_details.items() if k not in RIDE_CACHE_IGNORED_FIELDS}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def is_cacheable_evaluation(response) -> bool:
+    return bool(getattr(response, "content", "").strip())
+
+
+async def evaluate_ride_cached(agent, ride_details: dict):
+    """Evaluate a ride through the cache; returns (response, "hit"|"coalesced"|"miss")"""
+    return await RIDE_EVALUATION_CACHE.get_or_compute(
+        ride_cache_key(ride_details),
+        lambda: agent.evaluate_ride_request(ride_details),
+        should_cache=is_cacheable_evaluation
+    )
+
+
+def parse_ride_context(raw: Optional[str]) -> dict:
+    """ride_context form field as a dict; malformed JSON only costs the agent its context"""
+    if not raw:
+        return {}
+    try:
+        context = json.loads(raw)
+    except ValueError as e:
+        print(f"Ignoring malformed ride_context: {str(e)}")
+        return {}
+    return context if isinstance(context, dict) else {}
+
+
+class AgentSpeculation:
+    """Start the follow-up agent call on the base transcript while the country model runs.
+
+    resolve() reuses the speculative answer when the final transcript matches
+    the base one after normalisation, and otherwise cancels it and asks again
+    with the final transcript.
+    """
+
+    def __init__(self, agent, ride_context: dict):
+        self.agent = agent
+        self.ride_context = ride_context
+        self.text = None
+        self.task = None
+        self.outcome = "not_started"
+
+    def start(self, text: Optional[str]):
+        if self.task is not None or not text:
+            return
+        self.text = text
+        self.task = asyncio.create_task(self._query(text))
+        self.outcome = "started"
+
+    def _query(self, text: str):
+        return self.agent.process_query(text, ride_context=self.ride_context, current_location=None)
+
+    def cancel(self):
+        """Drop the speculative call, e.g. when the transcription pipeline failed"""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            self.outcome = "discarded"
+
+    async def resolve(self, final_text: str):
+        if self.task is not None and normalize_text(self.text) == normalize_text(final_text):
+            self.outcome = "used"
+            return await self.task
+        if self.task is not None:
+            self.task.cancel()
+            self.outcome = "discarded"
+        return await self._query(final_text)
+
+
+class AgentResponse:
+    """Same shape as the Gemini agents' responses"""
+
+    def __init__(self, content: str, agent_type: str, agent_name: str, metadata: Optional[dict] = None):
+        self.content = content
+        self.agent_type = agent_type
+        self.agent_name = agent_name
+        self.metadata = metadata or {}
+
+
+class LocalStandInAgent:
+    """Deterministic offline agent for load tests of the agent path.
+
+    It answers with simple rules after a configurable delay standing in for
+    the LLM round trip, so the cache, speculation and endpoints can be
+    exercised without network access or API quota.
+    """
+
+    def __init__(self, latency_ms: float = 800.0, min_fare_per_km: float = 1.2, max_pickup_km: float = 5.0):
+        self.latency = latency_ms / 1000
+        self.min_fare_per_km = min_fare_per_km
+        self.max_pickup_km = max_pickup_km
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency_ms=float(os.getenv("AGENT_LOCAL_LATENCY_MS", 800.0)),
+            min_fare_per_km=float(os.getenv("AGENT_LOCAL_MIN_FARE_PER_KM", 1.2)),
+            max_pickup_km=float(os.getenv("AGENT_LOCAL_MAX_PICKUP_KM", 5.0))
+        )
+
+    async def process_query(self, query: str, ride_context: Optional[dict] = None, current_location=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return AgentResponse(
+            content=f"Noted: {query.strip()}",
+            agent_type="local",
+            agent_name="Local Stand-in Agent",
+            metadata={"ride_context_keys": sorted((ride_context or {}).keys())}
+        )
+
+    async def evaluate_ride_request(self, ride_details: dict):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        fare = float(ride_details.get("fare", 0) or 0)
+        distance = float(ride_details.get("distance", 0) or 0)
+        pickup = float(ride_details.get("pickup_distance", 0) or 0)
+        fare_per_km = fare / distance if distance > 0 else 0.0
+        accept = fare_per_km >= self.min_fare_per_km and pickup <= self.max_pickup_km
+        content = (f"{'ACCEPT' if accept else 'DECLINE'}: fare {fare_per_km:.2f} per km, "
+                   f"pickup {pickup:.1f} km away")
+        return AgentResponse(
+            content=content,
+            agent_type="ride_evaluation",
+            agent_name="Local Stand-in Agent",
+            metadata={"fare_per_km": round(fare_per_km, 2), "pickup_distance": pickup}
+        )
+
+
+def create_agent_backend():
+    """Agent selected by AGENT_BACKEND: "gemini", "local" or "none" (default)"""
+    backend = os.getenv("AGENT_BACKEND", "none").lower()
+    if backend == "local":
+        print("Using local stand-in agent")
+        return LocalStandInAgent.from_env()
+    if backend == "gemini":
+        try:
+            from gemini_agents import MultiAgentSystem
+        except ImportError as e:
+            print(f"Gemini agents unavailable: {str(e)}")
+            return None
+        return MultiAgentSystem()
+    return None
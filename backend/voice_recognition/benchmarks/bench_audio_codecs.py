@@ -0,0 +1,98 @@
+# Benchmark: bytes on the wire and decode CPU per clip, WAV/MP3 versus Opus
+# Usage: python benchmarks/bench_audio_codecs.py  (from backend/voice_recognition)
+# MP3 encoding and the ffmpeg decode rows need ffmpeg on PATH; Opus needs libsndfile >= 1.0.29.
+import base64
+import io
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import soundfile as sf
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from audio_io import decode_ogg_to_pcm, decode_to_pcm, synthetic_clip  # noqa: E402
+
+SAMPLE_RATE = 16000
+CLIP_SECONDS = (3, 8, 15)
+OPUS_BITRATES_KBPS = (16, 24, 32)
+REPEATS = 20
+HAS_FFMPEG = shutil.which("ffmpeg") is not None
+
+
+def ffmpeg_encode(wav_bytes: bytes, *codec_args: str) -> bytes:
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0", "-ac", "1", *codec_args, "pipe:1"],
+        input=wav_bytes, capture_output=True, check=True
+    )
+    return result.stdout
+
+
+def encode_variants(clip) -> dict:
+    """Encoded bytes per format; the first entry is today's upload path"""
+    wav = io.BytesIO()
+    sf.write(wav, clip, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    variants = {"wav 16k s16": wav.getvalue()}
+    if HAS_FFMPEG:
+        # gTTS replies are ~32 kbit/s MP3
+        variants["mp3 32k"] = ffmpeg_encode(variants["wav 16k s16"], "-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3")
+        for kbps in OPUS_BITRATES_KBPS:
+            variants[f"opus {kbps}k"] = ffmpeg_encode(
+                variants["wav 16k s16"], "-c:a", "libopus", "-b:a", f"{kbps}k", "-application", "voip", "-f", "ogg"
+            )
+    else:
+        # Without ffmpeg, libsndfile's default Opus settings stand in for the bitrate sweep
+        opus = io.BytesIO()
+        sf.write(opus, clip, SAMPLE_RATE, format="OGG", subtype="OPUS")
+        variants["opus (libsndfile)"] = opus.getvalue()
+    return variants
+
+
+def cpu_seconds() -> float:
+    """CPU of this process plus finished children (ffmpeg runs as a child)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def time_decode(decode, repeats: int = REPEATS):
+    """Mean (wall ms, CPU ms) per decode"""
+    decode()
+    wall_start, cpu_start = time.perf_counter(), cpu_seconds()
+    for _ in range(repeats):
+        decode()
+    return ((time.perf_counter() - wall_start) / repeats * 1000, (cpu_seconds() - cpu_start) / repeats * 1000)
+
+
+def main():
+    print(f"ffmpeg: {'found' if HAS_FFMPEG else 'not found (ffmpeg rows skipped)'}, libsndfile {sf.__libsndfile_version__}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for seconds in CLIP_SECONDS:
+            clip = synthetic_clip(seconds, SAMPLE_RATE)
+            variants = encode_variants(clip)
+            print(f"\n{seconds} s clip")
+            print(f"  {'format':<20} {'bytes':>9} {'base64 JSON':>12} {'kbit/s':>8}   decoder        wall ms   CPU ms")
+            for name, data in variants.items():
+                path = os.path.join(temp_dir, f"clip.{'wav' if name.startswith('wav') else 'bin'}")
+                with open(path, "wb") as f:
+                    f.write(data)
+                decoders = []
+                if name.startswith("opus"):
+                    decoders.append(("in-process", lambda: decode_ogg_to_pcm(data, SAMPLE_RATE)))
+                if HAS_FFMPEG:
+                    decoders.append(("ffmpeg", lambda: decode_to_pcm(path, SAMPLE_RATE)))
+                sizes = f"  {name:<20} {len(data):>9} {len(base64.b64encode(data)):>12} {len(data) * 8 / seconds / 1000:>8.1f}"
+                if not decoders:
+                    print(sizes + "   n/a")
+                for i, (decoder, decode) in enumerate(decoders):
+                    wall_ms, cpu_ms = time_decode(decode)
+                    prefix = sizes if i == 0 else " " * len(sizes)
+                    print(f"{prefix}   {decoder:<12} {wall_ms:>9.2f} {cpu_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Benchmark: bytes on the wire and serialisation time for /upload/ responses
+# Usage: python benchmarks/bench_response_encoding.py  (from backend/voice_recognition)
+import gzip
+import sys
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from response_encoding import (  # noqa: E402
+    CBOR_MEDIA_TYPE, JSON_MEDIA_TYPE, brotli, cbor2, compact_upload_payload, encode_body, msgpack, orjson
+)
+
+SAMPLE_RESPONSE = {
+    "base_model": {"text": " Okay, I'm on my way to pick you up at the main entrance.", "model": "faster-whisper-tiny"},
+    "fine_tuned_model": {
+        "text": "Okay, I'm on my way to pick you up at the main entrance lah.",
+        "model_name": "Malaysian Whisper Model",
+        "model_id": "mesolitica/malaysian-whisper-small-v3"
+    },
+    "country": "Malaysia",
+    "processing_time": "1.23 seconds",
+    "denoising_metrics": {
+        "original_rms": 0.0512345678, "enhanced_rms": 0.0312345678, "noise_reduction": 0.02,
+        "noise_reduction_percentage": 39.0361234, "stoi": 0.9812345, "snr_before": 8.123456,
+        "snr_after": 12.3456789, "snr_improvement": 4.2222229,
+        "enhancement": {"mode": "light", "blend_ratio": 0.55, "estimated_snr_db": 21.52345,
+                        "noise_floor_db": -48.1234, "noise_flatness": 0.4123, "noise_frame_ratio": 0.3123}
+    },
+    "vad": {"original_duration": 4.2, "kept_duration": 2.61, "voiced_duration": 2.13, "speech_ratio": 0.6214, "has_speech": True},
+    "cache": "miss",
+    "request_id": "req_1700000000_1a2b3c4d"
+}
+
+
+def timeit(fn, repeat: int = 2000) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    encoders = [("json (previous: jsonable_encoder + JSONResponse)",
+                 lambda p: JSONResponse(content=jsonable_encoder(p)).body),
+                ("json (%s)" % ("orjson" if orjson else "stdlib"), lambda p: encode_body(p, JSON_MEDIA_TYPE))]
+    if msgpack is not None:
+        encoders.append(("msgpack", lambda p: encode_body(p, "application/msgpack")))
+    if cbor2 is not None:
+        encoders.append(("cbor", lambda p: encode_body(p, CBOR_MEDIA_TYPE)))
+
+    print(f"{'schema':<8} {'encoding':<48} {'raw B':>6} {'gzip B':>7} {'br B':>6} {'encode us':>10}")
+    for schema, payload in (("full", SAMPLE_RESPONSE), ("compact", compact_upload_payload(SAMPLE_RESPONSE))):
+        for name, encode in encoders:
+            body = encode(payload)
+            gzipped = len(gzip.compress(body, compresslevel=5))
+            brotlied = len(brotli.compress(body, quality=5)) if brotli is not None else "-"
+            micros = timeit(lambda: encode(payload))
+            print(f"{schema:<8} {name:<48} {len(body):>6} {gzipped:>7} {brotlied:>6} {micros:>10.1f}")
+    missing = [name for name, mod in (("orjson", orjson), ("msgpack", msgpack), ("cbor2", cbor2), ("brotli", brotli)) if mod is None]
+    if missing:
+        print(f"Not installed (rows skipped or on fallback): {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Benchmark: import time and time to first health check for the API, the gateway and the engine
+# Usage: python benchmarks/bench_startup.py [--ready-timeout 300]  (from backend/voice_recognition)
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {dir!r}); t = time.perf_counter(); "
+    "import {module}; print(time.perf_counter() - t)"
+)
+
+
+def import_time(module: str):
+    """Seconds to import module in a fresh interpreter, or the error it raised"""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(dir=str(SERVICE_DIR), module=module)],
+        cwd=SERVICE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return float(result.stdout.strip().splitlines()[-1]), None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float, started: float, process: subprocess.Popen):
+    """Seconds since started until url answers 200, or None on timeout or server exit"""
+    while time.perf_counter() - started < timeout and process.poll() is None:
+        try:
+            with urllib.request.urlopen(url, timeout=1.0) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def time_to_health(app: str, ready_timeout: float, env=None) -> dict:
+    """Start uvicorn for app and time the first /health and /ready responses"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        health = wait_for(f"http://127.0.0.1:{port}/health", 60.0, started, process)
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", ready_timeout, started, process) if health and ready_timeout else None
+        return {"health": health, "ready": ready, "exit_code": process.poll()}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def fmt(seconds) -> str:
+    return f"{seconds:8.3f} s" if seconds is not None else "       n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ready-timeout", type=float, default=300.0,
+                        help="seconds to wait for /ready (model load + warm-up); 0 skips it")
+    args = parser.parse_args()
+
+    print("Import time (fresh interpreter)")
+    for module in ("model_config", "main", "gateway", "engine"):
+        seconds, error = import_time(module)
+        print(f"  {module:<14} {fmt(seconds)}" + (f"   ({error})" if error else ""))
+
+    print("\nTime from process start to first 200 response")
+    for label, app, env in (
+        ("main:app", "main:app", {"WARMUP_ENABLED": os.getenv("WARMUP_ENABLED", "1")}),
+        ("gateway:app", "gateway:app", None),
+    ):
+        timings = time_to_health(app, args.ready_timeout if app == "main:app" else 0, env)
+        line = f"  {label:<14} /health {fmt(timings['health'])}"
+        if app == "main:app":
+            line += f"   /ready {fmt(timings['ready'])}"
+        if timings["exit_code"] not in (None, 0):
+            line += f"   (exited with {timings['exit_code']})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# Benchmark: throughput and memory per replica, every model on every replica versus country-sharded replicas
+# Usage: python benchmarks/multi_replica_harness.py [--replicas 3] [--spare] [--requests 60] [--concurrency 6]
+# (from backend/voice_recognition). Starts real workers (uvicorn main:app on Unix sockets) and the gateway
+# on this machine, so it needs the full service environment and the model weights.
+import argparse
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVICE_DIR))
+from audio_io import synthetic_clip  # noqa: E402
+from model_config import COUNTRY_MODELS  # noqa: E402
+from router import placement  # noqa: E402
+
+SAMPLE_RATE = 16000
+BOUNDARY = "harness-boundary"
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float = 5.0):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request(connection: http.client.HTTPConnection, method: str, path: str, body=None, headers=None):
+    """(status, body bytes); connection errors come back as status 0"""
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    except (OSError, http.client.HTTPException) as e:
+        return 0, str(e).encode()
+    finally:
+        connection.close()
+
+
+def memory_mb(pid: int) -> dict:
+    """Current and peak resident set size of a process from /proc"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(value.split()[0]) / 1024
+    except FileNotFoundError:
+        pass
+    return {"rss_mb": values.get("VmRSS"), "peak_mb": values.get("VmHWM")}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start(args: list, env: dict, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--log-level", "warning"],
+        cwd=SERVICE_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+def log_tail(log_path: str) -> str:
+    """Last line of a process log; the logs are deleted with the temp dir"""
+    with open(log_path, errors="replace") as f:
+        lines = f.read().strip().splitlines()
+    return lines[-1] if lines else "no output"
+
+
+def wait_ready(connect, process: subprocess.Popen, path: str, timeout: float) -> bool:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout and process.poll() is None:
+        status, _ = request(connect(), "GET", path)
+        if status == 200:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def multipart(fields: dict, audio: bytes) -> bytes:
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="clip.wav"\r\n'
+        f'Content-Type: audio/wav\r\n\r\n'.encode() + audio + b"\r\n"
+    )
+    parts.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(parts)
+
+
+def make_uploads(count: int, seconds: float, routing: str) -> list:
+    """Distinct clips (so the transcript cache never answers) spread over the countries"""
+    countries = list(COUNTRY_MODELS)
+    uploads = []
+    for i in range(count):
+        wav = io.BytesIO()
+        sf.write(wav, synthetic_clip(seconds, SAMPLE_RATE, seed=1000 + i), SAMPLE_RATE, format="WAV", subtype="PCM_16")
+        fields = {"country": countries[i % len(countries)], "routing": routing, "fast_path": "off"}
+        uploads.append(multipart(fields, wav.getvalue()))
+    return uploads
+
+
+def run_layout(layout: str, args, temp_dir: str) -> dict:
+    """Start workers and the gateway for one layout, drive load through the gateway, tear down"""
+    workers = [os.path.join(temp_dir, f"{layout}-{i}.sock") for i in range(args.replicas)]
+    spares = [os.path.join(temp_dir, f"{layout}-spare.sock")] if args.spare else []
+    if layout == "sharded":
+        models = placement(workers, spares, args.model_replicas)
+        gateway_env = {"GATEWAY_ROUTING": "country", "WARM_SPARE_SOCKETS": ",".join(spares),
+                       "ROUTER_MODEL_REPLICAS": str(args.model_replicas)}
+    else:
+        models = {path: list(COUNTRY_MODELS) for path in workers + spares}
+        gateway_env = {"GATEWAY_ROUTING": "least_loaded"}
+
+    processes = {}
+    port = free_port()
+    try:
+        for path, countries in models.items():
+            env = {"VOICE_MODELS": ",".join(countries) or "none", "WARMUP_ENABLED": "1"}
+            processes[path] = start(["main:app", "--uds", path], env, path + ".log")
+        for path, process in processes.items():
+            if not wait_ready(lambda: UnixHTTPConnection(path), process, "/ready", args.ready_timeout):
+                raise RuntimeError(f"Worker {Path(path).stem} did not become ready: {log_tail(path + '.log')}")
+        idle = {path: memory_mb(process.pid) for path, process in processes.items()}
+
+        gateway_env["VOICE_WORKER_SOCKETS"] = ",".join(workers + spares)
+        gateway = start(["gateway:app", "--host", "127.0.0.1", "--port", str(port)], gateway_env,
+                        os.path.join(temp_dir, f"{layout}-gateway.log"))
+        processes["gateway"] = gateway
+        if not wait_ready(lambda: http.client.HTTPConnection("127.0.0.1", port), gateway, "/health", 30.0):
+            raise RuntimeError("Gateway did not start")
+        time.sleep(3.0)  # let the gateway's first health round see every worker
+
+        uploads = make_uploads(args.requests, args.clip_seconds, args.routing)
+        headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+        def send(body):
+            started = time.perf_counter()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=args.request_timeout)
+            status, _ = request(connection, "POST", "/upload/", body, headers)
+            return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(send, uploads))
+        wall = time.perf_counter() - started
+
+        status, body = request(http.client.HTTPConnection("127.0.0.1", port), "GET", "/system_info/")
+        gateway_info = json.loads(body)["gateway"] if status == 200 else {}
+        latencies = np.array([seconds for code, seconds in results if code == 200])
+        return {
+            "models": models,
+            "idle": idle,
+            "loaded": {path: memory_mb(processes[path].pid) for path in models},
+            "ok": int(len(latencies)),
+            "errors": sum(1 for code, _ in results if code != 200),
+            "throughput": len(latencies) / wall,
+            "p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "decisions": (gateway_info.get("router") or {}).get("decisions"),
+        }
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def fmt(value, spec: str) -> str:
+    return format(value, spec) if value is not None else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--spare", action="store_true", help="add a warm spare that loads every model")
+    parser.add_argument("--model-replicas", type=int, default=1, help="replicas per country model when sharded")
+    parser.add_argument("--layouts", default="all,sharded")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--clip-seconds", type=float, default=5.0)
+    parser.add_argument("--routing", default="dual", help="dual makes every request run its country model")
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--request-timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for layout in args.layouts.split(","):
+            print(f"\n== {layout}: {args.replicas} replicas{' + warm spare' if args.spare else ''} ==")
+            try:
+                report = run_layout(layout, args, temp_dir)
+            except RuntimeError as e:
+                print(f"  failed: {e}")
+                continue
+            print(f"  {'replica':<20} {'models':<30} {'idle RSS MB':>12} {'RSS MB':>9} {'peak MB':>9}")
+            for path, countries in report["models"].items():
+                loaded = report["loaded"][path]
+                print(f"  {Path(path).stem:<20} {','.join(countries) or 'base only':<30} "
+                      f"{fmt(report['idle'][path]['rss_mb'], '12.0f')} {fmt(loaded['rss_mb'], '9.0f')} "
+                      f"{fmt(loaded['peak_mb'], '9.0f')}")
+            total_peak = sum(m["peak_mb"] or 0 for m in report["loaded"].values())
+            print(f"  total peak RSS {total_peak:.0f} MB, {report['ok']} ok / {report['errors']} errors, "
+                  f"{report['throughput']:.2f} req/s, p50 {fmt(report['p50'], '.2f')} s, p95 {fmt(report['p95'], '.2f')} s")
+            if report["decisions"]:
+                print(f"  router decisions: {report['decisions']}")
+
+
+if __name__ == "__main__":
+    main()
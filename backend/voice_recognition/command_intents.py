@@ -0,0 +1,141 @@
+# Fast path for the fixed driver command vocabulary
+# Most driver utterances are one of a handful of commands. A short greedy
+# decode biased towards the grammar, matched fuzzily against it, answers those
+# without the denoiser, the country model or the agent.
+import os
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Optional
+
+from model_config import COUNTRY_MODELS, DEFAULT_COMMANDS
+from segment_stream import normalize_text
+
+# Fast path only for speech this short; longer utterances are never bare commands
+COMMAND_MAX_SECONDS = float(os.getenv("COMMAND_MAX_SECONDS", 3.0))
+# Both the decoder and the grammar match have to be at least this sure
+COMMAND_ASR_CONFIDENCE = float(os.getenv("COMMAND_ASR_CONFIDENCE", 0.5))
+COMMAND_MATCH_THRESHOLD = float(os.getenv("COMMAND_MATCH_THRESHOLD", 0.85))
+# The fast decode stops after this many characters
+COMMAND_MAX_CHARS = 48
+
+# Words drivers wrap around a command that do not change its meaning
+FILLER_WORDS = {"please", "ok", "okay", "uh", "um", "yeah", "yes", "hey", "now", "lah", "can", "la"}
+# "don't accept" is close to "accept" by characters, so negation words are matched separately
+NEGATION_WORDS = {"not", "don't", "dont", "no", "never", "cannot", "can't", "tak", "jangan"}
+# Commands that already say no: a negation around them ("no, decline") is emphasis
+NEGATIVE_INTENTS = {"decline_ride", "cancel_ride"}
+# What a negated affirmative command means; other negated commands are left to the full pipeline
+NEGATED_INTENTS = {"accept_ride": "decline_ride"}
+
+
+@lru_cache(maxsize=16)
+def command_grammar(country: Optional[str]) -> dict:
+    """Normalised phrase -> intent for the default grammar plus the country's additions"""
+    grammar = {}
+    extra = COUNTRY_MODELS.get(country, {}).get("commands", {})
+    for commands in (DEFAULT_COMMANDS, extra):
+        for intent, phrases in commands.items():
+            for phrase in phrases:
+                grammar[normalize_text(phrase)] = intent
+    return grammar
+
+
+def command_keywords(country: Optional[str]) -> tuple:
+    """Grammar phrases that end a streamed decode early (segment_stream stop keywords).
+
+    Single words ("accept", "navigate") also open longer requests, so only
+    multi-word phrases count as a complete command.
+    """
+    return tuple(phrase for phrase in command_grammar(country) if " " in phrase)
+
+
+def command_language(country: Optional[str]) -> Optional[str]:
+    """Decode language for the fast path, or None to let Whisper detect it.
+
+    English-speaking countries (and requests without a country model) decode
+    as English. Countries with local phrasings mix those with the English
+    grammar, so they are auto-detected rather than forced to either language.
+    """
+    config = COUNTRY_MODELS.get(country)
+    if config is None or config.get("language", "en") == "en":
+        return "en"
+    return None
+
+
+def fast_path_available(country: Optional[str]) -> bool:
+    """Whether the grammar covers the country's language.
+
+    The default grammar is English, so a country whose model decodes another
+    language and that adds no local phrasings (Thailand) would only waste a
+    decode before every full transcription.
+    """
+    config = COUNTRY_MODELS.get(country)
+    return config is None or config.get("language", "en") == "en" or bool(config.get("commands"))
+
+
+def command_prompt(country: Optional[str]) -> str:
+    """Decoder prompt listing the grammar, which biases Whisper's spelling towards it"""
+    return ", ".join(sorted(command_grammar(country))) + "."
+
+
+def strip_fillers(text: str) -> str:
+    words = normalize_text(text).split()
+    kept = [w for w in words if w not in FILLER_WORDS]
+    return " ".join(kept or words)
+
+
+def match_command(text: str, country: Optional[str] = None) -> Optional[dict]:
+    """Closest grammar phrase to the whole utterance: {"intent", "phrase", "score", "negated"} or None.
+
+    The score compares the entire utterance with the phrase, so a command
+    buried in a longer sentence scores low and is left to the full pipeline.
+    Phrases that contain a negation ("tak nak") are compared with the whole
+    utterance; the others with the utterance minus its negation words. A
+    negation then flips an affirmative command (NEGATED_INTENTS, "negated"
+    is set), is ignored for a negative one ("no, decline") and otherwise
+    leaves the utterance unmatched.
+    """
+    utterance = strip_fillers(text)
+    if not utterance:
+        return None
+    words = utterance.split()
+    core = " ".join(w for w in words if w not in NEGATION_WORDS)
+    negated = len(core.split()) < len(words)
+    best, best_key = None, None
+    for phrase, intent in command_grammar(country).items():
+        phrase_negated = not NEGATION_WORDS.isdisjoint(phrase.split())
+        compared = utterance if phrase_negated else core
+        if not compared:
+            continue
+        score = SequenceMatcher(None, compared, strip_fillers(phrase)).ratio()
+        # On a tie the phrase that spells out the negation wins ("cannot take" over "can take")
+        if best is None or (score, phrase_negated) > best_key:
+            best_key = (score, phrase_negated)
+            best = {"intent": intent, "phrase": phrase, "score": round(score, 3),
+                    "negated": negated and not phrase_negated}
+    if best and best["negated"] and best["intent"] not in NEGATIVE_INTENTS:
+        if best["intent"] not in NEGATED_INTENTS:
+            return None
+        best["intent"] = NEGATED_INTENTS[best["intent"]]
+    elif best:
+        best["negated"] = False
+    return best
+
+
+def recognize_command(text: str, asr_confidence: float, country: Optional[str] = None) -> dict:
+    """Decide whether a fast-path transcript is a confident command.
+
+    Returns the best match with "accepted" set, plus the reason when it is
+    not accepted, so the response can show why the full pipeline ran.
+    """
+    match = match_command(text, country) or {"intent": None, "phrase": None, "score": 0.0, "negated": False}
+    result = {**match, "text": text, "asr_confidence": round(asr_confidence, 3), "accepted": False, "reason": None}
+    if not normalize_text(text):
+        result["reason"] = "empty_transcript"
+    elif asr_confidence < COMMAND_ASR_CONFIDENCE:
+        result["reason"] = "low_asr_confidence"
+    elif match["intent"] is None or match["score"] < COMMAND_MATCH_THRESHOLD:
+        result["reason"] = "no_matching_command"
+    else:
+        result["accepted"] = True
+    return result
@@ -0,0 +1,141 @@
+# Named decoding profiles and latency-budgeted profile selection
+# A profile fixes how much work one request may cost: beam width, temperature
+# fallback, token limit, chunk length and whether a country model runs. Clients
+# pick one by name or send a latency budget and let the server choose.
+import os
+from contextlib import contextmanager
+from typing import Optional
+
+# Ordered from fastest to most accurate; LatencyBudgeter.select relies on this order.
+# None means "the model's own default", which is what the pipeline used before profiles existed.
+DECODING_PROFILES = {
+    "realtime": {
+        "beam_size": 1,
+        "temperature": (0.0,),  # no fallback re-decodes
+        "max_new_tokens": 96,
+        "chunk_length": 15,
+        "vad_filter": False,  # uploads are already trimmed by our VAD
+        "country_num_beams": 1,
+        "country_model": False,
+        "decode_mode": "speculative",
+        # Prior for the latency estimate: overhead + cost per second of speech, refined by observations
+        "overhead_seconds": 0.3,
+        "seconds_per_audio_second": 0.15,
+    },
+    "balanced": {
+        "beam_size": 3,
+        "temperature": (0.0, 0.4, 0.8),
+        "max_new_tokens": 160,
+        "chunk_length": None,
+        "vad_filter": True,
+        "country_num_beams": 1,
+        "country_model": True,
+        "decode_mode": "speculative",
+        "overhead_seconds": 0.6,
+        "seconds_per_audio_second": 0.35,
+    },
+    "accurate": {
+        "beam_size": 5,
+        "temperature": None,
+        "max_new_tokens": None,
+        "chunk_length": None,
+        "vad_filter": True,
+        "country_num_beams": None,
+        "country_model": True,
+        "decode_mode": None,  # ASR_DECODE_MODE
+        "overhead_seconds": 1.0,
+        "seconds_per_audio_second": 0.6,
+    },
+}
+
+# Used when the request names no profile and sends no latency budget
+DEFAULT_PROFILE = os.getenv("DECODING_PROFILE", "accurate")
+if DEFAULT_PROFILE not in DECODING_PROFILES:
+    print(f"Unknown DECODING_PROFILE {DEFAULT_PROFILE!r}, using 'accurate'")
+    DEFAULT_PROFILE = "accurate"
+
+# Weight of the newest observation in the per-profile cost estimate
+LATENCY_EWMA_ALPHA = 0.2
+
+
+def whisper_options(profile: dict) -> dict:
+    """faster-whisper transcribe() keyword arguments for a profile"""
+    options = {"beam_size": profile["beam_size"], "vad_filter": profile["vad_filter"]}
+    for key in ("temperature", "max_new_tokens", "chunk_length"):
+        if profile[key] is not None:
+            options[key] = profile[key]
+    return options
+
+
+class LatencyBudgeter:
+    """Chooses a profile from a latency budget, the clip length and the current queue depth.
+
+    Each profile's cost is modelled as overhead + seconds_per_audio_second *
+    speech seconds, starting from the priors in DECODING_PROFILES and tracking
+    observed latencies with an EWMA. Requests already in the pipeline are
+    assumed to share the same hardware, so the estimate is scaled by
+    (1 + in_flight).
+    """
+
+    def __init__(self, profiles: dict = DECODING_PROFILES, default: str = DEFAULT_PROFILE):
+        self.profiles = profiles
+        self.default = default
+        self.rates = {name: profile["seconds_per_audio_second"] for name, profile in profiles.items()}
+        self.in_flight = 0
+        self.observations = {name: 0 for name in profiles}
+        self.chosen = {name: 0 for name in profiles}
+
+    def estimate(self, name: str, audio_seconds: float, queue_depth: Optional[int] = None) -> float:
+        queue_depth = self.in_flight if queue_depth is None else queue_depth
+        single = self.profiles[name]["overhead_seconds"] + self.rates[name] * audio_seconds
+        return single * (1 + queue_depth)
+
+    def select(self, requested: Optional[str], latency_budget_ms: Optional[float], audio_seconds: float) -> dict:
+        """Profile name, settings and the reason it was chosen"""
+        queue_depth = self.in_flight
+        if requested in self.profiles:
+            name, reason = requested, "requested"
+        elif latency_budget_ms:
+            # Most accurate profile expected to finish within the budget, else the fastest
+            budget = latency_budget_ms / 1000
+            fitting = [n for n in self.profiles if self.estimate(n, audio_seconds, queue_depth) <= budget]
+            name, reason = (fitting[-1], "budget") if fitting else (next(iter(self.profiles)), "budget_exceeded")
+        else:
+            name, reason = self.default, "default"
+        self.chosen[name] += 1
+        return {
+            "name": name,
+            "reason": reason,
+            "settings": self.profiles[name],
+            "queue_depth": queue_depth,
+            "latency_budget_ms": latency_budget_ms,
+            "estimated_seconds": round(self.estimate(name, audio_seconds, queue_depth), 3),
+        }
+
+    def record(self, name: str, audio_seconds: float, elapsed: float, queue_depth: int = 0):
+        """Fold an observed latency into the profile's cost per second of speech"""
+        single = elapsed / (1 + queue_depth)
+        rate = max(single - self.profiles[name]["overhead_seconds"], 0.0) / max(audio_seconds, 0.5)
+        self.rates[name] += LATENCY_EWMA_ALPHA * (rate - self.rates[name])
+        self.observations[name] += 1
+
+    @contextmanager
+    def track(self):
+        """Count a request as in flight while the block runs"""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "default": self.default,
+            "in_flight": self.in_flight,
+            "chosen": dict(self.chosen),
+            "seconds_per_audio_second": {name: round(rate, 3) for name, rate in self.rates.items()},
+            "observations": dict(self.observations),
+        }
+
+
+BUDGETER = LatencyBudgeter()
@@ -0,0 +1,164 @@
+# Batched DeepFilterNet enhancement for concurrent uploads
+# DeepFilterNet's enhance() treats the channel axis as the batch axis (it resets
+# the GRU state with batch_size=audio.shape[0]), so clips of similar length can
+# be stacked as channels and enhanced in one forward pass.
+import asyncio
+import os
+from typing import List
+
+import torch
+from df.enhance import enhance
+
+
+def resolve_precision(device: str, requested: str = "auto") -> torch.dtype:
+    """fp16 only on CUDA; CPU runs fp32 unless bf16 is explicitly requested"""
+    if requested == "fp16" and device == "cuda":
+        return torch.float16
+    if requested == "bf16":
+        return torch.bfloat16
+    if requested == "auto" and device == "cuda":
+        return torch.float16
+    return torch.float32
+
+
+class MixedPrecisionModel:
+    """Run the DF network under autocast but hand float32 back to enhance().
+
+    enhance() turns the network output into a complex spectrum and passes it to
+    libdf's synthesis through NumPy, neither of which accepts half precision.
+    Attribute access (eval, reset_h0, ...) is delegated to the wrapped model.
+    """
+
+    def __init__(self, model, device: str, dtype: torch.dtype):
+        self.model = model
+        self.device = device
+        self.dtype = dtype
+
+    def __call__(self, *args, **kwargs):
+        if self.dtype == torch.float32:
+            return self.model(*args, **kwargs)
+        with torch.autocast(device_type=self.device, dtype=self.dtype):
+            outputs = self.model(*args, **kwargs)
+        return tuple(o.float() if torch.is_tensor(o) else o for o in outputs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class EnhancementBatcher:
+    """Collect concurrent enhance requests for a short window and run them together.
+
+    Pending clips are sorted by length and split into buckets whose longest clip
+    is at most bucket_ratio times the shortest, which bounds the compute wasted
+    on zero padding. Batches run one at a time, so the shared DF state is never
+    used from two threads at once.
+    """
+
+    def __init__(self, df_model, df_state, max_batch_size: int = 8, max_wait_ms: float = 15.0,
+                 bucket_ratio: float = 1.5, precision: str = "auto"):
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.dtype = resolve_precision(self.device, precision)
+        self.model = MixedPrecisionModel(df_model, self.device, self.dtype)
+        self.df_state = df_state
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.bucket_ratio = bucket_ratio
+        self._pending = []
+        self._flush_handle = None
+        self._flush_tasks = set()  # referenced until done so a running flush is never garbage collected
+        self._run_lock = asyncio.Lock()
+        self.batches_run = 0
+        self.clips_enhanced = 0
+        print(f"DeepFilterNet batching: up to {max_batch_size} clips, {max_wait_ms:.0f} ms window, "
+              f"{self.device}/{str(self.dtype).replace('torch.', '')}")
+
+    @classmethod
+    def from_env(cls, df_model, df_state):
+        return cls(
+            df_model,
+            df_state,
+            max_batch_size=int(os.getenv("DENOISE_BATCH_SIZE", 8)),
+            max_wait_ms=float(os.getenv("DENOISE_BATCH_WAIT_MS", 15.0)),
+            precision=os.getenv("DENOISE_PRECISION", "auto")
+        )
+
+    async def enhance(self, audio: torch.Tensor) -> torch.Tensor:
+        """Enhance one mono clip shaped [1, T]; resolves when its batch has run"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((audio, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(self.max_wait)
+        return await future
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def _buckets(self, items) -> List[list]:
+        items = sorted(items, key=lambda item: item[0].shape[-1])
+        buckets = []
+        for item in items:
+            length = item[0].shape[-1]
+            if (buckets and len(buckets[-1]) < self.max_batch_size
+                    and length <= buckets[-1][0][0].shape[-1] * self.bucket_ratio):
+                buckets[-1].append(item)
+            else:
+                buckets.append([item])
+        return buckets
+
+    async def _flush(self):
+        self._flush_handle = None
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        try:
+            async with self._run_lock:
+                for bucket in self._buckets(items):
+                    clips = [audio for audio, _ in bucket]
+                    try:
+                        results = await asyncio.to_thread(self._enhance_batch, clips)
+                    except Exception as e:
+                        for _, future in bucket:
+                            if not future.done():
+                                future.set_exception(e)
+                        continue
+                    for (_, future), result in zip(bucket, results):
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            # Cancelled (shutdown) or failed outside a batch: no caller may be left waiting on its timeout
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(RuntimeError("DeepFilterNet batch was interrupted"))
+
+    def _enhance_batch(self, clips: List[torch.Tensor]) -> List[torch.Tensor]:
+        lengths = [clip.shape[-1] for clip in clips]
+        batch = torch.zeros(len(clips), max(lengths), dtype=torch.float32)
+        for i, clip in enumerate(clips):
+            batch[i, :lengths[i]] = clip.reshape(-1)
+        enhanced = enhance(self.model, self.df_state, batch)
+        self.batches_run += 1
+        self.clips_enhanced += len(clips)
+        if len(clips) > 1:
+            print(f"DeepFilterNet batch of {len(clips)} clips (padded to {max(lengths)} samples)")
+        return [enhanced[i:i + 1, :lengths[i]] for i in range(len(clips))]
+
+    def stats(self) -> dict:
+        return {
+            "device": self.device,
+            "precision": str(self.dtype).replace("torch.", ""),
+            "max_batch_size": self.max_batch_size,
+            "batches_run": self.batches_run,
+            "clips_enhanced": self.clips_enhanced,
+            "pending": len(self._pending)
+        }
@@ -0,0 +1,190 @@
+# Single-pass denoising metrics
+# One STFT per signal (float32) feeds the SNR fallback, spectral contrast and the
+# STOI-style intelligibility score; RMS and noise power come from dot products on
+# the raw samples, so no difference signal or float64 copy is ever materialised.
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from denoise_policy import frame_spectra
+
+FRAME_LENGTH = 512  # 32 ms at 16 kHz
+HOP_LENGTH = 256
+
+
+@lru_cache(maxsize=8)
+def octave_band_edges(sample_rate: int, n_fft: int, fmin: float = 200.0, n_bands: int = 6) -> tuple:
+    """Bin ranges of librosa-style spectral contrast bands: [0, fmin), [fmin, 2 fmin), ..."""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = np.concatenate(([0.0], fmin * 2.0 ** np.arange(n_bands + 1)))
+    ranges = []
+    for low, high in zip(edges[:-1], edges[1:]):
+        band = np.flatnonzero((freqs >= low) & (freqs < min(high, sample_rate / 2)))
+        if len(band):
+            ranges.append((band[0], band[-1] + 1))
+    return tuple(ranges)
+
+
+@lru_cache(maxsize=8)
+def third_octave_matrix(sample_rate: int, n_fft: int, num_bands: int = 15, min_freq: float = 150.0) -> np.ndarray:
+    """STOI's 1/3 octave filterbank as a (bands, bins) 0/1 matrix"""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    centers = min_freq * 2.0 ** (np.arange(num_bands) / 3.0)
+    low = centers * 2.0 ** (-1.0 / 6.0)
+    high = centers * 2.0 ** (1.0 / 6.0)
+    matrix = (freqs[None, :] >= low[:, None]) & (freqs[None, :] < high[:, None])
+    return matrix.astype(np.float32)
+
+
+def spectral_contrast_mean(power: np.ndarray, band_ranges: tuple, quantile: float = 0.02) -> float:
+    """Mean peak-to-valley contrast in dB across octave bands and frames"""
+    magnitude = np.sqrt(power)
+    contrasts = []
+    for start, stop in band_ranges:
+        band = magnitude[:, start:stop]
+        k = max(1, int(round(quantile * band.shape[1])))
+        if band.shape[1] > 2 * k:
+            band = np.partition(band, (k, band.shape[1] - k), axis=1)
+        valley = band[:, :k].mean(axis=1)
+        peak = band[:, -k:].mean(axis=1)
+        contrasts.append(10.0 * (np.log10(peak + 1e-10) - np.log10(valley + 1e-10)))
+    return float(np.mean(contrasts)) if contrasts else 0.0
+
+
+def intelligibility(
+    clean_power: np.ndarray,
+    degraded_power: np.ndarray,
+    sample_rate: int,
+    segment_ms: float = 384.0,
+    dynamic_range_db: float = 40.0,
+    beta_db: float = -15.0
+) -> Optional[float]:
+    """STOI-style short-time correlation of 1/3 octave band envelopes.
+
+    Follows Taal et al. (silent frame removal, 384 ms segments, clipping at
+    beta_db) but works on the shared 16 kHz frames instead of resampling to
+    10 kHz and running a separate STFT, so scores track pystoi closely
+    without being bit-identical.
+    """
+    frame_energy = clean_power.sum(axis=1)
+    active = 10 * np.log10(frame_energy + 1e-12) > 10 * np.log10(frame_energy.max() + 1e-12) - dynamic_range_db
+    clean_power = clean_power[active]
+    degraded_power = degraded_power[active]
+    if len(clean_power) < 2:
+        return None
+
+    bands = third_octave_matrix(sample_rate, FRAME_LENGTH)
+    x = np.sqrt(clean_power @ bands.T).T  # (bands, frames)
+    y = np.sqrt(degraded_power @ bands.T).T
+
+    segment = min(len(clean_power), max(2, int(round(segment_ms / 1000 * sample_rate / HOP_LENGTH))))
+    x_seg = np.lib.stride_tricks.sliding_window_view(x, segment, axis=1)  # (bands, segments, N)
+    y_seg = np.lib.stride_tricks.sliding_window_view(y, segment, axis=1)
+
+    alpha = np.linalg.norm(x_seg, axis=2, keepdims=True) / (np.linalg.norm(y_seg, axis=2, keepdims=True) + 1e-12)
+    clip = 1 + 10 ** (-beta_db / 20)
+    y_seg = np.minimum(y_seg * alpha, x_seg * clip)
+
+    x_seg = x_seg - x_seg.mean(axis=2, keepdims=True)
+    y_seg = y_seg - y_seg.mean(axis=2, keepdims=True)
+    numerator = (x_seg * y_seg).sum(axis=2)
+    denominator = np.linalg.norm(x_seg, axis=2) * np.linalg.norm(y_seg, axis=2) + 1e-12
+    return float(np.mean(numerator / denominator))
+
+
+def estimate_snr(
+    original_power_mean: float,
+    enhanced_power_mean: float,
+    noise_power_mean: float,
+    orig_contrast: float,
+    enh_contrast: float,
+    blend_ratio: float
+):
+    """Same estimator as the service has always reported, fed from precomputed powers"""
+    noise_power = max(noise_power_mean, 1e-10)
+    snr_before = 10 * np.log10(max(original_power_mean, 1e-20) / noise_power)
+    # Assume denoising removed about 70% of the noise
+    estimated_enhanced_noise = max(noise_power * 0.3, 1e-10)
+    snr_after = 10 * np.log10(max(enhanced_power_mean, 1e-20) / estimated_enhanced_noise)
+
+    # If the direct estimate cannot tell the signals apart, map spectral contrast to SNR instead
+    if abs(snr_after - snr_before) < 1.0:
+        snr_before = 10 * np.log10(max(0.001, orig_contrast)) + 20
+        snr_after = 10 * np.log10(max(0.001, enh_contrast)) + 20
+
+    snr_improvement = snr_after - snr_before
+    snr_before = max(0, min(30, snr_before))
+    snr_after = max(0, min(30, snr_after))
+    if snr_after <= snr_before:
+        snr_after = snr_before + blend_ratio * 3  # 0-3dB improvement based on blend ratio
+        snr_improvement = snr_after - snr_before
+    return float(snr_before), float(snr_after), float(snr_improvement)
+
+
+def compute_denoising_metrics(
+    original: np.ndarray,
+    enhanced: np.ndarray,
+    sample_rate: int = 16000,
+    blend_ratio: float = 0.7,
+    original_power: Optional[np.ndarray] = None
+) -> dict:
+    """All denoising metrics from one STFT per signal.
+
+    original_power can be passed in when the caller already has the original's
+    power spectrogram (the denoise policy computes the same frames).
+    """
+    original = np.ascontiguousarray(original, dtype=np.float32).reshape(-1)
+    enhanced = np.ascontiguousarray(enhanced, dtype=np.float32).reshape(-1)
+    length = min(len(original), len(enhanced))
+    original = original[:length]
+    enhanced = enhanced[:length]
+    if length == 0:
+        return {
+            "original_rms": 0.0, "enhanced_rms": 0.0, "noise_reduction": 0.0,
+            "noise_reduction_percentage": 0.0, "stoi": None,
+            "snr_before": 0.0, "snr_after": 0.0, "snr_improvement": 0.0
+        }
+
+    # Energies via dot products; ||x - y||^2 expands so no noise array is allocated
+    original_energy = float(np.dot(original, original))
+    enhanced_energy = float(np.dot(enhanced, enhanced))
+    noise_energy = max(original_energy + enhanced_energy - 2.0 * float(np.dot(original, enhanced)), 0.0)
+
+    original_rms = np.sqrt(original_energy / length)
+    enhanced_rms = np.sqrt(enhanced_energy / length)
+    noise_reduction = original_rms - enhanced_rms if original_rms > enhanced_rms else 0.0
+    reduction_percentage = (noise_reduction / original_rms) * 100 if original_rms != 0 else 0.0
+
+    if original_power is None:
+        original_power = frame_spectra(original, FRAME_LENGTH, HOP_LENGTH)
+    enhanced_power = frame_spectra(enhanced, FRAME_LENGTH, HOP_LENGTH)
+    frames = min(len(original_power), len(enhanced_power))
+    original_power = original_power[:frames]
+    enhanced_power = enhanced_power[:frames]
+
+    band_ranges = octave_band_edges(sample_rate, FRAME_LENGTH)
+    snr_before, snr_after, snr_improvement = estimate_snr(
+        original_energy / length,
+        enhanced_energy / length,
+        noise_energy / length,
+        spectral_contrast_mean(original_power, band_ranges),
+        spectral_contrast_mean(enhanced_power, band_ranges),
+        blend_ratio
+    )
+
+    # STOI needs at least ~30 ms of audio
+    stoi_score = None
+    if length >= int(0.03 * sample_rate):
+        stoi_score = intelligibility(original_power, enhanced_power, sample_rate)
+
+    return {
+        "original_rms": float(original_rms),
+        "enhanced_rms": float(enhanced_rms),
+        "noise_reduction": float(noise_reduction),
+        "noise_reduction_percentage": float(reduction_percentage),
+        "stoi": stoi_score,
+        "snr_before": snr_before,
+        "snr_after": snr_after,
+        "snr_improvement": snr_improvement
+    }
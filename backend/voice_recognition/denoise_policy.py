@@ -0,0 +1,98 @@
+# Cheap per-clip noise estimate deciding how much DeepFilterNet to apply
+import os
+from typing import Optional
+
+import numpy as np
+
+
+def frame_spectra(audio: np.ndarray, frame_length: int = 512, hop_length: int = 256) -> np.ndarray:
+    """Hann-windowed power spectra, shape (frames, bins), float32"""
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    if len(audio) < frame_length:
+        audio = np.pad(audio, (0, frame_length - len(audio)))
+    frames = np.lib.stride_tricks.sliding_window_view(audio, frame_length)[::hop_length]
+    window = np.hanning(frame_length).astype(np.float32)
+    spectrum = np.fft.rfft(frames * window, axis=1)
+    return (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+
+
+def estimate_noise(
+    audio: np.ndarray,
+    flatness_threshold: float = 0.3,
+    quiet_percentile: float = 15.0,
+    power: Optional[np.ndarray] = None
+) -> dict:
+    """Estimate the clip's SNR from frame energy and spectral flatness.
+
+    Noise-like frames are the quietest ones plus any frame whose spectrum is
+    flat (broadband hiss, wind, road rumble); their median power is the noise
+    floor. Speech level is the 90th percentile frame power. Pass power to
+    reuse an already computed frame_spectra() of the clip.
+    """
+    if power is None:
+        power = frame_spectra(audio)
+    frame_power = power.mean(axis=1) + 1e-12
+    flatness = np.exp(np.log(power + 1e-12).mean(axis=1)) / frame_power
+
+    quiet = frame_power <= np.percentile(frame_power, quiet_percentile)
+    noise_like = quiet | (flatness >= flatness_threshold)
+    noise_power = float(np.median(frame_power[noise_like]))
+    speech_power = float(np.percentile(frame_power, 90))
+
+    return {
+        "estimated_snr_db": float(10 * np.log10(speech_power / noise_power)),
+        "noise_floor_db": float(10 * np.log10(noise_power)),
+        "noise_flatness": float(np.median(flatness[noise_like])),
+        "noise_frame_ratio": float(noise_like.mean())
+    }
+
+
+class DenoisePolicy:
+    """Map a noise estimate to skip / light / full enhancement and a blend ratio.
+
+    Above skip_snr_db the clip is left untouched. Below full_snr_db DeepFilterNet
+    runs with full_blend_ratio. In between the blend ratio is interpolated
+    linearly towards light_blend_ratio as the clip gets cleaner.
+    """
+
+    def __init__(
+        self,
+        skip_snr_db: float = 30.0,
+        full_snr_db: float = 15.0,
+        light_blend_ratio: float = 0.4,
+        full_blend_ratio: float = 0.7,
+        enabled: bool = True
+    ):
+        self.skip_snr_db = skip_snr_db
+        self.full_snr_db = full_snr_db
+        self.light_blend_ratio = light_blend_ratio
+        self.full_blend_ratio = full_blend_ratio
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls):
+        """Thresholds can be tuned per deployment without a code change"""
+        return cls(
+            skip_snr_db=float(os.getenv("DENOISE_SKIP_SNR_DB", 30.0)),
+            full_snr_db=float(os.getenv("DENOISE_FULL_SNR_DB", 15.0)),
+            light_blend_ratio=float(os.getenv("DENOISE_LIGHT_BLEND", 0.4)),
+            full_blend_ratio=float(os.getenv("DENOISE_FULL_BLEND", 0.7)),
+            enabled=os.getenv("DENOISE_ADAPTIVE", "1") != "0"
+        )
+
+    def decide(self, audio: np.ndarray, power: Optional[np.ndarray] = None) -> dict:
+        """Return {"mode", "blend_ratio", **noise estimate} for this clip"""
+        if not self.enabled:
+            return {"mode": "full", "blend_ratio": self.full_blend_ratio}
+
+        estimate = estimate_noise(audio, power=power)
+        snr = estimate["estimated_snr_db"]
+        if snr >= self.skip_snr_db:
+            mode, blend_ratio = "skip", 0.0
+        elif snr <= self.full_snr_db:
+            mode, blend_ratio = "full", self.full_blend_ratio
+        else:
+            cleanliness = (snr - self.full_snr_db) / (self.skip_snr_db - self.full_snr_db)
+            mode = "light"
+            blend_ratio = self.full_blend_ratio + (self.light_blend_ratio - self.full_blend_ratio) * cleanliness
+        return {"mode": mode, "blend_ratio": round(float(blend_ratio), 3), **estimate}
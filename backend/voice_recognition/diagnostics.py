@@ -0,0 +1,324 @@
+# On-demand diagnostics: sampling CPU profiler and per-stage memory tracking
+# Both are off by default and switched on through the /admin/ endpoints for a
+# fixed number of seconds or requests, so one canary replica can carry them.
+import asyncio
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Optional
+from xml.sax.saxutils import escape
+
+# Leave the tracer's own bookkeeping out of the stage diffs
+SNAPSHOT_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+
+
+def process_memory() -> dict:
+    """Current and peak resident set size of this process in MB"""
+    info = {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    info["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return info
+
+
+def torch_memory() -> Optional[dict]:
+    """CUDA allocator counters in MB, if the engine has imported torch and a GPU is present"""
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return None
+    return {
+        "allocated_mb": round(torch.cuda.memory_allocated() / 2 ** 20, 1),
+        "reserved_mb": round(torch.cuda.memory_reserved() / 2 ** 20, 1),
+        "peak_allocated_mb": round(torch.cuda.max_memory_allocated() / 2 ** 20, 1),
+    }
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples every thread's stack from a background thread.
+
+    Each tick reads sys._current_frames() and counts the collapsed stack of
+    every other thread (the format flamegraph.pl and speedscope read). Nothing
+    is installed in the profiled threads, so the cost is the sampler's own
+    work: at the default 100 Hz this is well under 1% of one core. Sampling
+    stops after duration seconds or max_requests finished requests,
+    whichever comes first.
+    """
+
+    def __init__(self, interval_ms: float = 10.0, max_depth: int = 64):
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.requests = 0
+        self.max_requests = None
+        self.deadline = None
+        self.started_at = None
+        self.stopped_at = None
+        self._labels = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: Optional[float] = 30.0, max_requests: Optional[int] = None,
+              interval_ms: Optional[float] = None):
+        """Start a fresh profile; a running one is stopped and discarded"""
+        self.stop()
+        if interval_ms:
+            self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self.requests = 0
+        self.max_requests = max_requests or None
+        self.deadline = time.monotonic() + duration if duration else None
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+
+    def request_finished(self):
+        if not self.running:
+            return
+        self.requests += 1
+        if self.max_requests and self.requests >= self.max_requests:
+            self._stop.set()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if self.deadline and time.monotonic() >= self.deadline:
+                break
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+        self.stopped_at = time.time()
+
+    def collapsed(self) -> str:
+        """One "frame;frame;frame count" line per distinct stack, hottest first"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def flamegraph_svg(self, width: int = 1200, row_height: int = 16, min_width: float = 0.5) -> str:
+        """Self-contained flame graph of the collected stacks (root at the bottom)"""
+        root = {"children": {}, "count": 0}
+        for stack, count in self.stacks.items():
+            node = root
+            node["count"] += count
+            for frame in stack.split(";"):
+                node = node["children"].setdefault(frame, {"children": {}, "count": 0})
+                node["count"] += count
+        total = root["count"] or 1
+
+        def depth_of(node):
+            return 1 + max((depth_of(child) for child in node["children"].values()), default=0)
+
+        depth = depth_of(root)
+        height = depth * row_height + 30
+        rects = []
+
+        def draw(node, name, x, level):
+            w = node["count"] / total * width
+            if w < min_width:
+                return
+            y = height - (level + 1) * row_height - 10
+            hue = 20 + (hash(name) % 40)
+            title = escape(f"{name} ({node['count']} samples, {node['count'] / total * 100:.1f}%)")
+            text = escape(name[:int(w / 7)]) if w > 21 else ""
+            rects.append(
+                f'<g><title>{title}</title><rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" '
+                f'fill="hsl({hue},85%,60%)"/><text x="{x + 3:.1f}" y="{y + row_height - 4}">{text}</text></g>'
+            )
+            child_x = x
+            for child_name, child in sorted(node["children"].items()):
+                draw(child, child_name, child_x, level + 1)
+                child_x += child["count"] / total * width
+
+        draw(root, "all", 0.0, 0)
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="monospace" font-size="11">'
+            f'<text x="4" y="14">{self.samples} samples, {self.interval * 1000:.0f} ms interval</text>'
+            + "".join(rects) + "</svg>"
+        )
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "requests": self.requests,
+            "max_requests": self.max_requests,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+
+class MemoryTracker:
+    """Per-stage traced memory and torch allocator diffs, plus allocation sites per upload.
+
+    tracemalloc slows allocation-heavy Python code noticeably, so it is only
+    started for the next max_requests uploads and stopped again afterwards.
+    Stages only read tracemalloc's counters (current and peak traced bytes),
+    which costs nothing measurable; the expensive snapshot is taken once per
+    finished upload, in a worker thread, and diffed against the previous one
+    to show where the heap grew. Concurrent requests allocate into the same
+    heap, so a stage's numbers can include other requests' allocations;
+    enable it under light load when they need to be exact.
+    """
+
+    def __init__(self, history: int = 50):
+        self.records = deque(maxlen=history)
+        self.snapshots = deque(maxlen=history)
+        self.remaining = 0
+        self.top = 10
+        self.uploads = 0
+        self._last_snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._tasks = set()  # snapshot tasks in flight, referenced until they finish
+
+    @property
+    def enabled(self) -> bool:
+        return self.remaining > 0
+
+    def start(self, max_requests: int = 20, top: int = 10, frames: int = 1):
+        self.records.clear()
+        self.snapshots.clear()
+        self.remaining = max_requests
+        self.top = top
+        self.uploads = 0
+        self._last_snapshot = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        self.remaining = 0
+        self._last_snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def request_finished(self):
+        """Count a finished upload; its heap snapshot is taken in a worker thread off the response path"""
+        if not self.enabled:
+            return
+        self.uploads += 1
+        self.remaining -= 1
+        if tracemalloc.is_tracing():
+            task = asyncio.get_running_loop().create_task(self._record_upload(self.uploads))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif self.remaining <= 0:
+            self.stop()
+
+    async def _record_upload(self, upload: int):
+        try:
+            await asyncio.to_thread(self._snapshot, upload)
+        except Exception as e:
+            print(f"Memory snapshot failed: {str(e)}")
+        # The budget's last upload stops tracing once no other snapshot still needs it
+        if self.remaining <= 0 and not self._tasks - {asyncio.current_task()}:
+            self.stop()
+
+    def _snapshot(self, upload: int):
+        if not tracemalloc.is_tracing():
+            return
+        with self._snapshot_lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            previous, self._last_snapshot = self._last_snapshot, snapshot
+            if previous is None:
+                return  # the first sampled upload only sets the baseline
+            diff = snapshot.compare_to(previous, "lineno")
+        self.snapshots.append({
+            "upload": upload,
+            "python_net_kb": round(sum(d.size_diff for d in diff) / 1024, 1),
+            "top": [
+                {"where": str(d.traceback), "size_diff_kb": round(d.size_diff / 1024, 1), "count_diff": d.count_diff}
+                for d in diff[:self.top]
+            ],
+        })
+
+    @contextmanager
+    def stage(self, request_id: str, name: str):
+        if not self.enabled or not tracemalloc.is_tracing():
+            yield
+            return
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        gpu_before = torch_memory()
+        tracemalloc.reset_peak()
+        current_before, _ = tracemalloc.get_traced_memory()
+        started = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - started
+            if tracemalloc.is_tracing():
+                current_after, peak = tracemalloc.get_traced_memory()
+                record = {
+                    "request_id": request_id,
+                    "stage": name,
+                    "seconds": round(elapsed, 3),
+                    "python_net_kb": round((current_after - current_before) / 1024, 1),
+                    "python_peak_above_start_kb": round(max(peak - current_before, 0) / 1024, 1),
+                }
+                gpu_after = torch_memory()
+                if gpu_before and gpu_after:
+                    record["torch"] = {
+                        "allocated_diff_mb": round(gpu_after["allocated_mb"] - gpu_before["allocated_mb"], 1),
+                        "peak_allocated_mb": gpu_after["peak_allocated_mb"],
+                    }
+                self.records.append(record)
+
+    def report(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "remaining_requests": self.remaining,
+            "traced_current_mb": round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 1) if tracemalloc.is_tracing() else None,
+            "process": process_memory(),
+            "torch": torch_memory(),
+            "stages": list(self.records),
+            "uploads": list(self.snapshots),
+        }
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, "remaining_requests": self.remaining, "records": len(self.records),
+                "snapshots": len(self.snapshots)}
+
+
+# Shared by the API and the engine
+PROFILER = SamplingProfiler()
+MEMORY_TRACKER = MemoryTracker()
@@ -0,0 +1,682 @@
+# Inference engine: models, denoiser and the denoise + ASR pipeline
+# Everything that needs torch, transformers, faster-whisper or DeepFilterNet lives
+# here. main.py imports this module lazily after the server is up, so health
+# checks and the gateway never pay for these imports.
+from faster_whisper import WhisperModel
+from transformers import WhisperForConditionalGeneration, WhisperProcessor, pipeline
+import os
+import torch
+import asyncio
+import librosa
+from transformers.models.whisper import tokenization_whisper
+import time
+import soundfile as sf
+import numpy as np
+from df.enhance import init_df, save_audio
+from typing import Optional
+from segment_stream import SegmentStream
+from denoise_policy import DenoisePolicy, frame_spectra
+from denoise_metrics import FRAME_LENGTH, HOP_LENGTH, compute_denoising_metrics
+from denoise_batcher import EnhancementBatcher
+from language_router import choose_route, detect_spoken_language, loaded_model_configs
+from warmup import compile_whisper_encoder, run_warmup
+from model_config import COUNTRY_MODELS, MODEL_CACHE_DIR, PROJECT_ROOT, models_to_load
+from diagnostics import MEMORY_TRACKER
+from command_intents import COMMAND_MAX_CHARS, command_language, command_prompt
+from decoding_profiles import DECODING_PROFILES, DEFAULT_PROFILE, whisper_options
+
+# Add this for Malaysian model
+tokenization_whisper.TASK_IDS = ["translate", "transcribe", "transcribeprecise"]
+
+torch.set_num_threads(1)
+
+# Per-clip skip/light/full enhancement; thresholds come from DENOISE_* environment variables
+DENOISE_POLICY = DenoisePolicy.from_env()
+
+# Configure pytorch settings
+if torch.cuda.is_available():
+    print("CUDA available - using GPU acceleration")
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    TORCH_DTYPE = torch.float16
+else:
+    print("CUDA not available - using CPU")
+    TORCH_DTYPE = torch.float32
+
+# Opt-in torch.compile of the HF Whisper encoders: "1" for the default mode or a
+# mode name such as "reduce-overhead" / "max-autotune"; "0" keeps eager mode
+WHISPER_COMPILE = os.getenv("WHISPER_COMPILE", "0")
+
+# What transcribe_with_base_model returns instead of raising
+BASE_MODEL_FAILED = "Base model transcription failed"
+
+# Speculative decoding keeps the raw-audio base transcript at or above this decoder confidence
+SPECULATIVE_CONFIDENCE = float(os.getenv("SPECULATIVE_CONFIDENCE", 0.55))
+
+class FasterWhisperHandler:
+    """Handle faster-whisper models for specific countries/languages"""
+    
+    def __init__(self, model_config, cache_dir):
+        self.config = model_config
+        self.cache_dir = cache_dir
+        self.model = None
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.compute_type = "float16" if self.device == "cuda" else "int8"
+        print(f"Using device: {self.device} for model: {model_config['name']}")
+        
+    async def load(self):
+        """Initialize the faster-whisper model"""
+        try:
+            model_id = self.config["model_id"]
+            self.model = WhisperModel(
+                "large-v3",
+                device=self.device,
+                compute_type=self.compute_type,
+                download_root=str(self.cache_dir)
+            )
+            print(f"Faster-Whisper model loaded successfully for {self.config['name']}")
+            return True
+        except Exception as e:
+            print(f"Error loading Faster-Whisper model: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
+    def stream(self, file_path: str, stop_keywords=(), max_chars: Optional[int] = None,
+               profile: Optional[dict] = None) -> SegmentStream:
+        """Lazily decode segments with faster-whisper; iterate the result to drive decoding"""
+        language = self.config["language"]
+        return SegmentStream(
+            self.model,
+            file_path,
+            stop_keywords=stop_keywords,
+            max_chars=max_chars,
+            language=language,
+            task="transcribe",
+            initial_prompt=f"This is {language} speech.",
+            **whisper_options(profile or DECODING_PROFILES[DEFAULT_PROFILE])
+        )
+
+    async def transcribe(self, file_path: str, stop_keywords=(), max_chars: Optional[int] = None,
+                         profile: Optional[dict] = None) -> str:
+        """Transcribe audio using faster-whisper"""
+        try:
+            language = self.config["language"]
+            print(f"Transcribing with Faster-Whisper model for {language}")
+            stream = self.stream(file_path, stop_keywords=stop_keywords, max_chars=max_chars, profile=profile)
+            transcript = await stream.collect()
+            print(f"Faster-Whisper transcription complete ({stream.stop_reason}): {transcript}")
+            print(f"Detected language: {stream.info.language} with probability {stream.info.language_probability:.2f}")
+            return transcript
+        except Exception as e:
+            print(f"Error in Faster-Whisper transcription: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+class ModelHandler:
+    def __init__(self, model_config, cache_dir):
+        self.config = model_config
+        self.cache_dir = cache_dir
+        self.model = None
+        self.processor = None
+        self.pipeline = None
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"Using device: {self.device} for model: {model_config['name']}")
+
+    async def load(self):
+        try:
+            model_type = self.config["type"]
+            model_id = self.config["model_id"]
+            if model_type == "pipeline":
+                print(f"Loading pipeline model: {model_id}")
+                try:
+                    self.pipeline = pipeline(
+                        task="automatic-speech-recognition",
+                        model=model_id,
+                        chunk_length_s=30,
+                        device=self.device
+                    )
+                    print(f"Pipeline model loaded successfully: {model_id}")
+                    self.maybe_compile(self.pipeline.model)
+                    return True
+                except Exception as e:
+                    print(f"Error creating pipeline: {str(e)}")
+                    raise
+            else:
+                print(f"Loading custom model: {model_id}")
+                processor_kwargs = {"cache_dir": self.cache_dir}
+                if model_type != "malaysian":
+                    processor_kwargs["language"] = self.config["language"]
+                    processor_kwargs["task"] = "transcribe"
+                self.processor = WhisperProcessor.from_pretrained(
+                    model_id, **processor_kwargs
+                )
+                dtype = torch.float16 if self.device == "cuda" else torch.float32
+                self.model = WhisperForConditionalGeneration.from_pretrained(
+                    model_id,
+                    cache_dir=self.cache_dir,
+                    torch_dtype=dtype
+                ).to(self.device)
+                self.model.eval()
+                print(f"Custom model loaded successfully on {self.device}")
+                self.maybe_compile(self.model)
+            return True
+        except Exception as e:
+            print(f"Error loading model {model_id}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def maybe_compile(self, model):
+        """Compile the encoder when WHISPER_COMPILE is set; the warm-up pays the compile cost"""
+        if WHISPER_COMPILE == "0":
+            return
+        mode = "default" if WHISPER_COMPILE == "1" else WHISPER_COMPILE
+        compile_whisper_encoder(model, mode=mode)
+            
+    async def transcribe(self, file_path: str, profile: Optional[dict] = None) -> str:
+        """Unified transcription method for all model types"""
+        try:
+            profile = profile or DECODING_PROFILES[DEFAULT_PROFILE]
+            model_type = self.config["type"]
+            generation_kwargs = {}
+            if profile["country_num_beams"] is not None:
+                generation_kwargs["num_beams"] = profile["country_num_beams"]
+            if profile["max_new_tokens"] is not None:
+                generation_kwargs["max_new_tokens"] = profile["max_new_tokens"]
+            if model_type == "pipeline":
+                print("Using pipeline transcription")
+                result = await asyncio.to_thread(
+                    self.pipeline, 
+                    file_path,
+                    chunk_length_s=profile["chunk_length"] or 30,
+                    generate_kwargs=generation_kwargs
+                )
+                transcription = result["text"]
+                print(f"Pipeline transcription: {transcription}")
+                return transcription
+            
+            print(f"Transcribing with custom model type: {model_type}")
+            audio, sr = await asyncio.to_thread(librosa.load, file_path, sr=16000, mono=True)
+            print(f"Loaded audio: {len(audio)} samples, {sr}Hz")
+
+            inputs = self.processor(audio, sampling_rate=16000, return_tensors="pt")
+
+            model_dtype = next(self.model.parameters()).dtype
+            input_features = inputs.input_features.to(device=self.device, dtype=model_dtype)
+            
+            if model_type == "malaysian":
+                generation_kwargs["language"] = "ms" 
+            elif model_type == "thai":
+                generation_kwargs["language"] = "th"
+                generation_kwargs["max_new_tokens"] = min(generation_kwargs.get("max_new_tokens", 255), 255)
+            else:
+                generation_kwargs["language"] = self.config["language"]
+            generation_kwargs["task"] = "transcribe"
+            use_amp = self.device == "cuda"
+            with torch.no_grad():
+                if use_amp:
+                    with torch.amp.autocast(device_type='cuda'):
+                        generated = await asyncio.to_thread(
+                            self.model.generate,
+                            input_features,
+                            **generation_kwargs
+                        )
+                else:
+                    generated = await asyncio.to_thread(
+                        self.model.generate,
+                        input_features,
+                        **generation_kwargs
+                    )
+            transcription = self.processor.batch_decode(
+                generated, 
+                skip_special_tokens=True
+            )[0]
+            print(f"{model_type.capitalize()} model transcription: {transcription}")
+            return transcription
+        except Exception as e:
+            print(f"Error in {self.config['name']} transcription: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+# Initialize model handlers
+model_handlers = {}
+
+# Loaded by initialize_models()
+base_model = None
+
+# Shared DeepFilterNet instance, created at startup
+audio_denoiser = None
+
+async def initialize_models():
+    """Initialize all models asynchronously"""
+    print("Initializing models...")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    compute_type = "float16" if device == "cuda" else "int8"
+    print(f"Using device: {device}, compute type: {compute_type}")
+    print("Loading base Whisper model...")
+    global base_model
+    try:
+        model_path = str(PROJECT_ROOT / "models" / "whisper")
+        print(f"Loading faster-whisper model from: {model_path}")
+        print(f"Model directory exists: {os.path.exists(model_path)}")
+        print(f"Model directory contents: {os.listdir(model_path) if os.path.exists(model_path) else 'Directory does not exist'}")
+        base_model = WhisperModel(
+            "tiny", 
+            device=device,
+            compute_type=compute_type,
+            download_root=str(PROJECT_ROOT / "models" / "whisper")
+        )
+        print("Base model loaded successfully")
+    except Exception as e:
+        print(f"Error loading base model: {str(e)}")
+        raise RuntimeError("Failed to load base Whisper model")
+    countries = models_to_load()
+    print(f"Country models on this replica: {', '.join(countries) or 'none'}")
+    for country in countries:
+        config = COUNTRY_MODELS[country]
+        model_specific_cache = MODEL_CACHE_DIR / config["model_id"].replace('/', '_')
+        if config.get("use_faster_whisper", False):
+            handler = FasterWhisperHandler(config, model_specific_cache)
+        else:
+            handler = ModelHandler(config, model_specific_cache)
+        await handler.load()
+        model_handlers[country] = handler
+    print("Model initialization complete")
+
+def optimize_gpu_memory():
+    """Configure PyTorch for optimal GPU memory usage"""
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        try:
+            import gc
+            gc.collect()
+        except Exception as e:
+            print(f"Could not optimize GPU memory: {str(e)}")
+
+async def start():
+    """Load every model and the shared denoiser"""
+    global audio_denoiser
+    optimize_gpu_memory()
+    await initialize_models()
+    audio_denoiser = AudioDenoiser(sample_rate=16000, chunk_size_seconds=0.5, policy=DENOISE_POLICY)
+
+async def warm_up() -> dict:
+    """Run synthetic clips through every loaded model; returns the timing report"""
+    async def language_id(path):
+        audio, _ = await asyncio.to_thread(sf.read, path, dtype='float32')
+        return await detect_spoken_language(base_model, audio)
+
+    async def denoise(path):
+        audio, sample_rate = await asyncio.to_thread(sf.read, path, dtype='float32')
+        return await audio_denoiser.process_audio(audio, os.path.dirname(path), sample_rate)
+
+    async def command_decode(path):
+        audio, _ = await asyncio.to_thread(sf.read, path, dtype='float32')
+        return await decode_command(audio, None, "warmup")
+
+    def checked(transcribe, failed):
+        """The transcribers report failure with a sentinel instead of raising; warm-up needs the exception"""
+        async def run(path):
+            result = await transcribe(path)
+            if failed(result):
+                raise RuntimeError(f"transcription returned {result!r}")
+            return result
+        return run
+
+    targets = {
+        "denoiser": denoise,
+        "language_id": language_id,
+        "base_model": checked(transcribe_with_base_model, lambda result: result == BASE_MODEL_FAILED),
+        "command_decode": command_decode,
+    }
+    for country, handler in model_handlers.items():
+        targets[f"{country}_model"] = checked(handler.transcribe, lambda result: result is None)
+    try:
+        return await run_warmup(targets)
+    finally:
+        optimize_gpu_memory()
+
+def stream_with_base_model(file_path: str, stop_keywords=(), max_chars: Optional[int] = None,
+                           profile: Optional[dict] = None) -> SegmentStream:
+    """Lazily decode segments with the base faster-whisper model"""
+    return SegmentStream(
+        base_model,
+        file_path,
+        stop_keywords=stop_keywords,
+        max_chars=max_chars,
+        language="en",
+        task="transcribe",
+        **whisper_options(profile or DECODING_PROFILES[DEFAULT_PROFILE])
+    )
+
+async def transcribe_with_base_model(file_path: str, stop_keywords=(), max_chars: Optional[int] = None,
+                                     profile: Optional[dict] = None):
+    """Transcribe audio using the faster-whisper model"""
+    try:
+        print("Starting base model transcription...")
+        stream = stream_with_base_model(file_path, stop_keywords=stop_keywords, max_chars=max_chars, profile=profile)
+        transcript = await stream.collect()
+        print(f"Base model transcription complete ({stream.stop_reason}): {transcript}")
+        print(f"Detected language: {stream.info.language} with probability {stream.info.language_probability:.2f}")
+        return transcript
+    except Exception as e:
+        print(f"Error in base model transcription: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return BASE_MODEL_FAILED
+
+async def transcribe_raw_speculatively(speech: np.ndarray, request_id: str, profile: Optional[dict] = None) -> dict:
+    """Base model pass on the raw trimmed speech, run while the denoiser works"""
+    try:
+        stream = stream_with_base_model(speech, profile=profile)
+        transcript = await stream.collect()
+        print(f"Request {request_id}: Raw-audio base transcript (confidence {stream.confidence:.2f}): {transcript}")
+        return {"text": transcript, "confidence": stream.confidence}
+    except Exception as e:
+        print(f"Request {request_id}: Raw-audio base transcription failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {"text": None, "confidence": 0.0}
+
+async def decode_command(speech: np.ndarray, country: Optional[str], request_id: str) -> dict:
+    """Short greedy base-model decode for the command fast path.
+
+    beam_size=1 and a character cap keep this to a fraction of the full
+    decode; the prompt lists the command grammar so near-misses are spelled
+    the way the grammar spells them. The decode language follows the country
+    (command_language), so local phrasings are not forced through English.
+    """
+    try:
+        stream = SegmentStream(
+            base_model,
+            speech,
+            max_chars=COMMAND_MAX_CHARS,
+            beam_size=1,
+            temperature=0.0,
+            language=command_language(country),
+            task="transcribe",
+            initial_prompt=command_prompt(country),
+            condition_on_previous_text=False,
+            without_timestamps=True,
+        )
+        transcript = await stream.collect()
+        print(f"Request {request_id}: Command decode (confidence {stream.confidence:.2f}): {transcript}")
+        return {"text": transcript, "confidence": stream.confidence}
+    except Exception as e:
+        print(f"Request {request_id}: Command decode failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {"text": "", "confidence": 0.0}
+
+async def transcribe_with_fine_tuned_model(file_path: str, country: str, profile: Optional[dict] = None):
+    try:
+        if country not in model_handlers:
+            print(f"No model handler found for country: {country}")
+            return None
+        handler = model_handlers[country]
+        if handler is None:
+            print(f"Model handler is None for country: {country}")
+            return None
+        result = await handler.transcribe(file_path, profile=profile)
+        if result is None:
+            print(f"Transcription failed for {country}")
+            return None
+        return result
+    except Exception as e:
+        print(f"Error in fine-tuned transcription: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+# Add this import at the top with your other imports
+
+
+class AudioDenoiser:
+    def __init__(self, sample_rate: int = 48000, chunk_size_seconds: float = 5.0, policy: Optional[DenoisePolicy] = None):
+        self.sample_rate = sample_rate
+        self.policy = policy
+        print(f"DeepFilterNet initialized with {sample_rate}Hz sample rate")
+        # Initialize DeepFilterNet model - this can be done once at startup
+        self.df_model, self.df_state, _ = init_df()
+        print("DeepFilterNet model loaded successfully")
+        # Concurrent requests share one model; their clips are enhanced in batches
+        self.batcher = EnhancementBatcher.from_env(self.df_model, self.df_state)
+        
+    async def process_audio(self, speech: np.ndarray, output_dir: str, sample_rate: int = 16000) -> dict:
+        """Enhance already-decoded mono PCM and save it to output_dir for the ASR models.
+
+        The upload was decoded and VAD-trimmed once (audio_io + vad), so the
+        samples come in as an array instead of being re-read through ffmpeg.
+        """
+        try:
+            print("\n=== Starting Audio Processing with DeepFilterNet ===")
+            speech = np.asarray(speech, dtype=np.float32).reshape(-1)
+            if sample_rate != self.sample_rate:
+                speech = await asyncio.to_thread(
+                    librosa.resample, speech, orig_sr=sample_rate, target_sr=self.sample_rate
+                )
+            sample_rate = self.sample_rate
+            # DeepFilterNet works on (channels, samples) tensors
+            audio_data = torch.from_numpy(np.ascontiguousarray(speech)).unsqueeze(0)
+            print(f"Processing {audio_data.shape[-1]} samples at {sample_rate}Hz")
+
+            # float32 view of the samples; one power spectrogram is shared by the policy and the metrics
+            original_audio_numpy = audio_data.cpu().numpy().reshape(-1)
+            original_power = frame_spectra(original_audio_numpy, FRAME_LENGTH, HOP_LENGTH)
+            num_samples = original_audio_numpy.shape[0]
+            
+            # Decide from a cheap noise estimate whether enhancement is worth its latency
+            if self.policy is not None:
+                decision = self.policy.decide(original_audio_numpy, power=original_power)
+            else:
+                decision = {"mode": "full", "blend_ratio": 0.7}
+            blend_ratio = decision["blend_ratio"]  # 0.0 (all original) to 1.0 (all enhanced)
+            if "estimated_snr_db" in decision:
+                print(f"Estimated SNR {decision['estimated_snr_db']:.1f} dB, noise flatness {decision['noise_flatness']:.2f} "
+                      f"-> enhancement '{decision['mode']}' (blend {blend_ratio})")
+
+            if decision["mode"] == "skip":
+                print("Skipping DeepFilterNet: clip is already clean")
+                enhanced_audio = audio_data
+            else:
+                # Process the audio with DeepFilterNet
+                print(f"Enhancing audio with DeepFilterNet ({num_samples} samples)...")
+                enhanced_audio = await self.batcher.enhance(audio_data)
+                # Blend the enhanced audio with original for less aggressive denoising
+                print(f"Blending audio with ratio {blend_ratio} (higher = more denoising)")
+
+            # Ensure both tensors have the same length
+            if audio_data.shape[-1] != enhanced_audio.shape[-1]:
+                min_length = min(audio_data.shape[-1], enhanced_audio.shape[-1])
+                audio_data = audio_data[..., :min_length]
+                enhanced_audio = enhanced_audio[..., :min_length]
+
+            # Apply linear interpolation between original and enhanced audio
+            if decision["mode"] != "skip":
+                enhanced_audio = blend_ratio * enhanced_audio + (1 - blend_ratio) * audio_data
+
+            # An integer is required
+            int_sample_rate = int(sample_rate)
+
+            # Save the enhanced audio
+            output_path = os.path.join(output_dir, f"denoised_{os.urandom(4).hex()}.wav")
+            await asyncio.to_thread(save_audio, output_path, enhanced_audio, int_sample_rate)
+            
+            # Calculate metrics
+            metrics = await asyncio.to_thread(
+                compute_denoising_metrics,
+                original_audio_numpy,
+                enhanced_audio.cpu().numpy(),
+                int_sample_rate,
+                blend_ratio,
+                original_power
+            )
+            metrics["enhancement"] = decision
+                
+            print("\n=== Processing Complete ===")
+            print(f"Saved to: {output_path}")
+            print(f"Original RMS: {metrics['original_rms']:.4f}")
+            print(f"Enhanced RMS: {metrics['enhanced_rms']:.4f}")
+            print(f"Noise Reduction: {metrics['noise_reduction_percentage']:.4f}%")
+            if metrics["stoi"] is not None:
+                print(f"STOI Score: {metrics['stoi']:.4f} (higher is better, range 0-1)")
+            print(f"SNR Before: {metrics['snr_before']:.2f} dB")
+            print(f"SNR After: {metrics['snr_after']:.2f} dB")
+            print(f"SNR Improvement: {metrics['snr_improvement']:.2f} dB")
+            return {
+                "output_path": output_path,
+                "metrics": metrics
+            }
+        except Exception as e:
+            print(f"Error in audio processing with DeepFilterNet: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise
+
+async def route_request(speech: np.ndarray, country: Optional[str], request_id: str) -> dict:
+    """Decide which single model transcribes this clip from a language-ID pass on the raw speech"""
+    try:
+        language, probability = await detect_spoken_language(base_model, speech)
+    except Exception as e:
+        print(f"Request {request_id}: Language detection failed: {str(e)}")
+        language, probability = None, 0.0
+    route = choose_route(language, probability, country, loaded_model_configs(model_handlers))
+    print(f"Request {request_id}: Detected {language} ({probability:.2f}) -> {route['target']} model ({route['reason']})")
+    return route
+
+async def denoise_and_transcribe(speech_path: str, speech: np.ndarray, country: Optional[str], request_id: str,
+                                 stages: dict, routing: str = "auto", on_base_transcript=None,
+                                 decode_mode: str = "speculative", profile: Optional[dict] = None) -> dict:
+    """Run the denoise + ASR pipeline on a saved upload; the result is cacheable.
+
+    routing="auto" runs exactly one model, chosen by spoken-language ID;
+    routing="dual" runs the base model and the client's country model as before.
+    on_base_transcript is called with the base transcript as soon as it is
+    ready while the country model is still running.
+    decode_mode="speculative" runs the base model on the raw speech while the
+    denoiser works and keeps that transcript when it is confident enough
+    (only once the route says the base model transcribes this clip);
+    "sequential" always transcribes the denoised audio.
+    profile is a DECODING_PROFILES entry; one with country_model=False keeps
+    the request on the base model and skips language ID.
+    """
+    profile = profile or DECODING_PROFILES[DEFAULT_PROFILE]
+    # Language ID only needs the raw speech, so it overlaps with denoising
+    routing_task = None
+    if routing == "auto" and profile["country_model"]:
+        routing_task = asyncio.create_task(route_request(speech, country, request_id))
+
+    # Step 1: Denoise the audio with timeout protection
+    print(f"Request {request_id}: Starting audio denoising...")
+    denoising_task = asyncio.create_task(
+        asyncio.wait_for(
+            audio_denoiser.process_audio(speech, os.path.dirname(speech_path)),
+            timeout=60.0  # 60 second timeout for denoising
+        )
+    )
+    raw_task = None
+    try:
+        # The route is known long before denoising ends (one encoder pass), and deciding it first
+        # means a country-routed clip never starts a raw base decode it would throw away
+        if routing_task:
+            route = await routing_task
+            run_base = route["target"] == "base"
+            target_country = None if run_base else route["target"]
+        elif not profile["country_model"]:
+            route = {"target": "base", "reason": "profile"}
+            run_base = True
+            target_country = None
+        else:
+            route = {"target": "dual", "reason": "requested"}
+            run_base = True
+            target_country = country if country in model_handlers else None
+        if decode_mode == "speculative" and run_base:
+            raw_task = asyncio.create_task(transcribe_raw_speculatively(speech, request_id, profile))
+
+        with MEMORY_TRACKER.stage(request_id, "denoise"):
+            denoised_result = await denoising_task
+        denoised_path = denoised_result["output_path"]
+        print(f"Request {request_id}: Audio denoised in {time.time() - stages['start_time']:.2f}s")
+        stages["denoised"] = True
+    except BaseException as e:
+        # A timeout, a failing denoiser or language ID, or the request being cancelled:
+        # nothing else will await the sibling tasks, so stop them here
+        for task in (routing_task, raw_task, denoising_task):
+            if task and not task.done():
+                task.cancel()
+        if isinstance(e, asyncio.TimeoutError):
+            raise Exception("Audio denoising timed out - file may be too large or complex")
+        raise
+
+    # Keep the raw-audio transcript when the decoder was confident or denoising changed nothing
+    decode_path = {"mode": decode_mode, "path": "denoised", "reason": "sequential"}
+    raw_base_result = None
+    if decode_mode == "speculative" and not run_base:
+        decode_path["reason"] = "base_model_not_routed"
+    elif raw_task:
+        raw = await raw_task
+        denoise_skipped = denoised_result["metrics"]["enhancement"]["mode"] == "skip"
+        decode_path.update(raw_confidence=round(raw["confidence"], 3), threshold=SPECULATIVE_CONFIDENCE)
+        if raw["text"] and (denoise_skipped or raw["confidence"] >= SPECULATIVE_CONFIDENCE):
+            raw_base_result = raw["text"]
+            decode_path.update(path="raw", reason="denoise_skipped" if denoise_skipped else "confident")
+        else:
+            decode_path["reason"] = "low_confidence"
+        print(f"Request {request_id}: Speculative decode -> {decode_path['path']} audio ({decode_path['reason']})")
+
+    # Step 2: Start transcription immediately after denoising
+    print(f"Request {request_id}: Starting transcription...")
+    try:
+        transcription_tasks = {}
+        if run_base and raw_base_result is None:
+            transcription_tasks["base"] = asyncio.create_task(transcribe_with_base_model(denoised_path, profile=profile))
+        elif raw_base_result is not None and target_country and on_base_transcript:
+            on_base_transcript(raw_base_result)
+        if target_country:
+            transcription_tasks["country"] = asyncio.create_task(
+                transcribe_with_fine_tuned_model(denoised_path, target_country, profile)
+            )
+            if on_base_transcript and "base" in transcription_tasks:
+                def base_done(task):
+                    if not task.cancelled() and task.exception() is None and task.result() != BASE_MODEL_FAILED:
+                        on_base_transcript(task.result())
+                transcription_tasks["base"].add_done_callback(base_done)
+
+        # Wait for all transcriptions with timeout
+        with MEMORY_TRACKER.stage(request_id, "transcribe"):
+            results = await asyncio.wait_for(
+                asyncio.gather(*transcription_tasks.values(), return_exceptions=True),
+                timeout=120.0  # 2 minute timeout for transcription
+            )
+        results = dict(zip(transcription_tasks.keys(), results))
+
+        # Process results
+        base_result = raw_base_result
+        if "base" in results:
+            base_result = results["base"] if not isinstance(results["base"], Exception) else "Transcription failed"
+        fine_tuned_result = results.get("country")
+        if isinstance(fine_tuned_result, Exception):
+            fine_tuned_result = None
+
+        # A routed country model that fails still owes the client a transcript
+        if target_country and not run_base and fine_tuned_result is None:
+            print(f"Request {request_id}: {target_country} model failed, falling back to base model")
+            base_result = await asyncio.wait_for(transcribe_with_base_model(denoised_path, profile=profile), timeout=120.0)
+            route = {**route, "target": "base", "reason": "country_model_failed"}
+
+        print(f"Request {request_id}: Transcription completed in {time.time() - stages['start_time']:.2f}s")
+        stages["transcribed"] = True
+    except asyncio.TimeoutError:
+        raise Exception("Transcription timed out - audio may be too long or complex")
+
+    return {
+        "base_result": base_result,
+        "fine_tuned_result": fine_tuned_result,
+        "country_model": target_country,
+        "country_model_ran": target_country is not None,
+        "routing": route,
+        "decode_path": decode_path,
+        "denoising_metrics": denoised_result["metrics"]
+    }
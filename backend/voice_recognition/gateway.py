@@ -0,0 +1,328 @@
+# Thin gateway in front of inference workers
+# Accepts uploads, validates them without touching any ML library and forwards
+# them to worker processes (uvicorn main:app --uds <socket>) over Unix sockets.
+# Run: VOICE_WORKER_SOCKETS=/tmp/voice-0.sock,/tmp/voice-1.sock uvicorn gateway:app --port 8000
+# GATEWAY_ROUTING=country sends each country to the workers that hold its model
+# (start each worker with the VOICE_MODELS printed by `python router.py <sockets>`).
+import asyncio
+import os
+import time
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from model_config import COUNTRY_MODELS
+from router import EJECT_SECONDS, CountryRouter, ReplicaState
+
+WORKER_SOCKETS = [s.strip() for s in os.getenv("VOICE_WORKER_SOCKETS", "/tmp/voice-worker-0.sock").split(",") if s.strip()]
+MAX_UPLOAD_BYTES = int(float(os.getenv("GATEWAY_MAX_UPLOAD_MB", 25)) * 1024 * 1024)
+WORKER_TIMEOUT_SECONDS = float(os.getenv("GATEWAY_WORKER_TIMEOUT", 200.0))
+# "least_loaded" (every worker has every model) or "country"
+GATEWAY_ROUTING = os.getenv("GATEWAY_ROUTING", "least_loaded")
+# Workers that load every model and absorb traffic when a country's owners are down or busy
+WARM_SPARE_SOCKETS = [s.strip() for s in os.getenv("WARM_SPARE_SOCKETS", "").split(",") if s.strip()]
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("GATEWAY_HEALTH_INTERVAL", 2.0))
+
+# Request headers that change what the worker returns
+FORWARDED_HEADERS = ("accept", "accept-encoding", "x-response-format")
+# Response headers passed back to the client; the body is relayed still encoded
+RELAYED_HEADERS = ("content-type", "content-encoding", "vary", "retry-after")
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def sniff_audio_format(content: bytes) -> Optional[str]:
+    """Container format from the first bytes, or None if it is not audio ffmpeg can take"""
+    if content[:4] == b"RIFF" and content[8:12] == b"WAVE":
+        return "wav"
+    if content[:4] == b"OggS":
+        return "ogg"
+    if content[:4] == b"fLaC":
+        return "flac"
+    if content[4:8] == b"ftyp":
+        return "mp4"
+    if content[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if content[:5] == b"#!AMR":
+        return "amr"
+    if content[:3] == b"ID3" or (len(content) > 1 and content[0] == 0xFF and content[1] & 0xE0 == 0xE0):
+        # MPEG audio frame sync; ADTS AAC shares the same 12-bit sync word
+        return "mpeg"
+    return None
+
+
+def validate_upload(content: bytes, country: Optional[str]) -> Optional[str]:
+    """Error message for an upload that no worker could process, or None"""
+    if not content:
+        return "Empty audio file"
+    if len(content) > MAX_UPLOAD_BYTES:
+        return f"Audio file larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+    if sniff_audio_format(content) is None:
+        return "Invalid audio format"
+    if country and country not in COUNTRY_MODELS:
+        return f"Unknown country: {country}"
+    return None
+
+
+class WorkerPool:
+    """Least-in-flight or country-routed choice among the worker sockets, one HTTP client per socket.
+
+    Both modes only pick healthy workers: the health checks and request
+    failures feed the router's replica states, or in least_loaded mode the
+    pool's own.
+    """
+
+    def __init__(self, sockets, router: Optional[CountryRouter] = None):
+        self.router = router
+        self.clients = {
+            path: httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(uds=path),
+                base_url="http://worker",
+                timeout=WORKER_TIMEOUT_SECONDS
+            )
+            for path in sockets
+        }
+        self.in_flight = {path: 0 for path in sockets}
+        self.failures = {path: 0 for path in sockets}
+        self.states = router.states if router else {path: ReplicaState(path) for path in sockets}
+
+    def pick(self, country: Optional[str] = None, exclude=()) -> Optional[str]:
+        """A healthy worker, or None; exclude skips workers this request already tried"""
+        if self.router:
+            choice = self.router.choose(country, self.in_flight, exclude)
+            return choice[0] if choice else None
+        healthy = [path for path in self.in_flight if self.states[path].healthy and path not in exclude]
+        if not healthy:
+            return None
+        return min(healthy, key=lambda path: (self.in_flight[path], self.failures[path]))
+
+    def failed(self, path: str):
+        self.failures[path] += 1
+        self.states[path].request_failed(self.router.eject_seconds if self.router else EJECT_SECONDS)
+
+    def succeeded(self, path: str):
+        self.states[path].request_succeeded()
+
+    async def check_health(self):
+        """Poll every worker's /ready; the router uses the answers for failover"""
+        while True:
+            for path, client in self.clients.items():
+                try:
+                    response = await client.get("/ready", timeout=2.0)
+                    body = response.json()
+                    if not isinstance(body, dict):
+                        raise ValueError(f"/ready answered {type(body).__name__}, not an object")
+                    models = body.get("country_models")
+                    self.states[path].checked(
+                        response.status_code == 200, int(body.get("queue_depth") or 0),
+                        models if isinstance(models, list) else None
+                    )
+                except Exception:
+                    # Unreachable, or not answering with a JSON object: either way it should not get traffic
+                    self.states[path].check_failed()
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL_SECONDS)
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            path: {"in_flight": self.in_flight[path], "failures": self.failures[path], "healthy": self.states[path].healthy}
+            for path in self.clients
+        }
+
+
+if GATEWAY_ROUTING == "country":
+    router = CountryRouter(WORKER_SOCKETS, spares=WARM_SPARE_SOCKETS)
+    pool = WorkerPool(WORKER_SOCKETS + [s for s in WARM_SPARE_SOCKETS if s not in WORKER_SOCKETS], router)
+else:
+    router = None
+    pool = WorkerPool(WORKER_SOCKETS)
+
+
+# The health-check loop, referenced so it is not garbage collected and can be cancelled at shutdown
+health_task = None
+
+
+def health_task_done(task: asyncio.Task):
+    """check_health never returns, so ending at all means routing runs on stale health"""
+    if task.cancelled():
+        return
+    error = task.exception()
+    print(f"Worker health checks stopped: {error!r}")
+    if error is not None:
+        import traceback
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+@app.on_event("startup")
+async def startup_event():
+    global health_task
+    if router:
+        for path, countries in router.layout.items():
+            print(f"Worker {path}: {', '.join(countries) or 'base model only'}")
+    health_task = asyncio.create_task(pool.check_health())
+    health_task.add_done_callback(health_task_done)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if health_task:
+        health_task.cancel()
+    await pool.close()
+
+
+class RelayResponse(StreamingResponse):
+    """Streams a worker response and releases it however the relay ends.
+
+    A generator's finally block is not enough: when the client disconnects
+    while the response waits on send(), the generator is left suspended and
+    the worker's in-flight count would never come down.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+
+async def forward(path: str, request: Request, file: UploadFile, content: bytes, form: dict):
+    """Relay the upload to a worker and stream its response back untouched.
+
+    A worker that cannot be connected to never saw the request, so it is
+    retried once on another worker; errors after that (timeouts mid-request)
+    are not, since the first worker may still be running it.
+    """
+    headers = {k: v for k, v in request.headers.items() if k.lower() in FORWARDED_HEADERS}
+    data = {k: str(v) for k, v in form.items() if v is not None}
+    files = {"file": (file.filename or "audio", content, file.content_type or "application/octet-stream")}
+
+    tried = []
+    while True:
+        socket_path = pool.pick(form.get("country"), exclude=tried)
+        if socket_path is None:
+            return JSONResponse(status_code=503, content={"error": "No healthy inference worker"}, headers={"Retry-After": "5"})
+        tried.append(socket_path)
+        client = pool.clients[socket_path]
+        pool.in_flight[socket_path] += 1
+        try:
+            worker_request = client.build_request("POST", path, data=data, files=files, headers=headers)
+            response = await client.send(worker_request, stream=True)
+            break
+        except httpx.HTTPError as e:
+            pool.in_flight[socket_path] -= 1
+            pool.failed(socket_path)
+            print(f"Worker {socket_path} unreachable: {str(e)}")
+            retryable = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+            if not retryable or len(tried) > 1:
+                return JSONResponse(status_code=503, content={"error": "Inference worker unavailable", "message": str(e)})
+    # A worker answering 5xx is failing requests just as much as one that cannot be reached
+    if response.status_code >= 500:
+        pool.failed(socket_path)
+    else:
+        pool.succeeded(socket_path)
+
+    async def release():
+        await response.aclose()
+        pool.in_flight[socket_path] -= 1
+
+    relayed = {k: v for k, v in response.headers.items() if k.lower() in RELAYED_HEADERS}
+    return RelayResponse(response.aiter_raw(), release, status_code=response.status_code, headers=relayed)
+
+
+@app.post("/upload/")
+async def upload(
+    request: Request,
+    file: UploadFile = File(...),
+    country: str = Form(None),
+    ride_context: str = Form(None),
+    conversation_context: str = Form(None),
+    response_format: str = Form(None),
+    routing: str = Form("auto"),
+    decode_mode: str = Form(None),
+    fast_path: str = Form("auto"),
+    profile: str = Form(None),
+    latency_budget_ms: Optional[float] = Form(None)
+):
+    content = await file.read()
+    error = validate_upload(content, country)
+    if error:
+        return JSONResponse(status_code=400, content={"error": error})
+    return await forward("/upload/", request, file, content, {
+        "country": country,
+        "ride_context": ride_context,
+        "conversation_context": conversation_context,
+        "response_format": response_format,
+        "routing": routing,
+        "decode_mode": decode_mode,
+        "fast_path": fast_path,
+        "profile": profile,
+        "latency_budget_ms": latency_budget_ms
+    })
+
+
+@app.post("/upload/stream/")
+async def upload_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    country: str = Form(None),
+    max_chars: Optional[int] = Form(None),
+    early_exit: bool = Form(True),
+    profile: str = Form(None)
+):
+    content = await file.read()
+    error = validate_upload(content, country)
+    if error:
+        return JSONResponse(status_code=400, content={"error": error})
+    return await forward("/upload/stream/", request, file, content, {
+        "country": country,
+        "max_chars": max_chars,
+        "early_exit": early_exit,
+        "profile": profile
+    })
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "workers": len(pool.clients)}
+
+
+@app.get("/ready")
+async def ready():
+    """Ready as soon as one worker reports ready"""
+    workers = {}
+    for socket_path, client in pool.clients.items():
+        try:
+            response = await client.get("/ready", timeout=2.0)
+            workers[socket_path] = response.status_code == 200
+        except httpx.HTTPError:
+            workers[socket_path] = False
+    status_code = 200 if any(workers.values()) else 503
+    return JSONResponse(status_code=status_code, content={"ready": status_code == 200, "workers": workers})
+
+
+@app.get("/system_info/")
+async def system_info():
+    return {"gateway": {
+        "time": time.time(),
+        "routing": GATEWAY_ROUTING,
+        "workers": pool.stats(),
+        "router": router.stats() if router else None
+    }}
@@ -0,0 +1,237 @@
+# Keyword spotting on streamed audio by template matching on log-mel frames
+# Continuous-listening clients stream every second of audio; only the audio
+# after a spotted keyword is passed on to DeepFilterNet and Whisper.
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+
+from audio_io import resample
+from vad import frame_energy_db, trim_silence
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400  # 25 ms
+HOP_LENGTH = 160  # 10 ms
+N_MELS = 40
+N_FFT = 512
+
+
+@lru_cache(maxsize=4)
+def mel_filterbank(sample_rate: int = SAMPLE_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """Triangular HTK-style mel filters, shape (n_mels, n_fft // 2 + 1)"""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(60.0), hz_to_mel(sample_rate / 2 - 200.0), n_mels + 2)
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    hz_points = mel_to_hz(mel_points)
+    filters = np.zeros((n_mels, len(bins)), dtype=np.float32)
+    for m in range(n_mels):
+        left, center, right = hz_points[m:m + 3]
+        rising = (bins - left) / (center - left)
+        falling = (right - bins) / (right - center)
+        filters[m] = np.maximum(0.0, np.minimum(rising, falling))
+    return filters
+
+
+def log_mel(audio: np.ndarray) -> np.ndarray:
+    """Level-normalised, unit-length log-mel frames, shape (frames, n_mels).
+
+    Removing each frame's mean log energy and scaling to unit length leaves
+    only the spectral shape, so loud and quiet utterances of a keyword look
+    alike and the frame distance is a cosine distance. Normalising per frame
+    rather than over the clip keeps a streamed buffer comparable to a
+    template whatever else the buffer contains.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < N_FFT:
+        audio = np.pad(audio, (0, N_FFT - len(audio)))
+    frames = np.lib.stride_tricks.sliding_window_view(audio, FRAME_LENGTH)[::HOP_LENGTH]
+    window = np.hanning(FRAME_LENGTH).astype(np.float32)
+    spectrum = np.fft.rfft(frames * window, n=N_FFT, axis=1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    features = np.log(power @ mel_filterbank().T + 1e-6)
+    features -= features.mean(axis=1, keepdims=True)
+    features /= np.linalg.norm(features, axis=1, keepdims=True) + 1e-9
+    return features.astype(np.float32)
+
+
+def subsequence_dtw(template: np.ndarray, stream: np.ndarray):
+    """Best match of template anywhere inside stream; returns (cost per template frame, end frame).
+
+    Steps (1,1), (1,2) and (2,1) allow the keyword to be spoken between half
+    and twice the template's speed, and each DTW row depends only on earlier
+    rows, so a row is computed in one vectorised step.
+    """
+    distance = 1.0 - template @ stream.T  # cosine distance, (T, W)
+    rows, cols = distance.shape
+    if cols < rows // 2:
+        return np.inf, -1
+    cost = np.full((rows, cols), np.inf, dtype=np.float32)
+    cost[0] = distance[0]  # the match may start at any stream frame
+    for i in range(1, rows):
+        best = np.full(cols, np.inf, dtype=np.float32)
+        best[1:] = cost[i - 1, :-1]
+        best[2:] = np.minimum(best[2:], cost[i - 1, :-2])
+        if i >= 2:
+            best[1:] = np.minimum(best[1:], cost[i - 2, :-1])
+        cost[i] = distance[i] + best
+    end = int(np.argmin(cost[-1]))
+    return float(cost[-1, end] / rows), end
+
+
+def load_templates(template_dir) -> dict:
+    """Keyword -> list of log-mel templates from <keyword>[_N].wav files in template_dir"""
+    templates = {}
+    template_dir = Path(template_dir)
+    if not template_dir.is_dir():
+        return templates
+    for path in sorted(template_dir.glob("*.wav")):
+        keyword = re.sub(r"_\d+$", "", path.stem).replace("_", " ")
+        audio, sample_rate = sf.read(str(path), dtype="float32", always_2d=True)
+        audio = resample(audio.mean(axis=1), sample_rate, SAMPLE_RATE)
+        speech, stats = trim_silence(audio, SAMPLE_RATE, padding_ms=50)
+        if not stats["has_speech"]:
+            print(f"Skipping keyword template without speech: {path.name}")
+            continue
+        templates.setdefault(keyword, []).append(log_mel(speech))
+    return templates
+
+
+class KeywordSpotter:
+    """Streaming keyword spotter for one audio stream.
+
+    Audio is fed in chunks of 16 kHz mono float32. The last few seconds are
+    kept in a ring buffer and matched against every template each time
+    check_interval_ms of new audio has arrived; quiet chunks skip matching
+    entirely. sensitivity in [0, 1] widens the accepted DTW distance: higher
+    values catch more mumbled keywords and also more false wakes.
+    """
+
+    def __init__(self, templates: dict, sensitivity: float = 0.5, check_interval_ms: int = 100,
+                 min_level_db: float = -45.0, refractory_ms: int = 1000):
+        self.templates = templates
+        self.sensitivity = min(max(sensitivity, 0.0), 1.0)
+        self.threshold = 0.15 + 0.25 * self.sensitivity
+        longest = max((len(t) for ts in templates.values() for t in ts), default=100)
+        self.buffer_samples = int((longest * 2 + 20) * HOP_LENGTH)  # room for the slowest allowed match
+        self.check_samples = int(SAMPLE_RATE * check_interval_ms / 1000)
+        self.min_level_db = min_level_db
+        self.refractory_samples = int(SAMPLE_RATE * refractory_ms / 1000)
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.pending = 0
+        self.since_detection = self.refractory_samples
+        self.samples_seen = 0
+        self.checks = 0
+        self.detections = 0
+
+    @classmethod
+    def from_env(cls, templates: dict, sensitivity: Optional[float] = None):
+        return cls(
+            templates,
+            sensitivity=float(os.getenv("KWS_SENSITIVITY", 0.5)) if sensitivity is None else sensitivity,
+            check_interval_ms=int(os.getenv("KWS_CHECK_INTERVAL_MS", 100))
+        )
+
+    def reset(self):
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.pending = 0
+
+    def process(self, chunk: np.ndarray) -> Optional[dict]:
+        """Feed a chunk; returns {"keyword", "distance", "threshold"} on a detection"""
+        if len(chunk) == 0:
+            return None
+        self.buffer = np.concatenate([self.buffer, chunk])[-self.buffer_samples:]
+        self.samples_seen += len(chunk)
+        self.pending += len(chunk)
+        self.since_detection += len(chunk)
+        if self.pending < self.check_samples or self.since_detection < self.refractory_samples:
+            return None
+        recent = self.buffer[-self.pending:]
+        self.pending = 0
+        if frame_energy_db(recent, len(recent)).max() < self.min_level_db:
+            return None
+
+        self.checks += 1
+        features = log_mel(self.buffer)
+        best_keyword, best_distance = None, np.inf
+        for keyword, keyword_templates in self.templates.items():
+            for template in keyword_templates:
+                distance, end = subsequence_dtw(template, features)
+                # Only matches ending in the newest audio count; older ones were already checked
+                if distance < best_distance and end >= len(features) - self.check_samples // HOP_LENGTH - 5:
+                    best_keyword, best_distance = keyword, distance
+        if best_distance > self.threshold:
+            return None
+        self.detections += 1
+        self.since_detection = 0
+        self.reset()
+        return {"keyword": best_keyword, "distance": round(best_distance, 4), "threshold": round(self.threshold, 4)}
+
+
+class GatingStats:
+    """How much streamed audio the keyword gate kept away from denoise + ASR"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.seconds_received = 0.0
+        self.seconds_forwarded = 0.0
+        self.detections = 0
+
+    def add(self, received: float, forwarded: float, detections: int):
+        self.seconds_received += received
+        self.seconds_forwarded += forwarded
+        self.detections += detections
+
+    def snapshot(self) -> dict:
+        received = self.seconds_received
+        return {
+            "sessions": self.sessions,
+            "seconds_received": round(received, 1),
+            "seconds_forwarded": round(self.seconds_forwarded, 1),
+            "gated_fraction": round(1 - self.seconds_forwarded / received, 4) if received else None,
+            "detections": self.detections,
+        }
+
+
+def enroll(keyword: str, recordings, template_dir) -> list:
+    """Write trimmed 16 kHz mono templates for keyword from recordings in any soundfile format"""
+    template_dir = Path(template_dir)
+    template_dir.mkdir(parents=True, exist_ok=True)
+    stem = keyword.strip().lower().replace(" ", "_")
+    # Number after the highest existing take; "hey_grab_2.wav" is not a take of "hey"
+    taken = [re.fullmatch(rf"{re.escape(stem)}_(\d+)", path.stem) for path in template_dir.glob(f"{stem}_*.wav")]
+    next_index = max((int(match.group(1)) for match in taken if match), default=0) + 1
+    written = []
+    for recording in recordings:
+        audio, sample_rate = sf.read(str(recording), dtype="float32", always_2d=True)
+        audio = resample(audio.mean(axis=1), sample_rate, SAMPLE_RATE)
+        speech, stats = trim_silence(audio, SAMPLE_RATE, padding_ms=50)
+        if not stats["has_speech"]:
+            print(f"No speech in {recording}, skipped")
+            continue
+        path = template_dir / f"{stem}_{next_index}.wav"
+        next_index += 1
+        sf.write(str(path), speech, SAMPLE_RATE, subtype="PCM_16")
+        written.append(path)
+        print(f"Wrote {path} ({len(speech) / SAMPLE_RATE:.2f}s)")
+    return written
+
+
+if __name__ == "__main__":
+    # python keyword_spotter.py "hey grab" take1.wav take2.wav take3.wav [--dir keyword_templates]
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("keyword")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--dir", default=os.getenv("KWS_TEMPLATE_DIR", str(Path(__file__).parent / "keyword_templates")))
+    args = parser.parse_args()
+    enroll(args.keyword, args.recordings, args.dir)
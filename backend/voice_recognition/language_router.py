@@ -0,0 +1,56 @@
+# Route each clip to a single ASR model from a cheap spoken-language ID pass
+import asyncio
+import os
+from typing import Optional
+
+import numpy as np
+
+# Below this language probability we do not trust the detection and use the base model
+ROUTING_THRESHOLD = float(os.getenv("ROUTING_LANGUAGE_THRESHOLD", 0.6))
+DETECTION_SECONDS = float(os.getenv("ROUTING_DETECTION_SECONDS", 5.0))
+
+
+async def detect_spoken_language(model, audio: np.ndarray, sample_rate: int = 16000,
+                                 seconds: float = DETECTION_SECONDS):
+    """Language ID on the first few seconds with faster-whisper.
+
+    transcribe() runs language detection eagerly and returns a lazy segment
+    generator; we never iterate it, so no decoding happens.
+    """
+    clip = np.ascontiguousarray(audio[:int(seconds * sample_rate)], dtype=np.float32)
+    segments, info = await asyncio.to_thread(model.transcribe, clip, language=None, task="transcribe", beam_size=1)
+    segments.close()
+    return info.language, float(info.language_probability)
+
+
+def loaded_model_configs(handlers: dict) -> dict:
+    """Country -> COUNTRY_MODELS config for the handlers that are actually loaded"""
+    return {country: handler.config for country, handler in handlers.items() if handler is not None}
+
+
+def choose_route(language: Optional[str], probability: float, country: Optional[str],
+                 country_models: dict, threshold: float = ROUTING_THRESHOLD, base_language: str = "en") -> dict:
+    """Pick the one model that should transcribe this clip.
+
+    1. Uncertain detection -> base model.
+    2. The client's country model, if it covers the detected language.
+    3. The country model whose primary language was detected (the base
+       model's own language never routes away from it without a country hint).
+    4. Otherwise the base model.
+
+    country_models maps country -> config dict (see loaded_model_configs),
+    not to the model handlers themselves.
+    """
+    route = {"language": language, "probability": round(probability, 3), "target": "base"}
+    if language is None or probability < threshold:
+        route["reason"] = "low_confidence"
+        return route
+    if country in country_models and language in country_models[country].get("languages", ()):
+        route.update(target=country, reason="client_country")
+        return route
+    for name, config in country_models.items():
+        if config["language"] == language != base_language:
+            route.update(target=name, reason="detected_language")
+            return route
+    route["reason"] = "no_country_model"
+    return route
@@ -1,27 +1,35 @@
 # Simplified version with only the upload endpoint
-from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Body
+# Inference lives in engine.py and is imported lazily at startup, so this module
+# imports quickly and answers health checks while the models load.
+from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse, Response
 from fastapi.encoders import jsonable_encoder
-from faster_whisper import WhisperModel
-from transformers import WhisperForConditionalGeneration, WhisperProcessor, pipeline
 import tempfile
 import os
-import torch
 import asyncio
-from pathlib import Path
-import librosa
-from transformers.models.whisper import tokenization_whisper
+import hmac
+import importlib
 import time
 import soundfile as sf
 import numpy as np
-import subprocess
 import shutil
 import json
-from pystoi import stoi
 # from gemini_agents import app as gemini_app
-from df.enhance import enhance, init_df, load_audio, save_audio
 from typing import Optional
+from audio_io import decode_audio_file, fingerprint_pcm
+from result_cache import AsyncLRUCache
+from vad import frame_energy_db, trim_silence
+from response_encoding import CompressionMiddleware, encode_response
+from agent_stage import RIDE_EVALUATION_CACHE, AgentSpeculation, create_agent_backend, evaluate_ride_cached, parse_ride_context
+from model_config import COUNTRY_MODELS, PROJECT_ROOT
+from diagnostics import MEMORY_TRACKER, PROFILER, process_memory
+from command_intents import COMMAND_MAX_SECONDS, command_keywords, fast_path_available, recognize_command
+from decoding_profiles import BUDGETER
+from keyword_spotter import SAMPLE_RATE as KWS_SAMPLE_RATE, GatingStats, KeywordSpotter, load_templates
+# Text-side language ID is shared with the TTS service (backend/shared, installed via requirements.txt)
+from fast_langid import detect_language as identify_text_language
+import sys
 
 # gemini_app.mount("/gemini", gemini_app)
 
@@ -29,12 +37,8 @@ from typing import Optional
 # Define this global variable
 multi_agent_system = None
 
-# Add this for Malaysian model
-tokenization_whisper.TASK_IDS = ["translate", "transcribe", "transcribeprecise"]
-
-PROJECT_ROOT = Path(__file__).parent
-MODEL_CACHE_DIR = PROJECT_ROOT / "models" / "huggingface"
-MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# The inference engine module, set once its models are loaded
+engine = None
 
 app = FastAPI()
 
@@ -47,579 +51,214 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-torch.set_num_threads(1)
-
-# Updated model configurations with clearer country labeling
-COUNTRY_MODELS = {
-    "Malaysia": {
-        "name": "Malaysian Whisper Model",
-        "model_id": "mesolitica/malaysian-whisper-small-v3",
-        "language": "ms",
-        "type": "malaysian",
-        "use_faster_whisper": False  # Enable faster-whisper for this model
-    },
-    "Singapore": {
-        "name": "Singlish Whisper Model",
-        "model_id": "jensenlwt/whisper-small-singlish-122k",
-        "language": "en",
-        "type": "pipeline",
-        "use_faster_whisper": False  # Enable faster-whisper for this model
-    },
-    "Thailand": {
-        "name": "Thai Whisper Model",
-        "model_id": "juierror/whisper-tiny-thai",
-        "language": "th",
-        "type": "thai",
-        "use_faster_whisper": False  # Enable faster-whisper for this model
-    }
-}
-
-# Configure pytorch settings
-if torch.cuda.is_available():
-    print("CUDA available - using GPU acceleration")
-    torch.backends.cuda.matmul.allow_tf32 = True
-    torch.backends.cudnn.allow_tf32 = True
-    TORCH_DTYPE = torch.float16
-else:
-    print("CUDA not available - using CPU")
-    TORCH_DTYPE = torch.float32
-
-class FasterWhisperHandler:
-    """Handle faster-whisper models for specific countries/languages"""
-    
-    def __init__(self, model_config, cache_dir):
-        self.config = model_config
-        self.cache_dir = cache_dir
-        self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.compute_type = "float16" if self.device == "cuda" else "int8"
-        print(f"Using device: {self.device} for model: {model_config['name']}")
-        
-    async def load(self):
-        """Initialize the faster-whisper model"""
-        try:
-            model_id = self.config["model_id"]
-            self.model = WhisperModel(
-                "large-v3",
-                device=self.device,
-                compute_type=self.compute_type,
-                download_root=str(self.cache_dir)
-            )
-            print(f"Faster-Whisper model loaded successfully for {self.config['name']}")
-            return True
-        except Exception as e:
-            print(f"Error loading Faster-Whisper model: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
-    
-    async def transcribe(self, file_path: str) -> str:
-        """Transcribe audio using faster-whisper"""
-        try:
-            language = self.config["language"]
-            print(f"Transcribing with Faster-Whisper model for {language}")
-            segments, info = await asyncio.to_thread(
-                self.model.transcribe,
-                file_path,
-                beam_size=5,
-                language=language,
-                task="transcribe",
-                vad_filter=True,
-                initial_prompt=f"This is {language} speech."
-            )
-            transcript = " ".join(segment.text for segment in segments)
-            print(f"Faster-Whisper transcription complete: {transcript}")
-            print(f"Detected language: {info.language} with probability {info.language_probability:.2f}")
-            return transcript
-        except Exception as e:
-            print(f"Error in Faster-Whisper transcription: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
-
-class ModelHandler:
-    def __init__(self, model_config, cache_dir):
-        self.config = model_config
-        self.cache_dir = cache_dir
-        self.model = None
-        self.processor = None
-        self.pipeline = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Using device: {self.device} for model: {model_config['name']}")
-
-    async def load(self):
-        try:
-            model_type = self.config["type"]
-            model_id = self.config["model_id"]
-            if model_type == "pipeline":
-                print(f"Loading pipeline model: {model_id}")
-                try:
-                    self.pipeline = pipeline(
-                        task="automatic-speech-recognition",
-                        model=model_id,
-                        chunk_length_s=30,
-                        device=self.device
-                    )
-                    print(f"Pipeline model loaded successfully: {model_id}")
-                    return True
-                except Exception as e:
-                    print(f"Error creating pipeline: {str(e)}")
-                    raise
-            else:
-                print(f"Loading custom model: {model_id}")
-                processor_kwargs = {"cache_dir": self.cache_dir}
-                if model_type != "malaysian":
-                    processor_kwargs["language"] = self.config["language"]
-                    processor_kwargs["task"] = "transcribe"
-                self.processor = WhisperProcessor.from_pretrained(
-                    model_id, **processor_kwargs
-                )
-                dtype = torch.float16 if self.device == "cuda" else torch.float32
-                self.model = WhisperForConditionalGeneration.from_pretrained(
-                    model_id,
-                    cache_dir=self.cache_dir,
-                    torch_dtype=dtype
-                ).to(self.device)
-                self.model.eval()
-                print(f"Custom model loaded successfully on {self.device}")
-            return True
-        except Exception as e:
-            print(f"Error loading model {model_id}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
-            
-    async def transcribe(self, file_path: str) -> str:
-        """Unified transcription method for all model types"""
-        try:
-            model_type = self.config["type"]
-            if model_type == "pipeline":
-                print("Using pipeline transcription")
-                result = await asyncio.to_thread(
-                    self.pipeline, 
-                    file_path
-                )
-                transcription = result["text"]
-                print(f"Pipeline transcription: {transcription}")
-                return transcription
-            
-            print(f"Transcribing with custom model type: {model_type}")
-            audio, sr = await asyncio.to_thread(librosa.load, file_path, sr=16000, mono=True)
-            print(f"Loaded audio: {len(audio)} samples, {sr}Hz")
-
-            inputs = self.processor(audio, sampling_rate=16000, return_tensors="pt")
+# br/gzip for complete responses above RESPONSE_COMPRESS_MIN_BYTES; streams pass through
+app.add_middleware(CompressionMiddleware)
+
+# Identical uploads (driver app retries) are served from here instead of re-running denoise + ASR
+TRANSCRIPT_CACHE = AsyncLRUCache(max_entries=256, ttl_seconds=600.0)
+
+# "speculative" transcribes raw speech alongside denoising; "sequential" waits for the denoiser
+ASR_DECODE_MODE = os.getenv("ASR_DECODE_MODE", "speculative")
+
+def pipeline_versions(country: Optional[str], routing: str = "auto", decode_mode: str = ASR_DECODE_MODE,
+                      profile: str = "accurate") -> tuple:
+    """Model identifiers that feed into a cached transcript; changing any of them invalidates the cache"""
+    versions = ("faster-whisper-tiny", "deepfilternet", f"routing:{routing}", f"decode:{decode_mode}", f"profile:{profile}")
+    if routing == "auto":
+        # Any country model may be picked by language ID
+        versions += tuple(config["model_id"] for config in COUNTRY_MODELS.values())
+    elif country in COUNTRY_MODELS:
+        versions += (COUNTRY_MODELS[country]["model_id"],)
+    return versions
+
+def is_cacheable_transcript(result: dict) -> bool:
+    """Failed model runs are returned to the caller but never cached"""
+    if result["base_result"] in ("Transcription failed", "Base model transcription failed"):
+        return False
+    return not (result["country_model_ran"] and result["fine_tuned_result"] is None)
+
+# Short uploads first try the driver command grammar before the full pipeline and the agent
+COMMAND_FAST_PATH = os.getenv("COMMAND_FAST_PATH", "1") != "0"
+
+# Admin endpoints require this token in X-Admin-Token; without it they are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Warm-up runs synthetic clips through every model before /ready reports ready
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") != "0"
+
+# Flipped by startup once models are loaded and warmed; the load balancer polls /ready
+readiness = {"ready": False, "stage": "starting", "warmup": None, "error": None, "failed_models": []}
+# Without these a replica cannot serve any request, so failing their warm-up keeps it unready
+REQUIRED_WARMUP_TARGETS = ("denoiser", "base_model")
+# Background startup work, referenced here so the event loop cannot drop a task mid-load
+startup_tasks = set()
+
+# Continuous listening: <keyword>[_N].wav recordings in this directory are the wake words
+KWS_TEMPLATE_DIR = os.getenv("KWS_TEMPLATE_DIR", str(PROJECT_ROOT / "keyword_templates"))
+# A command ends after this much silence, or at the latest after KWS_CAPTURE_SECONDS
+KWS_CAPTURE_SECONDS = float(os.getenv("KWS_CAPTURE_SECONDS", 8.0))
+KWS_END_SILENCE_MS = int(os.getenv("KWS_END_SILENCE_MS", 800))
+KWS_STATS_INTERVAL_SECONDS = 10.0
+keyword_templates = {}
+GATING_STATS = GatingStats()
+
+@app.middleware("http")
+async def count_diagnosed_requests(request: Request, call_next):
+    """Profiler and memory tracker budgets are counted in finished uploads.
+
+    Only successful uploads count (not 503s the client retries), and only once
+    the whole body has been sent, since call_next returns a streaming response
+    as soon as its headers are ready.
+    """
+    response = await call_next(request)
+    if request.url.path.startswith("/upload/") and response.status_code < 400:
+        body = response.body_iterator
 
-            model_dtype = next(self.model.parameters()).dtype
-            input_features = inputs.input_features.to(device=self.device, dtype=model_dtype)
-            
-            generation_kwargs = {}
+        async def counted_body():
+            async for chunk in body:
+                yield chunk
+            PROFILER.request_finished()
+            MEMORY_TRACKER.request_finished()
 
-            if model_type == "malaysian":
-                generation_kwargs["language"] = "ms" 
-            elif model_type == "thai":
-                generation_kwargs["language"] = "th"
-                generation_kwargs["max_new_tokens"] = 255
-            else:
-                generation_kwargs["language"] = self.config["language"]
-            generation_kwargs["task"] = "transcribe"
-            use_amp = self.device == "cuda"
-            with torch.no_grad():
-                if use_amp:
-                    with torch.amp.autocast(device_type='cuda'):
-                        generated = await asyncio.to_thread(
-                            self.model.generate,
-                            input_features,
-                            **generation_kwargs
-                        )
-                else:
-                    generated = await asyncio.to_thread(
-                        self.model.generate,
-                        input_features,
-                        **generation_kwargs
-                    )
-            transcription = self.processor.batch_decode(
-                generated, 
-                skip_special_tokens=True
-            )[0]
-            print(f"{model_type.capitalize()} model transcription: {transcription}")
-            return transcription
-        except Exception as e:
-            print(f"Error in {self.config['name']} transcription: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
-
-# Initialize model handlers
-model_handlers = {}
-
-async def initialize_models():
-    """Initialize all models asynchronously"""
-    print("Initializing models...")
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    compute_type = "float16" if device == "cuda" else "int8"
-    print(f"Using device: {device}, compute type: {compute_type}")
-    print("Loading base Whisper model...")
-    global base_model
-    try:
-        model_path = str(PROJECT_ROOT / "models" / "whisper")
-        print(f"Loading faster-whisper model from: {model_path}")
-        print(f"Model directory exists: {os.path.exists(model_path)}")
-        print(f"Model directory contents: {os.listdir(model_path) if os.path.exists(model_path) else 'Directory does not exist'}")
-        base_model = WhisperModel(
-            "tiny", 
-            device=device,
-            compute_type=compute_type,
-            download_root=str(PROJECT_ROOT / "models" / "whisper")
-        )
-        print("Base model loaded successfully")
-    except Exception as e:
-        print(f"Error loading base model: {str(e)}")
-        raise RuntimeError("Failed to load base Whisper model")
-    for country, config in COUNTRY_MODELS.items():
-        model_specific_cache = MODEL_CACHE_DIR / config["model_id"].replace('/', '_')
-        if config.get("use_faster_whisper", False):
-            handler = FasterWhisperHandler(config, model_specific_cache)
-        else:
-            handler = ModelHandler(config, model_specific_cache)
-        await handler.load()
-        model_handlers[country] = handler
-    print("Model initialization complete")
-
-def optimize_gpu_memory():
-    """Configure PyTorch for optimal GPU memory usage"""
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-        try:
-            import gc
-            gc.collect()
-        except Exception as e:
-            print(f"Could not optimize GPU memory: {str(e)}")
+        response.body_iterator = counted_body()
+    return response
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize models when the FastAPI app starts"""
+    """Start loading models in the background; the server accepts connections right away"""
     global multi_agent_system
-    
-    # Initialize existing models
-    optimize_gpu_memory()
-    await initialize_models()
-    
-    # Initialize the multi-agent system
-    print("Initializing Gemini multi-agent system...")
-    # multi_agent_system = MultiAgentSystem()
-    print("Multi-agent system initialized successfully")
 
-async def transcribe_with_base_model(file_path: str):
-    """Transcribe audio using the faster-whisper model"""
-    try:
-        print("Starting base model transcription...")
-        segments, info = await asyncio.to_thread(
-            base_model.transcribe,
-            file_path,
-            beam_size=5,
-            language="en",
-            task="transcribe",
-            vad_filter=True,
-        )
-        transcript = " ".join(segment.text for segment in segments)
-        print(f"Base model transcription complete: {transcript}")
-        print(f"Detected language: {info.language} with probability {info.language_probability:.2f}")
-        return transcript
-    except Exception as e:
-        print(f"Error in base model transcription: {str(e)}")
+    # Initialize the multi-agent system
+    # AGENT_BACKEND selects the Gemini agents, the local stand-in or none
+    print("Initializing multi-agent system...")
+    multi_agent_system = create_agent_backend()
+    print(f"Multi-agent system: {type(multi_agent_system).__name__ if multi_agent_system else 'disabled'}")
+
+    keyword_templates.update(load_templates(KWS_TEMPLATE_DIR))
+    print(f"Keyword templates: {', '.join(f'{k} ({len(v)})' for k, v in keyword_templates.items()) or 'none'}")
+
+    task = asyncio.create_task(load_engine())
+    startup_tasks.add(task)
+    task.add_done_callback(startup_task_done)
+
+def startup_task_done(task: asyncio.Task):
+    """Anything load_engine did not handle itself marks the replica failed instead of vanishing"""
+    startup_tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"Startup task failed: {error!r}")
         import traceback
-        traceback.print_exc()
-        return "Base model transcription failed"
-
-async def transcribe_with_fine_tuned_model(file_path: str, country: str):
+        traceback.print_exception(type(error), error, error.__traceback__)
+        readiness.update(ready=False, stage="failed", error=repr(error))
+
+async def load_engine():
+    """Import the inference engine, load its models, then warm up"""
+    global engine
+    readiness["stage"] = "loading_models"
+    start_time = time.time()
     try:
-        if country not in model_handlers:
-            print(f"No model handler found for country: {country}")
-            return None
-        handler = model_handlers[country]
-        if handler is None:
-            print(f"Model handler is None for country: {country}")
-            return None
-        result = await handler.transcribe(file_path)
-        if result is None:
-            print(f"Transcription failed for {country}")
-            return None
-        return result
+        # The import itself takes seconds (torch, transformers, DeepFilterNet); keep it off the event loop
+        module = await asyncio.to_thread(importlib.import_module, "engine")
+        print(f"Inference engine imported in {time.time() - start_time:.2f}s")
+        await module.start()
     except Exception as e:
-        print(f"Error in fine-tuned transcription: {str(e)}")
+        print(f"Error loading inference engine: {str(e)}")
         import traceback
         traceback.print_exc()
-        return None
-# Add this import at the top with your other imports
-
-
-def calculate_snr(original_audio, enhanced_audio):
-    """
-    Calculate Signal-to-Noise Ratio (SNR) between original and enhanced audio.
-    Higher SNR values indicate better noise reduction.
-    """
-    blend_ratio = 0.7  # Adjust between 0.0 (all original) and 1.0 (all enhanced)
-
-    # Make sure arrays are 1D
-    original_audio = original_audio.squeeze()
-    enhanced_audio = enhanced_audio.squeeze()
-    
-    # Ensure we're using float64 for precision
-    original_audio = original_audio.astype(np.float64)
-    enhanced_audio = enhanced_audio.astype(np.float64)
-    
+        readiness.update(stage="failed", error=repr(e))
+        return
+    engine = module
+    print(f"Models loaded in {time.time() - start_time:.2f}s")
+    await warm_up_models()
+
+async def warm_up_models():
+    """Run synthetic clips through every loaded model, then mark the replica ready"""
+    if not WARMUP_ENABLED:
+        readiness.update(ready=True, stage="ready")
+        return
+    readiness["stage"] = "warming_up"
+    print("Warming up models...")
     try:
-        # Method 1: Calculate SNR using direct noise estimation
-        # Estimate noise by subtracting enhanced from original
-        # This assumes enhanced audio has less noise and preserves the signal
-        estimated_noise = original_audio - enhanced_audio
-        
-        # Calculate power of original signal, enhanced signal, and estimated noise
-        original_power = np.mean(original_audio ** 2)
-        enhanced_power = np.mean(enhanced_audio ** 2)
-        noise_power = np.mean(estimated_noise ** 2)
-        
-        # Safety checks for division
-        if noise_power < 1e-10:
-            noise_power = 1e-10
-            
-        # Calculate SNR for original (signal + noise) / noise
-        # Using the estimated noise
-        snr_before = 10 * np.log10(original_power / noise_power)
-        
-        # For enhanced, we use a different formula that accounts for the
-        # fact that enhanced audio should have less noise
-        # We estimate enhanced SNR differently - it should have less noise content
-        remaining_noise_factor = 0.3  # Assume denoising removed about 70% of noise
-        estimated_enhanced_noise = noise_power * remaining_noise_factor
-        
-        if estimated_enhanced_noise < 1e-10:
-            estimated_enhanced_noise = 1e-10
-            
-        snr_after = 10 * np.log10(enhanced_power / estimated_enhanced_noise)
-        
-        # Method 2: Backup using spectral contrast
-        try:
-            # This uses a completely different approach using spectral features
-            orig_contrast = librosa.feature.spectral_contrast(y=original_audio, sr=16000)
-            enh_contrast = librosa.feature.spectral_contrast(y=enhanced_audio, sr=16000)
-            
-            # Higher mean contrast typically indicates better speech intelligibility
-            orig_contrast_mean = np.mean(orig_contrast)
-            enh_contrast_mean = np.mean(enh_contrast)
-            
-            # Map contrast to estimated SNR using empirical formula
-            contrast_snr_before = 10 * np.log10(max(0.001, orig_contrast_mean)) + 20
-            contrast_snr_after = 10 * np.log10(max(0.001, enh_contrast_mean)) + 20
-            
-            # If method 1 gave similar values, use method 2 instead
-            if abs(snr_after - snr_before) < 1.0:
-                snr_before = contrast_snr_before
-                snr_after = contrast_snr_after
-        except Exception as e:
-            print(f"Spectral contrast calculation failed: {e}")
-            # Continue with method 1 results
-        
-        # Calculate improvement and ensure results are sensible
-        snr_improvement = snr_after - snr_before
-        
-        # Clip to reasonable ranges
-        snr_before = max(0, min(30, snr_before))
-        snr_after = max(0, min(30, snr_after))
-        
-        # Ensure SNR after is at least slightly better than before
-        if snr_after <= snr_before:
-            snr_after = snr_before + blend_ratio * 3  # 0-3dB improvement based on blend ratio
-            snr_improvement = snr_after - snr_before
-        
-        return snr_before, snr_after, snr_improvement
-        
+        readiness["warmup"] = await engine.warm_up()
+        print(f"Warm-up complete in {readiness['warmup']['total_seconds']:.2f}s")
     except Exception as e:
-        print(f"Error calculating SNR: {e}")
+        # A warm-up that could not run only costs latency, so the replica still goes ready
+        print(f"Warm-up failed: {str(e)}")
         import traceback
         traceback.print_exc()
-        # Fallback values - assume modest improvement
-        return 8.0, 12.0, 4.0
-      
-class AudioDenoiser:
-    def __init__(self, sample_rate: int = 48000, chunk_size_seconds: float = 5.0):
-        self.sample_rate = sample_rate
-        print(f"DeepFilterNet initialized with {sample_rate}Hz sample rate")
-        # Initialize DeepFilterNet model - this can be done once at startup
-        self.df_model, self.df_state, _ = init_df()
-        print("DeepFilterNet model loaded successfully")
-        
-    async def process_audio(self, file_path: str, output_format: str = 'wav') -> dict:
-        try:
-            print("\n=== Starting Audio Processing with DeepFilterNet ===")
-            print(f"Input file: {file_path}")
-            temp_dir = os.path.dirname(file_path)
-            wav_path = os.path.join(temp_dir, f'temp_{os.path.basename(file_path)}_{int(time.time())}.wav')
-            
-            # Convert to standard WAV format
-            print("Converting to WAV...")
-            result = subprocess.run([
-                'ffmpeg',
-                '-i', file_path,
-                '-acodec', 'pcm_s16le',
-                '-ar', str(self.sample_rate),
-                '-ac', '1',
-                wav_path
-            ], capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                raise Exception(f"FFmpeg conversion failed: {result.stderr}")
-            
-            # Load the audio file using DeepFilterNet's loader
-            print("Loading audio for processing...")
-            audio_data, metadata = load_audio(wav_path)
-            
-            sample_rate = metadata.sample_rate if hasattr(metadata, 'sample_rate') else self.sample_rate
-            print(f"Loaded audio with sample rate: {sample_rate}")
-            
-            original_audio_numpy = audio_data.cpu().numpy()
-            
-            # Calculate original energy for metrics
-            original_energy = torch.sum(audio_data ** 2).item()
-            num_samples = audio_data.shape[0]
-            
-            # Process the audio with DeepFilterNet
-            print(f"Enhancing audio with DeepFilterNet ({num_samples} samples)...")
-            
-            blend_ratio = 0.7  # Adjust between 0.0 (all original) and 1.0 (all enhanced)
-
-            enhanced_audio = await asyncio.to_thread(
-                enhance,
-                self.df_model,  
-                self.df_state, 
-                audio_data,
-                sample_rate
-            )
-            # Blend the enhanced audio with original for less aggressive denoising
-            print(f"Blending audio with ratio {blend_ratio} (higher = more denoising)")
-
-            # Ensure both tensors have the same shape
-            if audio_data.shape != enhanced_audio.shape:
-                min_length = min(audio_data.shape[0], enhanced_audio.shape[0])
-                audio_data = audio_data[:min_length]
-                enhanced_audio = enhanced_audio[:min_length]
-                original_audio_numpy = original_audio_numpy[:min_length]
-
-            # Apply linear interpolation between original and enhanced audio
-            blended_audio = blend_ratio * enhanced_audio + (1 - blend_ratio) * audio_data
-            enhanced_audio = blended_audio  # Replace the enhanced audio with the blended version
-
-            enhanced_audio_numpy = enhanced_audio.cpu().numpy()
-            # Calculate enhanced audio energy for metrics
-            enhanced_energy = torch.sum(enhanced_audio ** 2).item()
-
-            # An integer is required
-            int_sample_rate = int(sample_rate)
-
-            stoi_score = None
-            try:
+    errors = (readiness["warmup"] or {}).get("errors", {})
+    broken = [name for name in REQUIRED_WARMUP_TARGETS if name in errors]
+    if broken:
+        readiness.update(stage="failed", error=f"Warm-up failed for {', '.join(broken)}: {errors[broken[0]]}")
+        return
+    # A broken country model is left out of /ready's country_models, so the router sends its traffic elsewhere
+    readiness["failed_models"] = [country for country in engine.model_handlers if f"{country}_model" in errors]
+    readiness.update(ready=True, stage="ready")
+
+def engine_unavailable(request_id: str) -> Optional[JSONResponse]:
+    """503 while the models are still loading, so clients and the gateway retry elsewhere"""
+    if engine is not None:
+        return None
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Models are still loading", "stage": readiness["stage"], "request_id": request_id},
+        headers={"Retry-After": "5"}
+    )
+
+async def decode_and_trim(temp_path: str, request_id: str):
+    """Decode the upload once and drop silence before any expensive stage runs"""
+    pcm, decoder = await asyncio.to_thread(decode_audio_file, temp_path, 16000)
+    speech, vad_stats = await asyncio.to_thread(trim_silence, pcm, 16000)
+    print(f"Request {request_id}: Decoded {len(pcm) / 16000:.2f}s of audio with {decoder}")
+    print(f"Request {request_id}: VAD kept {vad_stats['kept_duration']:.2f}s of {vad_stats['original_duration']:.2f}s "
+          f"({vad_stats['speech_ratio'] * 100:.1f}% speech)")
+    speech_path = None
+    if vad_stats["has_speech"]:
+        speech_path = os.path.join(os.path.dirname(temp_path), 'speech.wav')
+        await asyncio.to_thread(sf.write, speech_path, speech, 16000, subtype='PCM_16')
+    return pcm, speech, speech_path, vad_stats
 
-                if isinstance(original_audio_numpy, torch.Tensor):
-                    original_audio_numpy = original_audio_numpy.cpu().numpy()
-    
-                if isinstance(enhanced_audio_numpy, torch.Tensor):
-                    enhanced_audio_numpy = enhanced_audio_numpy.cpu().numpy()
-
-
-                original_audio_numpy = original_audio_numpy.squeeze()
-                enhanced_audio_numpy = enhanced_audio_numpy.squeeze()
-                
-                print(f"Audio shapes for STOI - Original: {original_audio_numpy.shape}, Enhanced: {enhanced_audio_numpy.shape}")
-                
-                # Check for extremely small values which might indicate data type issues
-                if np.abs(original_audio_numpy).max() < 1e-6:
-                    print("WARNING: Original audio has extremely small values, might cause STOI calculation issues")
-                
-
-                # STOI requires signals of sufficient length (at least 30ms)
-                min_samples = int(0.03 * int_sample_rate)  # 30ms minimum
-                
-                if len(original_audio_numpy) >= min_samples and len(enhanced_audio_numpy) >= min_samples:
-                    # Ensure same length
-                    min_len = min(len(original_audio_numpy), len(enhanced_audio_numpy))
-                    
-                    # If audio is very short but still meets minimum, use extended mode
-                    use_extended = min_len < int(0.25 * int_sample_rate)  # Use extended for < 250ms
-                    
-                    stoi_score = stoi(
-                        original_audio_numpy[:min_len], 
-                        enhanced_audio_numpy[:min_len], 
-                        int_sample_rate, 
-                        extended=use_extended  # Use extended mode for very short samples
-                    )
-                    print(f"STOI Score: {stoi_score:.4f} (higher is better, range 0-1)")
-                    print(f"Audio length used for STOI: {min_len / int_sample_rate:.3f} seconds")
-                else:
-                    print(f"Audio too short for STOI calculation: {len(original_audio_numpy)} samples")
-                    print(f"Minimum required: {min_samples} samples ({min_samples / int_sample_rate:.3f} seconds)")
-            except Exception as e:
-                print(f"Error calculating STOI: {str(e)}")
-                stoi_score = None
-            # Save the enhanced audio
-            output_path = wav_path.replace('.wav', '_denoised.wav')
-            await asyncio.to_thread(save_audio, output_path, enhanced_audio, int_sample_rate)
-            
-            # Calculate metrics
-            if num_samples > 0:
-                original_rms = np.sqrt(original_energy / num_samples)
-                enhanced_rms = np.sqrt(enhanced_energy / num_samples)
-                noise_reduction = original_rms - enhanced_rms if original_rms > enhanced_rms else 0
-            else:
-                original_rms = enhanced_rms = noise_reduction = 0
-            
-            snr_before, snr_after, snr_improvement = calculate_snr(original_audio_numpy, enhanced_audio_numpy)
-                
-            print("\n=== Processing Complete ===")
-            print(f"Saved to: {output_path}")
-            print(f"Original RMS: {original_rms:.4f}")
-            print(f"Enhanced RMS: {enhanced_rms:.4f}")
-            reduction_percentage = (noise_reduction / original_rms) * 100 if original_rms != 0 else 0
-            print(f"Noise Reduction: {reduction_percentage:.4f}%")
-            print(f"SNR Before: {snr_before:.2f} dB")
-            print(f"SNR After: {snr_after:.2f} dB")
-            print(f"SNR Improvement: {snr_improvement:.2f} dB")
-            # Cleanup
-            if os.path.exists(wav_path):
-                os.unlink(wav_path)
-                
-            return {
-                "output_path": output_path,
-                "metrics": {
-                    "original_rms": float(original_rms),
-                    "enhanced_rms": float(enhanced_rms),
-                    "noise_reduction": float(noise_reduction),
-                    "noise_reduction_percentage": float(reduction_percentage),
-                    "stoi": float(stoi_score) if stoi_score is not None else None,
-                    "snr_before": float(snr_before),
-                    "snr_after": float(snr_after),
-                    "snr_improvement": float(snr_improvement)
-                }
-            }
-        except Exception as e:
-            if 'wav_path' in locals() and os.path.exists(wav_path):
-                os.unlink(wav_path)
-            print(f"Error in audio processing with DeepFilterNet: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise
-            
 @app.post("/upload/")
 async def upload_and_process_audio(
+    request: Request,
     file: UploadFile = File(...),
     country: str = Form(None),
     ride_context: str = Form(None),
-    conversation_context: str = Form(None)
+    conversation_context: str = Form(None),
+    response_format: str = Form(None),
+    routing: str = Form("auto"),
+    decode_mode: str = Form(None),
+    fast_path: str = Form("auto"),
+    profile: str = Form(None),
+    latency_budget_ms: Optional[float] = Form(None)
 ):
-    """Process uploaded audio: denoise and transcribe in one endpoint"""
+    """Process uploaded audio: denoise and transcribe in one endpoint.
+
+    response_format="compact" (or the X-Response-Format header) returns only the
+    transcript; Accept: application/msgpack or application/cbor selects a
+    binary encoding. routing="dual" restores running both the base and the
+    country model on every request; only then can the agent call start
+    speculatively on the base transcript. decode_mode ("speculative" or "sequential",
+    default ASR_DECODE_MODE) chooses whether the base model may keep its
+    transcript of the raw audio instead of waiting for the denoiser.
+    Speech up to COMMAND_MAX_SECONDS is first matched against the country's
+    command grammar; a confident match is returned as "intent" right away
+    (fast_path="off" skips this, as do countries whose language the grammar
+    does not cover).
+    profile ("realtime", "balanced" or "accurate") sets beam size, temperature
+    fallback, token limit, chunking and whether a country model runs; without
+    one the server picks a profile from latency_budget_ms and the current
+    queue depth. The response echoes the choice as "decoding_profile".
+    """
     request_id = f"req_{int(time.time())}_{os.urandom(4).hex()}"
     print(f"\n=== REQUEST {request_id} - Audio Upload ===")
     print(f"Country context: {country}")
     print(f"File name: {file.filename}")
+    unavailable = engine_unavailable(request_id)
+    if unavailable:
+        return unavailable
     
     # Track processing stages and timing
     stages = {
@@ -631,11 +270,11 @@ async def upload_and_process_audio(
     }
     
     temp_path = None
-    denoised_path = None
+    speculation = None
     
     try:
         # Optimize memory before processing
-        optimize_gpu_memory()
+        engine.optimize_gpu_memory()
         
         # Create temp directory with context manager for auto-cleanup
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -646,50 +285,80 @@ async def upload_and_process_audio(
                 f.write(content)
             print(f"Saved audio file ({len(content)/1024:.2f} KB) to: {temp_path}")
             stages["received"] = True
-            
-            # Step 1: Denoise the audio with timeout protection
-            print(f"Request {request_id}: Starting audio denoising...")
-            try:
-                denoising_task = asyncio.create_task(
-                    asyncio.wait_for(
-                        AudioDenoiser(sample_rate=16000, chunk_size_seconds=0.5).process_audio(temp_path),
-                        timeout=60.0  # 60 second timeout for denoising
-                    )
+
+            with MEMORY_TRACKER.stage(request_id, "decode_vad"):
+                pcm, speech, speech_path, vad_stats = await decode_and_trim(temp_path, request_id)
+            if not vad_stats["has_speech"]:
+                print(f"Request {request_id}: No speech detected, skipping denoising and transcription")
+                return JSONResponse(
+                    status_code=422,
+                    content={"error": "No speech detected", "vad": vad_stats, "request_id": request_id}
                 )
-                denoised_result = await denoising_task
-                denoised_path = denoised_result["output_path"]
-                print(f"Request {request_id}: Audio denoised in {time.time() - stages['start_time']:.2f}s")
-                stages["denoised"] = True
-            except asyncio.TimeoutError:
-                raise Exception("Audio denoising timed out - file may be too large or complex")
-            
-            # Step 2: Start transcription immediately after denoising
-            print(f"Request {request_id}: Starting transcription...")
-            try:
-                transcription_tasks = [
-                    asyncio.create_task(transcribe_with_base_model(denoised_path))
-                ]
-                
-                if country in model_handlers:
-                    transcription_tasks.append(
-                        asyncio.create_task(transcribe_with_fine_tuned_model(denoised_path, country))
-                    )
-                
-                # Wait for all transcriptions with timeout
-                results = await asyncio.wait_for(
-                    asyncio.gather(*transcription_tasks, return_exceptions=True),
-                    timeout=120.0  # 2 minute timeout for transcription
+
+            # Retried uploads decode to the same PCM, so key the cache on the samples
+            routing = "dual" if routing == "dual" else "auto"
+            decoding = BUDGETER.select(profile, latency_budget_ms, vad_stats["kept_duration"])
+            settings = decoding["settings"]
+            if decode_mode not in ("speculative", "sequential"):
+                decode_mode = settings["decode_mode"] or ASR_DECODE_MODE
+            cache_key = fingerprint_pcm(pcm, country or "", *pipeline_versions(country, routing, decode_mode, decoding["name"]))
+
+            # A cached transcript of a retried upload is cheaper than even the command decode
+            intent = None
+            if (COMMAND_FAST_PATH and fast_path != "off" and fast_path_available(country)
+                    and vad_stats["kept_duration"] <= COMMAND_MAX_SECONDS
+                    and TRANSCRIPT_CACHE.get(cache_key) is None):
+                with MEMORY_TRACKER.stage(request_id, "command"):
+                    decoded = await engine.decode_command(speech, country, request_id)
+                intent = recognize_command(decoded["text"], decoded["confidence"], country)
+                print(f"Request {request_id}: Command fast path {'hit' if intent['accepted'] else 'miss'} "
+                      f"({intent['intent']}, score {intent['score']}, reason {intent['reason']})")
+                if intent["accepted"]:
+                    elapsed_time = time.time() - stages["start_time"]
+                    print(f"Request {request_id}: Processing complete in {elapsed_time:.2f} seconds")
+                    return encode_response({
+                        "intent": intent,
+                        "base_model": {
+                            "text": decoded["text"],
+                            "model": "faster-whisper-tiny"
+                        },
+                        "fine_tuned_model": None,
+                        "country": country,
+                        "routing": {"target": "command", "reason": "command_grammar"},
+                        "decode_path": "command",
+                        "transcript_language": identify_text_language(decoded["text"]),
+                        "processing_time": f"{elapsed_time:.2f} seconds",
+                        "vad": vad_stats,
+                        "request_id": request_id
+                    }, request, response_format)
+
+            print(f"Request {request_id}: Decoding profile {decoding['name']} ({decoding['reason']}, "
+                  f"queue depth {decoding['queue_depth']}, estimated {decoding['estimated_seconds']}s)")
+            # With routing="dual" the follow-up agent call can start on the base transcript before the
+            # country model finishes; "auto" runs a single model, so the agent waits for its transcript
+            if conversation_context and multi_agent_system:
+                speculation = AgentSpeculation(multi_agent_system, parse_ride_context(ride_context))
+            on_base_transcript = speculation.start if speculation and routing == "dual" else None
+            pipeline_start = time.time()
+            with BUDGETER.track():
+                result, cache_status = await TRANSCRIPT_CACHE.get_or_compute(
+                    cache_key,
+                    lambda: engine.denoise_and_transcribe(
+                        speech_path, speech, country, request_id, stages, routing,
+                        on_base_transcript=on_base_transcript,
+                        decode_mode=decode_mode,
+                        profile=settings
+                    ),
+                    should_cache=is_cacheable_transcript
                 )
-                
-                # Process results
-                base_result = results[0] if not isinstance(results[0], Exception) else "Transcription failed"
-                fine_tuned_result = results[1] if len(results) > 1 and not isinstance(results[1], Exception) else None
-                
-                print(f"Request {request_id}: Transcription completed in {time.time() - stages['start_time']:.2f}s")
-                stages["transcribed"] = True
-            except asyncio.TimeoutError:
-                raise Exception("Transcription timed out - audio may be too long or complex")
-            
+            if cache_status == "miss":
+                BUDGETER.record(decoding["name"], vad_stats["kept_duration"], time.time() - pipeline_start, decoding["queue_depth"])
+            print(f"Request {request_id}: Transcript cache {cache_status} ({cache_key[:12]})")
+            stages["denoised"] = stages["transcribed"] = True
+            base_result = result["base_result"]
+            fine_tuned_result = result["fine_tuned_result"]
+            model_country = result["country_model"]
+
             # Generate response
             elapsed_time = time.time() - stages["start_time"]
             print(f"Request {request_id}: Processing complete in {elapsed_time:.2f} seconds")
@@ -701,12 +370,20 @@ async def upload_and_process_audio(
                 },
                 "fine_tuned_model": {
                     "text": fine_tuned_result,
-                    "model_name": COUNTRY_MODELS[country]["name"] if country in COUNTRY_MODELS else None,
-                    "model_id": COUNTRY_MODELS[country]["model_id"] if country in COUNTRY_MODELS else None
+                    "model_name": COUNTRY_MODELS[model_country]["name"],
+                    "model_id": COUNTRY_MODELS[model_country]["model_id"],
+                    "country": model_country
             } if fine_tuned_result else None,
                 "country": country,
+                "routing": result["routing"],
+                "decode_path": result["decode_path"],
+                "decoding_profile": {k: v for k, v in decoding.items() if k != "settings"},
+                "transcript_language": identify_text_language(fine_tuned_result or base_result or ""),
                 "processing_time": f"{elapsed_time:.2f} seconds",
-                "denoising_metrics": denoised_result["metrics"],
+                "denoising_metrics": result["denoising_metrics"],
+                "vad": vad_stats,
+                "cache": cache_status,
+                "intent": intent,
                 "request_id": request_id
             }
             
@@ -715,27 +392,23 @@ async def upload_and_process_audio(
             stages["complete"] = True
             
 
-            if conversation_context and multi_agent_system and stages["transcribed"]:
+            if speculation and stages["transcribed"]:
                 try:
                     # Use the fine-tuned result if available, otherwise use base result
                     transcript_text = fine_tuned_result or base_result
                     
-                    # Parse context
-                    ride_context_dict = json.loads(ride_context) if ride_context else {}
-                    
-                    # Process with multi-agent system
-                    agent_response = await multi_agent_system.process_query(
-                        transcript_text,
-                        ride_context=ride_context_dict,
-                        current_location=None  # You could extract this from context if needed
-                    )
+                    # Process with multi-agent system, reusing the speculative call when the transcript agrees
+                    with MEMORY_TRACKER.stage(request_id, "agent"):
+                        agent_response = await speculation.resolve(transcript_text)
+                    print(f"Request {request_id}: Agent speculation {speculation.outcome}")
                     
                     # Add agent response to the output
                     response_data["agent_response"] = {
                         "content": agent_response.content,
                         "agent_type": agent_response.agent_type,
                         "agent_name": agent_response.agent_name,
-                        "metadata": agent_response.metadata
+                        "metadata": agent_response.metadata,
+                        "speculation": speculation.outcome
                     }
                 except Exception as e:
                     print(f"Error processing with multi-agent system: {str(e)}")
@@ -743,12 +416,11 @@ async def upload_and_process_audio(
                         "error": "Failed to get agent response",
                         "message": str(e)
                     }
-            return JSONResponse(
-                content=jsonable_encoder(response_data),
-                headers={"Content-Type": "application/json; charset=utf-8"}
-            )
+            return encode_response(response_data, request, response_format)
         
     except Exception as e:
+        if speculation:
+            speculation.cancel()
         failed_stage = [k for k, v in stages.items() if v == False][0] if stages else "unknown"
         print(f"Request {request_id} failed at stage: {failed_stage}")
         print(f"Error: {str(e)}")
@@ -772,22 +444,257 @@ async def upload_and_process_audio(
                 content={"error": "Server error", "message": str(e), "request_id": request_id}
             )
 
+@app.post("/upload/stream/")
+async def upload_and_stream_transcript(
+    file: UploadFile = File(...),
+    country: str = Form(None),
+    max_chars: Optional[int] = Form(None),
+    early_exit: bool = Form(True),
+    profile: str = Form(None)
+):
+    """Denoise uploaded audio and stream transcript segments as NDJSON while they are decoded"""
+    request_id = f"stream_{int(time.time())}_{os.urandom(4).hex()}"
+    print(f"\n=== REQUEST {request_id} - Streaming Audio Upload ===")
+    print(f"Country context: {country}")
+    unavailable = engine_unavailable(request_id)
+    if unavailable:
+        return unavailable
+    content = await file.read()
+
+    def line(payload: dict) -> str:
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    async def event_stream():
+        start_time = time.time()
+        # The temp dir has to live inside the generator: it outlives the endpoint call
+        with tempfile.TemporaryDirectory() as temp_dir:
+            try:
+                temp_path = os.path.join(temp_dir, 'input.wav')
+                with open(temp_path, 'wb') as f:
+                    f.write(content)
+
+                _, speech, speech_path, vad_stats = await decode_and_trim(temp_path, request_id)
+                yield line({"type": "vad", **vad_stats, "request_id": request_id})
+                if not vad_stats["has_speech"]:
+                    yield line({"type": "final", "text": "", "stop_reason": "no_speech", "request_id": request_id})
+                    return
+
+                denoised_result = await asyncio.wait_for(
+                    engine.audio_denoiser.process_audio(speech, temp_dir),
+                    timeout=60.0
+                )
+                denoised_path = denoised_result["output_path"]
+                yield line({"type": "denoised", "metrics": denoised_result["metrics"], "request_id": request_id})
+
+                stop_keywords = command_keywords(country) if early_exit else ()
+                decoding = BUDGETER.select(profile, None, vad_stats["kept_duration"])
+                settings = decoding["settings"]
+                handler = engine.model_handlers.get(country)
+                if isinstance(handler, engine.FasterWhisperHandler) and settings["country_model"]:
+                    model_name = COUNTRY_MODELS[country]["name"]
+                    stream = handler.stream(denoised_path, stop_keywords=stop_keywords, max_chars=max_chars, profile=settings)
+                else:
+                    model_name = "faster-whisper-tiny"
+                    stream = engine.stream_with_base_model(
+                        denoised_path, stop_keywords=stop_keywords, max_chars=max_chars, profile=settings
+                    )
+
+                async for segment in stream:
+                    segment["elapsed"] = round(time.time() - start_time, 3)
+                    yield line({"type": "segment", **segment})
+
+                elapsed_time = time.time() - start_time
+                print(f"Request {request_id}: Streamed {len(stream.segments)} segments in {elapsed_time:.2f}s ({stream.stop_reason})")
+                yield line({
+                    "type": "final",
+                    "text": stream.text,
+                    "model": model_name,
+                    "stop_reason": stream.stop_reason,
+                    "matched_keyword": stream.matched_keyword,
+                    "decoding_profile": decoding["name"],
+                    "language": stream.info.language if stream.info else None,
+                    "country": country,
+                    "processing_time": f"{elapsed_time:.2f} seconds",
+                    "request_id": request_id
+                })
+            except Exception as e:
+                print(f"Request {request_id} streaming failed: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                yield line({"type": "error", "message": str(e), "request_id": request_id})
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+async def transcribe_command(command: np.ndarray, country: Optional[str], request_id: str) -> dict:
+    """Denoise and transcribe the audio captured after a keyword"""
+    speech, vad_stats = await asyncio.to_thread(trim_silence, command, KWS_SAMPLE_RATE)
+    if not vad_stats["has_speech"]:
+        return {"type": "transcript", "text": "", "vad": vad_stats, "request_id": request_id}
+    stages = {"start_time": time.time(), "received": True, "denoised": False, "transcribed": False, "complete": False}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        speech_path = os.path.join(temp_dir, 'speech.wav')
+        await asyncio.to_thread(sf.write, speech_path, speech, KWS_SAMPLE_RATE, subtype='PCM_16')
+        result = await engine.denoise_and_transcribe(speech_path, speech, country, request_id, stages)
+    text = result["fine_tuned_result"] or result["base_result"]
+    print(f"Request {request_id}: Command transcript: {text}")
+    return {
+        "type": "transcript",
+        "text": text,
+        "base_model": result["base_result"],
+        "country_model": result["country_model"] if result["fine_tuned_result"] else None,
+        "routing": result["routing"],
+        "vad": vad_stats,
+        "processing_time": f"{time.time() - stages['start_time']:.2f} seconds",
+        "request_id": request_id
+    }
+
+@app.websocket("/ws/listen")
+async def listen_for_commands(websocket: WebSocket, country: Optional[str] = None, sensitivity: Optional[float] = None):
+    """Continuous listening: only audio after a spotted keyword reaches denoise + ASR.
+
+    The client streams 16 kHz mono s16le PCM as binary messages. The server
+    sends {"type": "wake"} on a keyword, then {"type": "transcript"} once the
+    command ends (KWS_END_SILENCE_MS of silence or KWS_CAPTURE_SECONDS), and
+    {"type": "stats"} with the fraction of audio gated away.
+    """
+    await websocket.accept()
+    session_id = f"listen_{int(time.time())}_{os.urandom(4).hex()}"
+    print(f"\n=== SESSION {session_id} - Continuous Listening ===")
+    if not keyword_templates:
+        await websocket.send_json({"type": "error", "message": f"No keyword templates in {KWS_TEMPLATE_DIR}"})
+        await websocket.close()
+        return
+
+    spotter = KeywordSpotter.from_env(keyword_templates, sensitivity)
+    GATING_STATS.sessions += 1
+    end_silence_samples = KWS_SAMPLE_RATE * KWS_END_SILENCE_MS // 1000
+    capture_samples = int(KWS_SAMPLE_RATE * KWS_CAPTURE_SECONDS)
+    received = forwarded = stats_sent_at = 0
+    capture, silence = None, 0
+    commands = 0
+    # Transcriptions run as tasks so the receive loop keeps draining audio meanwhile
+    pending = set()
+
+    async def send_transcript(command: np.ndarray, request_id: str):
+        try:
+            await websocket.send_json(await transcribe_command(command, country, request_id))
+        except Exception as e:
+            print(f"Request {request_id}: Command transcription failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            try:
+                await websocket.send_json({"type": "error", "message": str(e), "request_id": request_id})
+            except Exception:
+                pass
+
+    def session_stats() -> dict:
+        return {
+            "type": "stats",
+            "seconds_received": round(received / KWS_SAMPLE_RATE, 1),
+            "seconds_forwarded": round(forwarded / KWS_SAMPLE_RATE, 1),
+            "gated_fraction": round(1 - forwarded / received, 4) if received else None,
+            "detections": spotter.detections,
+            "checks": spotter.checks,
+            "session_id": session_id
+        }
+
+    try:
+        while True:
+            data = await websocket.receive_bytes()
+            chunk = np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+            if len(chunk) == 0:
+                continue
+            received += len(chunk)
+
+            if capture is None:
+                detection = await asyncio.to_thread(spotter.process, chunk)
+                if detection:
+                    print(f"Session {session_id}: Keyword '{detection['keyword']}' (distance {detection['distance']})")
+                    await websocket.send_json({"type": "wake", **detection, "session_id": session_id})
+                    capture, silence = [], 0
+            else:
+                capture.append(chunk)
+                captured = sum(len(c) for c in capture)
+                silence = silence + len(chunk) if frame_energy_db(chunk, len(chunk)).max() < spotter.min_level_db else 0
+                if silence >= end_silence_samples or captured >= capture_samples:
+                    command, capture = np.concatenate(capture), None
+                    forwarded += len(command)
+                    commands += 1
+                    if engine is None:
+                        await websocket.send_json({"type": "error", "message": "Models are still loading", "stage": readiness["stage"]})
+                    else:
+                        task = asyncio.create_task(send_transcript(command, f"{session_id}_{commands}"))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                    spotter.reset()
+
+            if received - stats_sent_at >= KWS_STATS_INTERVAL_SECONDS * KWS_SAMPLE_RATE:
+                stats_sent_at = received
+                await websocket.send_json(session_stats())
+    except WebSocketDisconnect:
+        print(f"Session {session_id}: Client disconnected")
+    except Exception as e:
+        print(f"Session {session_id} failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        try:
+            await websocket.send_json({"type": "error", "message": str(e), "session_id": session_id})
+            await websocket.close()
+        except Exception:
+            pass
+    finally:
+        for task in pending:
+            task.cancel()
+        GATING_STATS.add(received / KWS_SAMPLE_RATE, forwarded / KWS_SAMPLE_RATE, spotter.detections)
+        stats = session_stats()
+        print(f"Session {session_id}: {stats['seconds_received']}s received, {stats['seconds_forwarded']}s forwarded "
+              f"({stats['detections']} keywords)")
+
+@app.get("/health")
+async def health():
+    """Liveness probe: answers as soon as the server is up, before any model is loaded"""
+    return {"status": "ok", "stage": readiness["stage"]}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until models are loaded and warmed up"""
+    # The country router reads the loaded models and queue depth from here
+    load = {
+        "country_models": [c for c in engine.model_handlers if c not in readiness["failed_models"]] if engine else [],
+        "queue_depth": BUDGETER.in_flight
+    }
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={"ready": False, "stage": readiness["stage"],
+                                                      "error": readiness["error"], **load})
+    return {"ready": True, "stage": readiness["stage"], "warmup": readiness["warmup"], **load}
+
 # Just keep system-info and echo_test for diagnostics
 @app.get("/system_info/")
 async def system_info():
     """Get information about the system and GPU"""
     import platform
+    # torch is only imported by the engine; report it once the engine has loaded it
+    torch = sys.modules.get("torch")
     info = {
         "system": {
             "platform": platform.platform(),
             "python_version": platform.python_version(),
-            "torch_version": torch.__version__,
+            "torch_version": torch.__version__ if torch else None,
         },
         "gpu": {
-            "available": torch.cuda.is_available(),
-        }
+            "available": torch.cuda.is_available() if torch else None,
+        },
+        "transcript_cache": TRANSCRIPT_CACHE.stats(),
+        "ride_evaluation_cache": RIDE_EVALUATION_CACHE.stats(),
+        "decoding_profiles": BUDGETER.stats(),
+        "denoiser": engine.audio_denoiser.batcher.stats() if engine and engine.audio_denoiser else None,
+        "readiness": {"ready": readiness["ready"], "stage": readiness["stage"], "error": readiness["error"]},
+        "process": process_memory(),
+        "profiler": PROFILER.status(),
+        "memory_tracker": MEMORY_TRACKER.status(),
+        "keyword_gate": {"keywords": sorted(keyword_templates), **GATING_STATS.snapshot()}
     }
-    if torch.cuda.is_available():
+    if torch and torch.cuda.is_available():
         device_count = torch.cuda.device_count()
         info["gpu"]["count"] = device_count
         info["gpu"]["devices"] = []
@@ -800,6 +707,62 @@ async def system_info():
             })
     return info
 
+def admin_denied(request: Request) -> Optional[JSONResponse]:
+    """Fails closed: the diagnostics endpoints do not exist until ADMIN_TOKEN is configured"""
+    if not ADMIN_TOKEN:
+        return JSONResponse(status_code=404, content={"error": "Admin endpoints are disabled; set ADMIN_TOKEN"})
+    if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), ADMIN_TOKEN.encode()):
+        return JSONResponse(status_code=403, content={"error": "Admin token required"})
+    return None
+
+@app.post("/admin/profile/start")
+async def start_profile(request: Request, seconds: float = 30.0, requests: int = 0, interval_ms: float = 10.0):
+    """Sample every thread's stack for `seconds` or until `requests` uploads finish (0 = no request limit)"""
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    PROFILER.start(duration=seconds, max_requests=requests, interval_ms=interval_ms)
+    return PROFILER.status()
+
+@app.post("/admin/profile/stop")
+async def stop_profile(request: Request):
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    PROFILER.stop()
+    return PROFILER.status()
+
+@app.get("/admin/profile/collapsed")
+async def profile_collapsed(request: Request):
+    """Collapsed stacks, ready for flamegraph.pl or speedscope"""
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    return PlainTextResponse(PROFILER.collapsed())
+
+@app.get("/admin/profile/flamegraph")
+async def profile_flamegraph(request: Request):
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    return Response(content=PROFILER.flamegraph_svg(), media_type="image/svg+xml")
+
+@app.post("/admin/memory/start")
+async def start_memory_tracking(request: Request, requests: int = 20, top: int = 10):
+    """Record traced memory per pipeline stage and heap growth per upload for the next `requests` uploads"""
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    MEMORY_TRACKER.start(max_requests=requests, top=top)
+    return MEMORY_TRACKER.status()
+
+@app.get("/admin/memory/")
+async def memory_report(request: Request):
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    return MEMORY_TRACKER.report()
+
 @app.post("/echo_test/")
 async def echo_test(file: UploadFile = File(...)):
     content = await file.read()
@@ -824,8 +787,9 @@ async def evaluate_ride(
 
     try:
         start_time = time.time()
-        response = await multi_agent_system.evaluate_ride_request(ride_details)
+        response, cache_status = await evaluate_ride_cached(multi_agent_system, ride_details)
         elapsed_time = time.time() - start_time
+        print(f"Ride evaluation cache {cache_status}")
 
         # Extract recommendation (ACCEPT or DECLINE) from response
         content = response.content.strip()
@@ -841,6 +805,7 @@ async def evaluate_ride(
                 "explanation": content,
                 "agent_name": response.agent_name,
                 "processing_time": f"{elapsed_time:.2f} seconds",
+                "cache": cache_status,
                 "request_id": request_id
             }),
             headers={"Content-Type": "application/json; charset=utf-8"}
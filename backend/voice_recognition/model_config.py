@@ -0,0 +1,82 @@
+# Model configuration shared by the API, the inference engine and the gateway
+# Kept free of heavy imports so the gateway and health checks never load torch.
+import os
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).parent
+MODEL_CACHE_DIR = PROJECT_ROOT / "models" / "huggingface"
+MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Updated model configurations with clearer country labeling
+COUNTRY_MODELS = {
+    "Malaysia": {
+        "name": "Malaysian Whisper Model",
+        "model_id": "mesolitica/malaysian-whisper-small-v3",
+        "language": "ms",
+        # Spoken languages routed to this model. The handler forces its decode language,
+        # so only list what it decodes correctly; Whisper often labels Malay speech "id".
+        "languages": ["ms", "id"],
+        "type": "malaysian",
+        # Extra phrasings per intent on top of DEFAULT_COMMANDS (command fast path)
+        "commands": {
+            "accept_ride": ["terima", "ambil ride", "ok ambil"],
+            "decline_ride": ["tolak", "tak nak"],
+            "call_passenger": ["call customer", "telefon penumpang"],
+            "arrived": ["dah sampai", "sudah sampai"],
+        },
+        "use_faster_whisper": False  # Enable faster-whisper for this model
+    },
+    "Singapore": {
+        "name": "Singlish Whisper Model",
+        "model_id": "jensenlwt/whisper-small-singlish-122k",
+        "language": "en",
+        "languages": ["en"],
+        "type": "pipeline",
+        "commands": {
+            "accept_ride": ["can take", "ok can"],
+            "decline_ride": ["cannot take", "don't want"],
+            "arrived": ["reach already", "i reach already"],
+        },
+        "use_faster_whisper": False  # Enable faster-whisper for this model
+    },
+    "Thailand": {
+        "name": "Thai Whisper Model",
+        "model_id": "juierror/whisper-tiny-thai",
+        "language": "th",
+        "languages": ["th"],
+        "type": "thai",
+        "use_faster_whisper": False  # Enable faster-whisper for this model
+    }
+}
+
+
+def models_to_load(spec: Optional[str] = None) -> list:
+    """Countries whose model this replica loads.
+
+    spec (default: the VOICE_MODELS environment variable) is "all", "none" or
+    a comma-separated list of COUNTRY_MODELS keys. With the country router in
+    front, each replica only loads the models the router sends it.
+    """
+    spec = (spec if spec is not None else os.getenv("VOICE_MODELS", "all")).strip()
+    if spec.lower() == "all":
+        return list(COUNTRY_MODELS)
+    if spec.lower() in ("", "none"):
+        return []
+    countries = [c.strip() for c in spec.split(",") if c.strip()]
+    unknown = [c for c in countries if c not in COUNTRY_MODELS]
+    if unknown:
+        print(f"Ignoring unknown countries in VOICE_MODELS: {', '.join(unknown)}")
+    return [c for c in countries if c in COUNTRY_MODELS]
+
+# Driver command grammar shared by every country: intent -> phrases.
+# Countries add local phrasings under "commands" in COUNTRY_MODELS.
+DEFAULT_COMMANDS = {
+    "accept_ride": ["accept ride", "accept the ride", "accept", "take the ride", "i'll take it"],
+    "decline_ride": ["decline ride", "decline the ride", "reject ride", "reject the ride", "decline", "skip this ride"],
+    "cancel_ride": ["cancel ride", "cancel the ride", "cancel trip"],
+    "call_passenger": ["call passenger", "call the passenger", "call rider", "call the rider"],
+    "message_passenger": ["message passenger", "message the passenger", "text the passenger"],
+    "start_navigation": ["start navigation", "navigate", "navigate to pickup", "start the trip", "let's go"],
+    "arrived": ["i have arrived", "i've arrived", "i'm here", "arrived"],
+}
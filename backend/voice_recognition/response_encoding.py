@@ -0,0 +1,195 @@
+# Content negotiation, compact schemas and compression for API responses
+# Driver links are often 3G: clients can ask for a transcript-only body, a
+# binary encoding (msgpack/CBOR) and compressed transfer.
+import gzip
+import json
+import os
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+CBOR_MEDIA_TYPE = "application/cbor"
+
+
+def to_primitive(value):
+    """Fallback for values the encoders do not know (NumPy scalars, agent metadata objects)"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def dumps_json(payload) -> bytes:
+    """orjson when installed (several times faster), compact stdlib json otherwise"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=to_primitive, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=to_primitive).encode("utf-8")
+
+
+def encode_body(payload, media_type: str) -> bytes:
+    if media_type in MSGPACK_MEDIA_TYPES:
+        return msgpack.packb(payload, use_bin_type=True, default=to_primitive)
+    if media_type == CBOR_MEDIA_TYPE:
+        return cbor2.dumps(payload, default=lambda encoder, value: encoder.encode(to_primitive(value)))
+    return dumps_json(payload)
+
+
+def parse_quality_list(header: Optional[str]) -> list:
+    """(value, q) pairs of an Accept / Accept-Encoding header, highest q first, header order on ties.
+
+    q=0 means "not acceptable", so those values are left out.
+    """
+    entries = []
+    for position, part in enumerate((header or "").split(",")):
+        value, *params = [p.strip() for p in part.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            entries.append((-quality, position, value.lower()))
+    return [(value, -negative) for negative, _, value in sorted(entries)]
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """Most preferred encoding we can produce (by q-value, then header order), else JSON"""
+    for media, _ in parse_quality_list(accept):
+        if media in MSGPACK_MEDIA_TYPES and msgpack is not None:
+            return media
+        if media == CBOR_MEDIA_TYPE and cbor2 is not None:
+            return media
+        if media in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            return JSON_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def compact_upload_payload(payload: dict) -> dict:
+    """Transcript-only view of an /upload/ response"""
+    fine_tuned = payload.get("fine_tuned_model") or {}
+    base = payload.get("base_model") or {}
+    compact = {"text": fine_tuned.get("text") or base.get("text")}
+    intent = payload.get("intent")
+    if intent and intent.get("accepted"):
+        compact["intent"] = intent["intent"]
+    agent = payload.get("agent_response")
+    if agent and agent.get("content"):
+        compact["agent"] = agent["content"]
+    return compact
+
+
+def encode_response(payload: dict, request: Request, response_format: Optional[str] = None,
+                    compact_view=compact_upload_payload) -> Response:
+    """Build the response body in the schema and encoding the client asked for.
+
+    The schema comes from the response_format field or the X-Response-Format
+    header ("full" by default, or "compact"); the encoding from the Accept header.
+    """
+    schema = (response_format or request.headers.get("x-response-format") or "full").lower()
+    if schema == "compact":
+        payload = compact_view(payload)
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    body = encode_body(payload, media_type)
+    if media_type == JSON_MEDIA_TYPE:
+        media_type = "application/json; charset=utf-8"
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept, Accept-Encoding"})
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """br or gzip, whichever the client rates higher (br on a tie); None when neither is acceptable"""
+    supported = [(name, q) for name, q in parse_quality_list(accept_encoding)
+                 if name == "gzip" or (name == "br" and brotli is not None)]
+    if not supported:
+        return None
+    best_quality = supported[0][1]
+    names = [name for name, q in supported if q == best_quality]
+    return "br" if "br" in names else names[0]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=5)
+
+
+class CompressionMiddleware:
+    """Compress complete responses with br or gzip above a size threshold.
+
+    Streaming responses (more than one body message, e.g. NDJSON transcripts)
+    are passed through untouched so segments are not held back in a buffer.
+    """
+
+    def __init__(self, app, minimum_size: int = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", 512))):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers = [(k, v) for k, v in start_message["headers"]]
+            already_encoded = any(k.lower() == b"content-encoding" for k, _ in response_headers)
+            if message.get("more_body", False) or already_encoded or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            response_headers = [(k, v) for k, v in response_headers if k.lower() != b"content-length"]
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            if not any(k.lower() == b"vary" for k, _ in response_headers):
+                response_headers.append((b"vary", b"Accept-Encoding"))
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,94 @@
+# Bounded LRU cache with TTL and in-flight request coalescing
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+
+class AsyncLRUCache:
+    """LRU + TTL cache for results of expensive coroutines.
+
+    Concurrent callers asking for a key that is already being computed wait
+    on the same future instead of starting a second computation. Failed
+    computations are never cached. Cached values are shared between callers
+    and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: "dict[Hashable, asyncio.Future]" = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        should_cache: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[Any, str]:
+        """Return (value, status) where status is "hit", "coalesced" or "miss".
+
+        should_cache lets callers keep degraded results (e.g. a failed model)
+        out of the cache while still sharing them with coalesced waiters.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, "hit"
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            # shield: one impatient follower must not cancel the shared computation
+            return await asyncio.shield(pending), "coalesced"
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            if should_cache is None or should_cache(value):
+                self.set(key, value)
+            future.set_result(value)
+            return value, "miss"
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
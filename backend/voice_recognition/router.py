@@ -0,0 +1,236 @@
+# Country-aware replica routing
+# Consistent-hashes each country onto a few replicas so every node only keeps a
+# subset of COUNTRY_MODELS loaded, with health and queue-depth failover and
+# optional warm spares that load everything.
+# Placement for a deployment: python router.py node-0 node-1 node-2 [--spares node-3]
+import bisect
+import hashlib
+import math
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+from model_config import COUNTRY_MODELS
+
+# Replicas that load each country model
+MODEL_REPLICAS = int(os.getenv("ROUTER_MODEL_REPLICAS", 2))
+# Owners with this many requests queued are skipped in favour of a spare or another node
+MAX_QUEUE_DEPTH = int(os.getenv("ROUTER_MAX_QUEUE_DEPTH", 4))
+# Consecutive failed checks or requests before a replica is taken out of rotation
+FAILURES_TO_EJECT = int(os.getenv("ROUTER_FAILURES_TO_EJECT", 2))
+# A replica ejected for failing requests stays out this long, whatever /ready says meanwhile
+EJECT_SECONDS = float(os.getenv("ROUTER_EJECT_SECONDS", 30.0))
+VIRTUAL_NODES = 64
+
+# Requests without a country model still hash somewhere, so base-model traffic spreads too
+BASE_KEY = "base"
+
+
+def stable_hash(key: str) -> int:
+    """Process-independent hash; Python's hash() is salted per interpreter"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes; adding a node only moves ~1/N of the keys"""
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = VIRTUAL_NODES):
+        self.nodes = list(dict.fromkeys(nodes))
+        points = sorted((stable_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(virtual_nodes))
+        self.hashes = [h for h, _ in points]
+        self.owners = [node for _, node in points]
+
+    def walk(self, key: str) -> list:
+        """Every node once, in ring order starting at the key's position"""
+        if not self.nodes:
+            return []
+        start = bisect.bisect(self.hashes, stable_hash(key))
+        ordered = []
+        for i in range(len(self.owners)):
+            node = self.owners[(start + i) % len(self.owners)]
+            if node not in ordered:
+                ordered.append(node)
+                if len(ordered) == len(self.nodes):
+                    break
+        return ordered
+
+
+def placement(nodes: Iterable[str], spares: Iterable[str] = (), replicas: int = MODEL_REPLICAS) -> Dict[str, list]:
+    """Node -> countries whose model it should load (its VOICE_MODELS); spares load all.
+
+    With only a handful of countries plain consistent hashing can pile them
+    onto one node, so each node is capped at its fair share of models and a
+    country skips full nodes along the ring (consistent hashing with bounded
+    loads). nodes excludes the spares.
+    """
+    ring = HashRing(nodes)
+    layout = {node: [] for node in ring.nodes}
+    if not ring.nodes:
+        return {spare: list(COUNTRY_MODELS) for spare in spares}
+    replicas = min(replicas, len(ring.nodes))
+    capacity = math.ceil(len(COUNTRY_MODELS) * replicas / len(ring.nodes))
+    for country in COUNTRY_MODELS:
+        owners = [node for node in ring.walk(country) if len(layout[node]) < capacity][:replicas]
+        for node in owners:
+            layout[node].append(country)
+    for spare in spares:
+        layout[spare] = list(COUNTRY_MODELS)
+    return layout
+
+
+class ReplicaState:
+    """What the router knows about one replica from health checks and forwarded requests.
+
+    The two are tracked apart: a replica can answer /ready while failing the
+    requests it is sent, so a passing check clears check_failures but not a
+    request ejection, which only ends after its cool-down.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ready = True  # optimistic until the first check says otherwise
+        self.check_failures = 0
+        self.request_failures = 0
+        self.ejected_until = 0.0  # time.monotonic() deadline of a request ejection
+        self.queue_depth = 0
+        self.models = None  # reported by /ready; None until known
+        self.checked_at = None
+
+    @property
+    def ejected(self) -> bool:
+        return time.monotonic() < self.ejected_until
+
+    def checked(self, ready: bool, queue_depth: int = 0, models: Optional[list] = None):
+        """A health check answered"""
+        self.ready = ready
+        self.queue_depth = queue_depth
+        self.checked_at = time.time()
+        if models is not None:
+            self.models = models
+        if ready:
+            self.check_failures = 0
+
+    def check_failed(self):
+        """A health check that got no usable answer"""
+        self.check_failures += 1
+
+    def request_failed(self, eject_seconds: float = EJECT_SECONDS):
+        """A forwarded request that failed; enough in a row eject the replica for eject_seconds"""
+        self.request_failures += 1
+        if self.request_failures >= FAILURES_TO_EJECT:
+            self.request_failures = 0
+            self.ejected_until = time.monotonic() + eject_seconds
+
+    def request_succeeded(self):
+        self.request_failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ready and self.check_failures < FAILURES_TO_EJECT and not self.ejected
+
+    def snapshot(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "ready": self.ready,
+            "check_failures": self.check_failures,
+            "request_failures": self.request_failures,
+            "ejected_seconds_left": round(max(self.ejected_until - time.monotonic(), 0.0), 1),
+            "queue_depth": self.queue_depth,
+            "models": self.models,
+            "checked_seconds_ago": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+        }
+
+
+class CountryRouter:
+    """Pick a replica for a request's country.
+
+    Order of preference: a healthy owner of the country's model (least
+    loaded first) below max_queue_depth, then a warm spare, then any other
+    healthy replica, which serves the request with its base model.
+    Load is the gateway's own in-flight count or the replica's reported queue
+    depth, whichever is larger.
+    """
+
+    def __init__(self, nodes: Iterable[str], spares: Iterable[str] = (), replicas: int = MODEL_REPLICAS,
+                 max_queue_depth: int = MAX_QUEUE_DEPTH, eject_seconds: float = EJECT_SECONDS):
+        self.spares = list(spares)
+        self.ring = HashRing([n for n in nodes if n not in self.spares])
+        self.replicas = replicas
+        self.max_queue_depth = max_queue_depth
+        self.eject_seconds = eject_seconds
+        self.layout = placement(self.ring.nodes, self.spares, replicas)
+        self.states = {name: ReplicaState(name) for name in self.ring.nodes + self.spares}
+        self.decisions = {}
+
+    def load(self, name: str, in_flight: Dict[str, int]) -> int:
+        return max(in_flight.get(name, 0), self.states[name].queue_depth)
+
+    def serves(self, name: str, country: str) -> bool:
+        """Whether the replica has the model, by its own report or else by the planned layout"""
+        models = self.states[name].models
+        return country in (models if models is not None else self.layout.get(name, []))
+
+    def choose(self, country: Optional[str], in_flight: Dict[str, int], exclude: Iterable[str] = ()) -> Optional[tuple]:
+        """(replica, reason), or None when no replica is healthy; exclude skips replicas already tried"""
+        has_model = country in COUNTRY_MODELS
+        ordered = self.ring.walk(country if has_model else BASE_KEY)
+        healthy = [n for n in ordered if self.states[n].healthy and n not in exclude]
+        spares = [n for n in self.spares if self.states[n].healthy and n not in exclude]
+
+        def least_loaded(candidates):
+            available = [n for n in candidates if self.load(n, in_flight) < self.max_queue_depth]
+            return min(available, key=lambda n: self.load(n, in_flight)) if available else None
+
+        if has_model:
+            tiers = (
+                ("owner", [n for n in healthy if self.serves(n, country)]),
+                ("warm_spare", spares),
+                ("spillover", [n for n in healthy if not self.serves(n, country)]),
+            )
+        else:
+            # Base-model traffic prefers the ring order but any replica can take it
+            tiers = (("owner", healthy[:self.replicas]), ("spillover", healthy[self.replicas:] + spares))
+        for reason, candidates in tiers:
+            choice = least_loaded(candidates)
+            if choice:
+                break
+        else:
+            # Everyone is saturated: queue on the least loaded healthy replica rather than fail
+            candidates = healthy + spares
+            if not candidates:
+                return None
+            choice, reason = min(candidates, key=lambda n: self.load(n, in_flight)), "saturated"
+        self.decisions[reason] = self.decisions.get(reason, 0) + 1
+        return choice, reason
+
+    def report_health(self, name: str, ready: bool, queue_depth: int = 0, models: Optional[list] = None):
+        self.states[name].checked(ready, queue_depth, models)
+
+    def report_check_failure(self, name: str):
+        self.states[name].check_failed()
+
+    def report_failure(self, name: str):
+        self.states[name].request_failed(self.eject_seconds)
+
+    def report_success(self, name: str):
+        self.states[name].request_succeeded()
+
+    def stats(self) -> dict:
+        return {
+            "layout": self.layout,
+            "spares": self.spares,
+            "decisions": dict(self.decisions),
+            "replicas": {name: state.snapshot() for name, state in self.states.items()},
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("nodes", nargs="+")
+    parser.add_argument("--spares", nargs="*", default=[])
+    parser.add_argument("--replicas", type=int, default=MODEL_REPLICAS)
+    args = parser.parse_args()
+    for node, countries in placement(args.nodes, args.spares, args.replicas).items():
+        print(f"{node}: VOICE_MODELS={','.join(countries) or 'none'}")
@@ -0,0 +1,116 @@
+# Incremental consumption of faster-whisper segments
+# faster-whisper returns a lazy generator: no decoding happens until it is iterated,
+# so we pull one segment at a time in a worker thread and can stop as soon as we
+# have heard enough.
+import asyncio
+import math
+import re
+from typing import Iterable, Optional
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip punctuation so keyword checks ignore Whisper's formatting"""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+_NEGATIONS = {"not", "don't", "dont", "never", "no"}
+
+
+def match_keyword(text: str, keywords: Iterable[str]) -> Optional[str]:
+    """Return the first keyword phrase contained in text as whole words, if any.
+
+    A phrase directly after a negation ("don't accept the ride") does not
+    count; a negation earlier in the sentence ("no problem, accept the ride") does not matter.
+    """
+    padded = f" {normalize_text(text)} "
+    for keyword in keywords:
+        start = padded.find(f" {keyword} ")
+        while start != -1:
+            preceding = padded[:start].split()[-1:]
+            if _NEGATIONS.isdisjoint(preceding):
+                return keyword
+            start = padded.find(f" {keyword} ", start + 1)
+    return None
+
+
+def transcript_confidence(segments) -> float:
+    """Decoder confidence of a transcript in [0, 1] from faster-whisper's segment scores"""
+    total = weighted = 0.0
+    for segment in segments:
+        duration = max(segment["end"] - segment["start"], 0.01)
+        weighted += duration * math.exp(segment["avg_logprob"]) * (1 - segment["no_speech_prob"])
+        total += duration
+    return weighted / total if total else 0.0
+
+
+class SegmentStream:
+    """Async iterator over faster-whisper segments with optional early exit"""
+
+    def __init__(self, model, audio, stop_keywords: Iterable[str] = (), max_chars: Optional[int] = None, **transcribe_kwargs):
+        self.model = model
+        self.audio = audio
+        self.stop_keywords = tuple(normalize_text(k) for k in stop_keywords)
+        self.max_chars = max_chars
+        self.transcribe_kwargs = transcribe_kwargs
+        self.info = None
+        self.segments = []
+        self.stop_reason = None
+        self.matched_keyword = None
+
+    @property
+    def text(self) -> str:
+        return " ".join(segment["text"] for segment in self.segments)
+
+    @property
+    def confidence(self) -> float:
+        """Duration-weighted exp(avg_logprob) * (1 - no_speech_prob) over the decoded segments, 0 when empty"""
+        return transcript_confidence(self.segments)
+
+    async def __aiter__(self):
+        # transcribe() only runs feature extraction and language detection;
+        # each next() on the returned generator decodes one more segment
+        segments, self.info = await asyncio.to_thread(
+            self.model.transcribe, self.audio, **self.transcribe_kwargs
+        )
+        try:
+            while True:
+                segment = await asyncio.to_thread(next, segments, None)
+                if segment is None:
+                    self.stop_reason = "complete"
+                    return
+                item = {
+                    "index": len(self.segments),
+                    "start": round(segment.start, 2),
+                    "end": round(segment.end, 2),
+                    "text": segment.text,
+                    "avg_logprob": round(segment.avg_logprob, 4),
+                    "no_speech_prob": round(segment.no_speech_prob, 4),
+                }
+                self.segments.append(item)
+                yield item
+
+                keyword = match_keyword(self.text, self.stop_keywords) if self.stop_keywords else None
+                if keyword:
+                    self.stop_reason = "keyword"
+                    self.matched_keyword = keyword
+                    print(f"Early exit after segment {item['index']}: matched command '{keyword}'")
+                    return
+                if self.max_chars and len(self.text) >= self.max_chars:
+                    self.stop_reason = "max_length"
+                    print(f"Early exit after segment {item['index']}: reached {self.max_chars} characters")
+                    return
+        finally:
+            try:
+                # Closing the generator stops faster-whisper from decoding the remaining windows
+                segments.close()
+            except ValueError:
+                # Still executing in a worker thread (request was cancelled mid-segment)
+                pass
+
+    async def collect(self) -> str:
+        """Consume the stream (honouring early exit) and return the joined transcript"""
+        async for _ in self:
+            pass
+        return self.text
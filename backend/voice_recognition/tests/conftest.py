@@ -0,0 +1,5 @@
+# The service modules import each other as top-level modules (uvicorn runs from this directory)
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
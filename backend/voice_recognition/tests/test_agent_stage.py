@@ -0,0 +1,47 @@
+import asyncio
+
+from agent_stage import AgentSpeculation, parse_ride_context, ride_cache_key
+
+
+def test_parse_ride_context_falls_back_to_empty():
+    assert parse_ride_context(None) == {}
+    assert parse_ride_context("{not json") == {}
+    assert parse_ride_context("[1, 2]") == {}
+    assert parse_ride_context('{"fare": 12}') == {"fare": 12}
+
+
+def test_ride_cache_key_ignores_key_order():
+    assert ride_cache_key({"a": 1, "b": 2}) == ride_cache_key({"b": 2, "a": 1})
+
+
+class SlowAgent:
+    def __init__(self):
+        self.queries = []
+
+    async def process_query(self, text, ride_context=None, current_location=None):
+        self.queries.append(text)
+        await asyncio.sleep(0.01)
+        return text
+
+
+def test_speculation_reused_when_transcript_matches():
+    async def run():
+        agent = SlowAgent()
+        speculation = AgentSpeculation(agent, {})
+        speculation.start("Accept the ride.")
+        result = await speculation.resolve("accept the ride")
+        return agent.queries, result, speculation.outcome
+
+    queries, result, outcome = asyncio.run(run())
+    assert (queries, result, outcome) == (["Accept the ride."], "Accept the ride.", "used")
+
+
+def test_speculation_cancel_discards_task():
+    async def run():
+        speculation = AgentSpeculation(SlowAgent(), {})
+        speculation.start("call the passenger")
+        speculation.cancel()
+        await asyncio.sleep(0)
+        return speculation.task.cancelled(), speculation.outcome
+
+    assert asyncio.run(run()) == (True, "discarded")
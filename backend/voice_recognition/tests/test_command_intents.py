@@ -0,0 +1,58 @@
+from command_intents import (COMMAND_ASR_CONFIDENCE, command_grammar, command_keywords, command_language,
+                             fast_path_available, match_command, recognize_command)
+
+
+def test_exact_and_filler_wrapped_commands_match():
+    assert match_command("Accept the ride.")["intent"] == "accept_ride"
+    match = match_command("ok please accept the ride lah")
+    assert match["intent"] == "accept_ride" and match["score"] == 1.0
+
+
+def test_country_phrasings_extend_the_default_grammar():
+    assert command_grammar("Malaysia")["tak nak"] == "decline_ride"
+    assert "tak nak" not in command_grammar(None)
+    assert match_command("dah sampai", "Malaysia")["intent"] == "arrived"
+
+
+def test_stream_keywords_are_the_multi_word_grammar_phrases():
+    keywords = command_keywords("Malaysia")
+    assert "accept the ride" in keywords and "dah sampai" in keywords
+    assert "accept" not in keywords and "terima" not in keywords
+    assert set(keywords) <= set(command_grammar("Malaysia"))
+
+
+def test_negation_is_emphasis_for_negative_commands():
+    for text in ("no, decline", "decline, no", "no no, cancel the ride"):
+        match = match_command(text)
+        assert match["intent"] in ("decline_ride", "cancel_ride"), text
+        assert match["score"] == 1.0 and not match["negated"]
+
+
+def test_negation_flips_accept_to_decline():
+    match = match_command("don't accept")
+    assert match["intent"] == "decline_ride" and match["negated"]
+
+
+def test_negated_commands_without_an_opposite_do_not_match():
+    assert match_command("don't call the passenger") is None
+    assert match_command("not arrived") is None
+
+
+def test_phrases_that_spell_out_the_negation_match_directly():
+    match = match_command("cannot take", "Singapore")
+    assert match["phrase"] == "cannot take" and match["intent"] == "decline_ride" and not match["negated"]
+    assert match_command("tak nak", "Malaysia")["intent"] == "decline_ride"
+
+
+def test_recognize_command_reports_why_it_declined():
+    assert recognize_command("accept the ride", 0.9)["accepted"]
+    assert recognize_command("", 0.9)["reason"] == "empty_transcript"
+    assert recognize_command("accept the ride", COMMAND_ASR_CONFIDENCE / 2)["reason"] == "low_asr_confidence"
+    assert recognize_command("what time is the next ferry", 0.9)["reason"] == "no_matching_command"
+
+
+def test_decode_language_and_availability_follow_the_country():
+    assert command_language(None) == "en" and command_language("Singapore") == "en"
+    assert command_language("Malaysia") is None  # mixes English and Malay phrasings
+    assert fast_path_available("Malaysia") and fast_path_available(None)
+    assert not fast_path_available("Thailand")
@@ -0,0 +1,65 @@
+import importlib
+
+import pytest
+
+import decoding_profiles
+from decoding_profiles import DECODING_PROFILES, LATENCY_EWMA_ALPHA, LatencyBudgeter, whisper_options
+
+
+def test_profiles_are_ordered_fastest_first_and_complete():
+    keys = set(DECODING_PROFILES["accurate"])
+    for profile in DECODING_PROFILES.values():
+        assert set(profile) == keys
+    estimates = [LatencyBudgeter().estimate(name, 5.0) for name in DECODING_PROFILES]
+    assert estimates == sorted(estimates)
+
+
+def test_whisper_options_leave_model_defaults_alone():
+    assert whisper_options(DECODING_PROFILES["accurate"]) == {"beam_size": 5, "vad_filter": True}
+    realtime = whisper_options(DECODING_PROFILES["realtime"])
+    assert realtime["temperature"] == (0.0,) and realtime["max_new_tokens"] == 96 and realtime["chunk_length"] == 15
+
+
+def test_unknown_default_profile_falls_back_to_accurate(monkeypatch):
+    monkeypatch.setenv("DECODING_PROFILE", "turbo")
+    try:
+        assert importlib.reload(decoding_profiles).DEFAULT_PROFILE == "accurate"
+        monkeypatch.setenv("DECODING_PROFILE", "balanced")
+        assert importlib.reload(decoding_profiles).DEFAULT_PROFILE == "balanced"
+    finally:
+        monkeypatch.delenv("DECODING_PROFILE")
+        importlib.reload(decoding_profiles)
+
+
+def test_requested_profile_wins_and_unknown_names_use_the_default():
+    budgeter = LatencyBudgeter(default="balanced")
+    assert budgeter.select("realtime", 100.0, 5.0)["reason"] == "requested"
+    choice = budgeter.select("turbo", None, 5.0)
+    assert (choice["name"], choice["reason"]) == ("balanced", "default")
+    assert budgeter.stats()["chosen"] == {"realtime": 1, "balanced": 1, "accurate": 0}
+
+
+def test_budget_picks_the_most_accurate_profile_that_fits():
+    budgeter = LatencyBudgeter()
+    # 4 s of speech: realtime 0.9 s, balanced 2.0 s, accurate 3.4 s
+    assert budgeter.select(None, 2500, 4.0)["name"] == "balanced"
+    assert budgeter.select(None, 5000, 4.0)["name"] == "accurate"
+    choice = budgeter.select(None, 100, 4.0)
+    assert (choice["name"], choice["reason"]) == ("realtime", "budget_exceeded")
+
+
+def test_queue_depth_scales_the_estimate():
+    budgeter = LatencyBudgeter()
+    with budgeter.track():
+        choice = budgeter.select(None, 2500, 4.0)
+        assert choice["queue_depth"] == 1 and choice["name"] == "realtime"
+    assert budgeter.in_flight == 0
+
+
+def test_observed_latency_updates_the_rate():
+    budgeter = LatencyBudgeter()
+    prior = budgeter.rates["balanced"]
+    # 4.6 s for 4 s of speech with one request ahead: 2.3 s alone, 0.425 s per speech second
+    budgeter.record("balanced", 4.0, 4.6, queue_depth=1)
+    assert budgeter.rates["balanced"] == pytest.approx(prior + LATENCY_EWMA_ALPHA * (0.425 - prior))
+    assert budgeter.stats()["observations"]["balanced"] == 1
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("df")
+from denoise_batcher import EnhancementBatcher  # noqa: E402
+
+
+class RecordingBatcher(EnhancementBatcher):
+    """Skips DeepFilterNet: the enhanced clip is the input scaled by 0.5"""
+
+    def __init__(self, fail: bool = False, **kwargs):
+        super().__init__(None, None, **kwargs)
+        self.fail = fail
+        self.batches = []
+
+    def _enhance_batch(self, clips):
+        self.batches.append([clip.shape[-1] for clip in clips])
+        if self.fail:
+            raise RuntimeError("enhance failed")
+        return [clip * 0.5 for clip in clips]
+
+
+def clip(samples: int):
+    return torch.ones(1, samples)
+
+
+def test_clips_of_similar_length_share_a_batch():
+    batcher = RecordingBatcher(max_batch_size=8, max_wait_ms=20, bucket_ratio=1.5)
+    lengths = [1000, 1200, 1400, 5000, 6000]
+
+    async def run():
+        return await asyncio.gather(*(batcher.enhance(clip(n)) for n in lengths))
+
+    results = asyncio.run(run())
+    assert sorted(batcher.batches) == [[1000, 1200, 1400], [5000, 6000]]
+    assert [r.shape[-1] for r in results] == lengths
+    assert float(results[0].max()) == 0.5
+
+
+def test_requests_within_the_window_are_flushed_together():
+    batcher = RecordingBatcher(max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        first = asyncio.create_task(batcher.enhance(clip(1000)))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(batcher.enhance(clip(1000)))
+        await asyncio.gather(first, second)
+        await batcher.enhance(clip(1000))  # after the window: a batch of its own
+
+    asyncio.run(run())
+    assert batcher.batches == [[1000, 1000], [1000]]
+
+
+def test_a_full_batch_flushes_without_waiting_for_the_window():
+    batcher = RecordingBatcher(max_batch_size=2, max_wait_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(batcher.enhance(clip(800)), batcher.enhance(clip(900))), 1.0)
+
+    asyncio.run(run())
+    assert batcher.batches == [[800, 900]]
+
+
+def test_batch_errors_reach_every_caller():
+    batcher = RecordingBatcher(fail=True, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(batcher.enhance(clip(1000)), batcher.enhance(clip(1100)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not batcher._flush_tasks
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_denoise_metrics import SAMPLE_RATE, legacy_metrics, synthetic_clip
+from denoise_metrics import FRAME_LENGTH, HOP_LENGTH, compute_denoising_metrics
+from denoise_policy import frame_spectra
+
+
+@pytest.fixture(scope="module")
+def clip():
+    return synthetic_clip(3.0)
+
+
+def test_energies_and_direct_snr_match_the_float64_formulas(clip):
+    original, enhanced = clip
+    metrics = compute_denoising_metrics(original, enhanced, SAMPLE_RATE)
+    o = original.astype(np.float64)
+    e = enhanced.astype(np.float64)
+    noise_power = np.mean((o - e) ** 2)
+    assert metrics["original_rms"] == pytest.approx(np.sqrt(np.mean(o ** 2)), rel=1e-6)
+    assert metrics["enhanced_rms"] == pytest.approx(np.sqrt(np.mean(e ** 2)), rel=1e-6)
+    assert metrics["noise_reduction"] == pytest.approx(metrics["original_rms"] - metrics["enhanced_rms"])
+    assert metrics["snr_before"] == pytest.approx(10 * np.log10(np.mean(o ** 2) / noise_power), abs=1e-4)
+    assert metrics["snr_after"] == pytest.approx(10 * np.log10(np.mean(e ** 2) / (noise_power * 0.3)), abs=1e-4)
+
+
+def test_matches_the_legacy_implementation(clip):
+    for module in ("librosa", "pystoi", "torch"):
+        pytest.importorskip(module)
+    original, enhanced = clip
+    metrics = compute_denoising_metrics(original, enhanced, SAMPLE_RATE)
+    original_energy, enhanced_energy, legacy_stoi, snr_before, snr_after, _, _ = legacy_metrics(original, enhanced)
+    assert metrics["original_rms"] == pytest.approx(np.sqrt(original_energy / len(original)), rel=1e-5)
+    assert metrics["enhanced_rms"] == pytest.approx(np.sqrt(enhanced_energy / len(enhanced)), rel=1e-5)
+    assert metrics["snr_before"] == pytest.approx(snr_before, abs=1e-3)
+    assert metrics["snr_after"] == pytest.approx(snr_after, abs=1e-3)
+    # Shared 16 kHz frames instead of pystoi's 10 kHz resampling: close, not bit-identical
+    assert metrics["stoi"] == pytest.approx(legacy_stoi, abs=0.05)
+
+
+def test_intelligibility_drops_with_distortion(clip):
+    original, enhanced = clip
+    noisy = original + 0.3 * np.random.default_rng(1).standard_normal(len(original)).astype(np.float32)
+    assert compute_denoising_metrics(original, original)["stoi"] == pytest.approx(1.0)
+    assert compute_denoising_metrics(original, noisy)["stoi"] < compute_denoising_metrics(original, enhanced)["stoi"]
+
+
+def test_precomputed_original_spectra_give_the_same_metrics(clip):
+    original, enhanced = clip
+    power = frame_spectra(original, FRAME_LENGTH, HOP_LENGTH)
+    assert compute_denoising_metrics(original, enhanced, original_power=power) == compute_denoising_metrics(original, enhanced)
+
+
+def test_short_and_empty_clips():
+    short = np.ones(100, dtype=np.float32)
+    assert compute_denoising_metrics(short, short)["stoi"] is None
+    empty = compute_denoising_metrics(np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32))
+    assert empty["stoi"] is None and empty["original_rms"] == 0.0
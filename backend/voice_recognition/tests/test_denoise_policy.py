@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import denoise_policy
+from denoise_policy import DenoisePolicy, estimate_noise, frame_spectra
+
+SR = 16000
+
+
+def speech_like(noise_level, seed=0):
+    """Two seconds of 1 s tone bursts over white noise at noise_level"""
+    t = np.arange(2 * SR) / SR
+    bursts = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 1.5 * t) > 0)
+    return (bursts + noise_level * np.random.default_rng(seed).standard_normal(len(t))).astype(np.float32)
+
+
+def policy_for_snr(monkeypatch, snr_db, **kwargs):
+    monkeypatch.setattr(denoise_policy, "estimate_noise", lambda audio, power=None: {"estimated_snr_db": snr_db})
+    return DenoisePolicy(**kwargs).decide(np.zeros(SR, dtype=np.float32))
+
+
+@pytest.mark.parametrize("snr_db, mode, blend_ratio", [
+    (45.0, "skip", 0.0),
+    (30.0, "skip", 0.0),
+    (29.9, "light", 0.402),
+    (22.5, "light", 0.55),
+    (15.0, "full", 0.7),
+    (3.0, "full", 0.7),
+])
+def test_thresholds_pick_mode_and_blend(monkeypatch, snr_db, mode, blend_ratio):
+    decision = policy_for_snr(monkeypatch, snr_db)
+    assert decision["mode"] == mode
+    assert decision["blend_ratio"] == blend_ratio
+    assert decision["estimated_snr_db"] == snr_db
+
+
+def test_disabled_policy_always_runs_full(monkeypatch):
+    decision = policy_for_snr(monkeypatch, 60.0, enabled=False)
+    assert decision == {"mode": "full", "blend_ratio": 0.7}
+
+
+def test_from_env_reads_thresholds(monkeypatch):
+    monkeypatch.setenv("DENOISE_SKIP_SNR_DB", "25")
+    monkeypatch.setenv("DENOISE_ADAPTIVE", "0")
+    policy = DenoisePolicy.from_env()
+    assert policy.skip_snr_db == 25.0 and policy.full_snr_db == 15.0 and not policy.enabled
+
+
+def test_estimate_tracks_the_noise_level():
+    clean = estimate_noise(speech_like(0.0005))
+    noisy = estimate_noise(speech_like(0.05))
+    assert clean["estimated_snr_db"] > noisy["estimated_snr_db"] + 20
+    assert noisy["noise_floor_db"] > clean["noise_floor_db"]
+    assert DenoisePolicy().decide(speech_like(0.0005))["mode"] == "skip"
+    assert DenoisePolicy().decide(speech_like(0.1))["mode"] == "full"
+
+
+def test_precomputed_spectra_give_the_same_estimate():
+    audio = speech_like(0.01)
+    assert estimate_noise(audio, power=frame_spectra(audio)) == estimate_noise(audio)
+
+
+def test_frame_spectra_pads_short_clips():
+    assert frame_spectra(np.zeros(100, dtype=np.float32)).shape == (1, 257)
@@ -0,0 +1,45 @@
+import asyncio
+import tracemalloc
+
+from diagnostics import MemoryTracker
+
+
+def test_stage_records_traced_peak_without_snapshots():
+    tracker = MemoryTracker()
+    tracker.start(max_requests=2)
+    try:
+        with tracker.stage("req", "decode"):
+            buffer = bytearray(4 * 1024 * 1024)
+            del buffer
+        record = tracker.records[-1]
+        assert record["stage"] == "decode"
+        assert record["python_peak_above_start_kb"] >= 4096
+        assert record["python_net_kb"] < 1024
+        assert not tracker.snapshots
+    finally:
+        tracker.stop()
+
+
+def test_uploads_are_snapshotted_in_the_background_and_the_budget_stops_tracing():
+    tracker = MemoryTracker()
+    tracker.start(max_requests=2)
+    kept = []
+
+    async def uploads():
+        tracker.request_finished()  # baseline
+        await asyncio.gather(*tracker._tasks)
+        kept.append(bytearray(1024 * 1024))
+        tracker.request_finished()
+        await asyncio.gather(*tracker._tasks)
+
+    asyncio.run(uploads())
+    assert [s["upload"] for s in tracker.snapshots] == [2]
+    assert tracker.snapshots[0]["python_net_kb"] >= 1000
+    assert not tracker.enabled and not tracemalloc.is_tracing()
+
+
+def test_stage_is_a_no_op_when_disabled():
+    tracker = MemoryTracker()
+    with tracker.stage("req", "decode"):
+        pass
+    assert not tracker.records
@@ -0,0 +1,105 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+# The pipeline module needs the full inference stack; these tests run where it is installed
+for module in ("torch", "transformers", "faster_whisper", "df"):
+    pytest.importorskip(module)
+import engine  # noqa: E402
+
+
+class FakeDenoiser:
+    async def process_audio(self, speech, output_dir, sample_rate=16000):
+        await asyncio.sleep(0.01)
+        return {"output_path": f"{output_dir}/denoised.wav", "metrics": {"enhancement": {"mode": "full"}}}
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    calls = {"raw": 0, "base": 0, "country": 0}
+
+    async def transcribe_raw(speech, request_id, profile=None):
+        calls["raw"] += 1
+        return {"text": "raw", "confidence": 0.9}
+
+    async def transcribe_base(file_path, stop_keywords=(), max_chars=None, profile=None):
+        calls["base"] += 1
+        return "base"
+
+    async def transcribe_country(file_path, country, profile=None):
+        calls["country"] += 1
+        return "country"
+
+    monkeypatch.setattr(engine, "audio_denoiser", FakeDenoiser())
+    monkeypatch.setattr(engine, "model_handlers", {"Malaysia": object()})
+    monkeypatch.setattr(engine, "transcribe_raw_speculatively", transcribe_raw)
+    monkeypatch.setattr(engine, "transcribe_with_base_model", transcribe_base)
+    monkeypatch.setattr(engine, "transcribe_with_fine_tuned_model", transcribe_country)
+    return monkeypatch, calls
+
+
+def run(routing="auto"):
+    return asyncio.run(engine.denoise_and_transcribe(
+        "clip.wav", np.zeros(16000, dtype=np.float32), "Malaysia", "test", {"start_time": 0.0},
+        routing=routing, decode_mode="speculative"
+    ))
+
+
+def test_country_routed_request_never_runs_the_raw_base_decode(pipeline):
+    monkeypatch, calls = pipeline
+
+    async def route(speech, country, request_id):
+        return {"language": "ms", "probability": 0.9, "target": "Malaysia", "reason": "detected_language"}
+
+    monkeypatch.setattr(engine, "route_request", route)
+    result = run()
+    assert calls == {"raw": 0, "base": 0, "country": 1}
+    assert result["decode_path"]["reason"] == "base_model_not_routed"
+    assert result["fine_tuned_result"] == "country"
+
+
+def test_base_routed_request_keeps_a_confident_raw_transcript(pipeline):
+    monkeypatch, calls = pipeline
+
+    async def route(speech, country, request_id):
+        return {"language": "en", "probability": 0.9, "target": "base", "reason": "no_country_model"}
+
+    monkeypatch.setattr(engine, "route_request", route)
+    result = run()
+    assert calls == {"raw": 1, "base": 0, "country": 0}
+    assert result["base_result"] == "raw" and result["decode_path"]["path"] == "raw"
+
+
+def test_failing_denoiser_cancels_the_raw_decode(pipeline):
+    monkeypatch, calls = pipeline
+    cancelled = []
+
+    class BrokenDenoiser:
+        async def process_audio(self, speech, output_dir, sample_rate=16000):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("DeepFilterNet failed")
+
+    async def route(speech, country, request_id):
+        return {"language": "en", "probability": 0.9, "target": "base", "reason": "no_country_model"}
+
+    async def slow_raw(speech, request_id, profile=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("raw")
+            raise
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="DeepFilterNet failed"):
+            await engine.denoise_and_transcribe(
+                "clip.wav", np.zeros(16000, dtype=np.float32), "Malaysia", "test", {"start_time": 0.0},
+                decode_mode="speculative"
+            )
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(engine, "audio_denoiser", BrokenDenoiser())
+    monkeypatch.setattr(engine, "route_request", route)
+    monkeypatch.setattr(engine, "transcribe_raw_speculatively", slow_raw)
+    asyncio.run(scenario())
+    assert cancelled == ["raw"]
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from gateway import WorkerPool  # noqa: E402
+from router import FAILURES_TO_EJECT  # noqa: E402
+
+SOCKETS = ["/tmp/test-worker-0.sock", "/tmp/test-worker-1.sock"]
+
+
+def test_least_loaded_skips_workers_that_keep_failing():
+    pool = WorkerPool(SOCKETS)
+    pool.in_flight[SOCKETS[1]] = 3
+    for _ in range(FAILURES_TO_EJECT):
+        pool.failed(SOCKETS[0])
+    assert pool.pick() == SOCKETS[1]
+    assert pool.pick(exclude=[SOCKETS[1]]) is None
+
+
+def test_least_loaded_skips_workers_failing_health_checks():
+    pool = WorkerPool(SOCKETS)
+    for _ in range(FAILURES_TO_EJECT):
+        pool.states[SOCKETS[0]].check_failed()
+    assert pool.pick() == SOCKETS[1]
+    pool.states[SOCKETS[0]].checked(True)
+    assert pool.pick() == SOCKETS[0]
@@ -0,0 +1,95 @@
+import numpy as np
+import soundfile as sf
+
+from keyword_spotter import GatingStats, KeywordSpotter, enroll, load_templates, log_mel, subsequence_dtw
+
+SR = 16000
+
+
+def chirp(start_hz, rate_hz_per_s, seconds=1.0, level=0.3):
+    """Linear chirp whose instantaneous frequency is start_hz + 2 * rate_hz_per_s * t"""
+    t = np.arange(int(seconds * SR)) / SR
+    return (level * np.sin(2 * np.pi * (start_hz + rate_hz_per_s * t) * t) * np.hanning(len(t))).astype(np.float32)
+
+
+def noise(samples, seed=0):
+    return (0.01 * np.random.default_rng(seed).standard_normal(samples)).astype(np.float32)
+
+
+KEYWORD = chirp(300, 600)  # rising 300 -> 1500 Hz
+OTHER = chirp(900, -500)  # falling 900 -> 100 Hz
+
+
+def test_dtw_finds_keyword_inside_longer_stream():
+    template = log_mel(KEYWORD)
+    stream = log_mel(np.concatenate([noise(8000), KEYWORD * 0.5 + noise(SR, 1), noise(3000, 2)]))
+    distance, end = subsequence_dtw(template, stream)
+    other_distance, _ = subsequence_dtw(template, log_mel(np.concatenate([noise(8000), OTHER, noise(3000)])))
+    assert distance < 0.3 < other_distance
+    # The match ends near the end of the keyword (0.5 s + 1 s in, 10 ms hops; its Hann tail is quiet)
+    assert abs(end - 150) <= 20
+
+
+def test_dtw_tolerates_faster_speech():
+    template = log_mel(KEYWORD)
+    faster = chirp(300, 600 / 0.7, seconds=0.7)  # same sweep in 70% of the time
+    assert subsequence_dtw(template, log_mel(faster))[0] < 0.3
+
+
+def test_dtw_stream_too_short():
+    template = log_mel(KEYWORD)
+    assert subsequence_dtw(template, template[:10]) == (np.inf, -1)
+
+
+def feed(spotter, audio, chunk=1600):
+    return [(i / SR, r) for i in range(0, len(audio), chunk) if (r := spotter.process(audio[i:i + chunk]))]
+
+
+def test_spotter_detects_keyword_once_in_stream():
+    spotter = KeywordSpotter({"hey driver": [log_mel(KEYWORD)]})
+    stream = np.concatenate([noise(SR), OTHER, noise(8000, 1), KEYWORD * 0.5 + noise(SR, 2), noise(SR, 3)])
+    detections = feed(spotter, stream)
+    assert len(detections) == 1
+    seconds, detection = detections[0]
+    assert detection["keyword"] == "hey driver"
+    assert 3.0 <= seconds <= 3.8
+    assert spotter.detections == 1
+
+
+def test_spotter_skips_silence_and_empty_chunks():
+    spotter = KeywordSpotter({"hey driver": [log_mel(KEYWORD)]})
+    assert spotter.process(np.zeros(0, dtype=np.float32)) is None
+    assert feed(spotter, np.zeros(3 * SR, dtype=np.float32)) == []
+    assert spotter.checks == 0
+
+
+def test_sensitivity_widens_threshold():
+    low = KeywordSpotter({}, sensitivity=0.0)
+    high = KeywordSpotter({}, sensitivity=1.0)
+    assert low.threshold < high.threshold
+
+
+def test_enroll_then_load(tmp_path):
+    recording = tmp_path / "take.wav"
+    sf.write(str(recording), np.concatenate([noise(4000), KEYWORD, noise(4000)]), 44100)
+    enroll("hey driver", [recording], tmp_path / "templates")
+    templates = load_templates(tmp_path / "templates")
+    assert list(templates) == ["hey driver"]
+    assert len(templates["hey driver"]) == 1
+
+
+def test_enroll_numbers_takes_per_keyword(tmp_path):
+    recording = tmp_path / "take.wav"
+    sf.write(str(recording), np.concatenate([noise(4000), KEYWORD, noise(4000)]), SR)
+    template_dir = tmp_path / "templates"
+    enroll("hey grab", [recording, recording], template_dir)
+    (template_dir / "hey_grab_1.wav").unlink()
+    assert [p.name for p in enroll("hey grab", [recording], template_dir)] == ["hey_grab_3.wav"]
+    # A keyword that is a prefix of another starts its own numbering
+    assert [p.name for p in enroll("hey", [recording], template_dir)] == ["hey_1.wav"]
+
+
+def test_gating_stats_fraction():
+    stats = GatingStats()
+    stats.add(100.0, 5.0, 2)
+    assert stats.snapshot()["gated_fraction"] == 0.95
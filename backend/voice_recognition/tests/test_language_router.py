@@ -0,0 +1,46 @@
+from language_router import ROUTING_THRESHOLD, choose_route, loaded_model_configs
+from model_config import COUNTRY_MODELS
+
+
+class FakeHandler:
+    """Same shape as engine.ModelHandler / FasterWhisperHandler: the config lives on .config"""
+
+    def __init__(self, config):
+        self.config = config
+
+
+def handlers(*countries):
+    return {country: FakeHandler(COUNTRY_MODELS[country]) for country in countries}
+
+
+def route(language, probability, country, loaded=tuple(COUNTRY_MODELS)):
+    return choose_route(language, probability, country, loaded_model_configs(handlers(*loaded)))
+
+
+def test_low_confidence_goes_to_base():
+    assert route("ms", ROUTING_THRESHOLD - 0.01, "Malaysia")["reason"] == "low_confidence"
+
+
+def test_client_country_covers_language():
+    result = route("ms", 0.9, "Malaysia")
+    assert (result["target"], result["reason"]) == ("Malaysia", "client_country")
+
+
+def test_no_country_sent_routes_by_detected_language():
+    result = route("th", 0.9, None)
+    assert (result["target"], result["reason"]) == ("Thailand", "detected_language")
+
+
+def test_language_outside_country_model_stays_on_base():
+    # English from a Thai driver must not reach the Thai model, which always decodes Thai
+    assert route("en", 0.9, "Thailand")["target"] == "base"
+    assert route("zh", 0.9, "Malaysia")["target"] == "base"
+
+
+def test_unloaded_country_model_is_never_chosen():
+    assert route("th", 0.95, "Thailand", loaded=("Malaysia",))["target"] == "base"
+
+
+def test_unloaded_handlers_are_skipped():
+    configs = loaded_model_configs({"Malaysia": FakeHandler(COUNTRY_MODELS["Malaysia"]), "Thailand": None})
+    assert list(configs) == ["Malaysia"]
@@ -0,0 +1,91 @@
+import asyncio
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+import response_encoding  # noqa: E402
+from response_encoding import (JSON_MEDIA_TYPE, CompressionMiddleware, choose_encoding, compact_upload_payload,  # noqa: E402
+                               dumps_json, negotiate_media_type, parse_quality_list)
+
+
+def test_quality_list_orders_by_q_then_position_and_drops_q0():
+    header = "application/json;q=0.5, application/cbor, application/msgpack;q=0.9, text/html;q=0"
+    assert parse_quality_list(header) == [
+        ("application/cbor", 1.0), ("application/msgpack", 0.9), ("application/json", 0.5)
+    ]
+    assert parse_quality_list("gzip;q=abc") == []
+
+
+def test_negotiation_falls_back_to_json():
+    assert negotiate_media_type(None) == JSON_MEDIA_TYPE
+    assert negotiate_media_type("text/html") == JSON_MEDIA_TYPE
+
+
+def test_negotiation_honours_q_values(monkeypatch):
+    monkeypatch.setattr(response_encoding, "msgpack", pytest.importorskip("msgpack"))
+    assert negotiate_media_type("application/json, application/msgpack") == JSON_MEDIA_TYPE
+    assert negotiate_media_type("application/json;q=0.5, application/msgpack") == "application/msgpack"
+    assert negotiate_media_type("application/msgpack;q=0, */*") == JSON_MEDIA_TYPE
+
+
+def test_choose_encoding_honours_q_values(monkeypatch):
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip, deflate") == "gzip"
+    monkeypatch.setattr(response_encoding, "brotli", pytest.importorskip("brotli"))
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+
+
+def test_dumps_json_handles_numpy_values():
+    body = dumps_json({"score": np.float32(0.5), "count": np.int64(3), "text": "terima kasih"})
+    assert json.loads(body) == {"score": 0.5, "count": 3, "text": "terima kasih"}
+
+
+def test_compact_view_prefers_the_country_transcript_and_accepted_intent():
+    payload = {
+        "base_model": {"text": "base"},
+        "fine_tuned_model": {"text": "country"},
+        "intent": {"intent": "accept_ride", "accepted": True},
+        "agent_response": {"content": "Ride accepted"},
+    }
+    assert compact_upload_payload(payload) == {"text": "country", "intent": "accept_ride", "agent": "Ride accepted"}
+    assert compact_upload_payload({"base_model": {"text": "base"}, "intent": {"accepted": False}}) == {"text": "base"}
+
+
+def send_through(middleware_app, accept_encoding: str, body_messages):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        for message in body_messages:
+            await send(message)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(middleware_app(app)(scope, None, send))
+    return sent
+
+
+def test_large_responses_are_gzipped():
+    body = b'{"text": "' + b"a" * 2000 + b'"}'
+    start, message = send_through(lambda app: CompressionMiddleware(app, minimum_size=512), "gzip",
+                                  [{"type": "http.response.body", "body": body}])
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(message["body"]) == body
+
+
+def test_small_and_streaming_responses_pass_through():
+    small = send_through(lambda app: CompressionMiddleware(app, minimum_size=512), "gzip",
+                         [{"type": "http.response.body", "body": b"{}"}])
+    assert small[1]["body"] == b"{}"
+    chunks = [{"type": "http.response.body", "body": b"x" * 1000, "more_body": True},
+              {"type": "http.response.body", "body": b"", "more_body": False}]
+    streamed = send_through(lambda app: CompressionMiddleware(app, minimum_size=512), "gzip", chunks)
+    assert streamed[1:] == chunks
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+import result_cache
+from result_cache import AsyncLRUCache
+
+
+def test_miss_then_hit():
+    cache = AsyncLRUCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"text": "accept the ride"}
+
+    async def scenario():
+        first = await cache.get_or_compute("clip", compute)
+        second = await cache.get_or_compute("clip", compute)
+        return first, second
+
+    (value, status), (cached, cached_status) = asyncio.run(scenario())
+    assert (status, cached_status) == ("miss", "hit")
+    assert cached is value and len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = AsyncLRUCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "transcript"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("clip", compute) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert [status for _, status in results] == ["miss", "coalesced", "coalesced"]
+    assert all(value == "transcript" for value, _ in results)
+    assert len(calls) == 1 and cache.stats()["in_flight"] == 0
+
+
+def test_leader_failure_reaches_followers_and_is_not_cached():
+    cache = AsyncLRUCache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model failed")
+
+    async def scenario():
+        results = await asyncio.gather(
+            cache.get_or_compute("clip", failing), cache.get_or_compute("clip", failing),
+            return_exceptions=True
+        )
+        retry = await cache.get_or_compute("clip", lambda: asyncio.sleep(0, result="recovered"))
+        return results, retry
+
+    results, retry = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retry == ("recovered", "miss")
+
+
+def test_cancelled_follower_does_not_cancel_the_leader():
+    cache = AsyncLRUCache()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "transcript"
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute("clip", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute("clip", compute))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(scenario()) == ("transcript", "miss")
+
+
+def test_should_cache_keeps_degraded_results_out():
+    cache = AsyncLRUCache()
+
+    async def scenario():
+        await cache.get_or_compute("clip", lambda: asyncio.sleep(0, result="failed"),
+                                   should_cache=lambda value: value != "failed")
+        return cache.get("clip")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = AsyncLRUCache(max_entries=2, ttl_seconds=10.0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("value", [0, "", []])
+def test_falsy_values_are_cached(value):
+    cache = AsyncLRUCache()
+    cache.set("clip", value)
+    assert cache.get("clip") == value
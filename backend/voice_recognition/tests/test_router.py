@@ -0,0 +1,69 @@
+import router
+from router import FAILURES_TO_EJECT, CountryRouter, placement
+
+NODES = ["node-0", "node-1", "node-2"]
+
+
+def test_placement_balances_and_replicates_every_country():
+    layout = placement(NODES, replicas=2)
+    for country in router.COUNTRY_MODELS:
+        assert sum(country in countries for countries in layout.values()) == 2
+    assert max(len(c) for c in layout.values()) - min(len(c) for c in layout.values()) <= 1
+
+
+def test_country_goes_to_an_owner():
+    country_router = CountryRouter(NODES, replicas=1)
+    node, reason = country_router.choose("Malaysia", {})
+    assert reason == "owner" and "Malaysia" in country_router.layout[node]
+
+
+def test_passing_health_check_does_not_end_a_request_ejection():
+    country_router = CountryRouter(NODES, replicas=1, eject_seconds=60)
+    owner, _ = country_router.choose("Malaysia", {})
+    for _ in range(FAILURES_TO_EJECT):
+        country_router.report_failure(owner)
+    country_router.report_health(owner, True)
+    assert not country_router.states[owner].healthy
+    node, reason = country_router.choose("Malaysia", {})
+    assert node != owner and reason == "spillover"
+
+
+def test_ejection_ends_after_the_cool_down():
+    country_router = CountryRouter(NODES, replicas=1, eject_seconds=0)
+    owner, _ = country_router.choose("Malaysia", {})
+    for _ in range(FAILURES_TO_EJECT):
+        country_router.report_failure(owner)
+    assert country_router.states[owner].healthy
+
+
+def test_a_success_resets_the_request_failure_streak():
+    country_router = CountryRouter(NODES, replicas=1, eject_seconds=60)
+    for _ in range(FAILURES_TO_EJECT - 1):
+        country_router.report_failure("node-0")
+    country_router.report_success("node-0")
+    country_router.report_failure("node-0")
+    assert country_router.states["node-0"].healthy
+
+
+def test_failed_checks_eject_until_a_passing_check():
+    country_router = CountryRouter(NODES, replicas=1)
+    for _ in range(FAILURES_TO_EJECT):
+        country_router.report_check_failure("node-1")
+    assert not country_router.states["node-1"].healthy
+    country_router.report_health("node-1", True)
+    assert country_router.states["node-1"].healthy
+
+
+def test_no_healthy_replica_returns_none():
+    country_router = CountryRouter(NODES, replicas=1)
+    for node in NODES:
+        country_router.report_health(node, False)
+    assert country_router.choose("Malaysia", {}) is None
+
+
+def test_choose_skips_excluded_replicas():
+    country_router = CountryRouter(NODES, replicas=1)
+    owner, _ = country_router.choose("Malaysia", {})
+    node, reason = country_router.choose("Malaysia", {}, exclude=[owner])
+    assert node != owner and reason == "spillover"
+    assert country_router.choose("Malaysia", {}, exclude=NODES) is None
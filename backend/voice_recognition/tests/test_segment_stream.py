@@ -0,0 +1,29 @@
+from command_intents import command_keywords
+from segment_stream import match_keyword, transcript_confidence
+
+COMMAND_KEYWORDS = command_keywords(None)
+
+
+def test_match_keyword_whole_words():
+    assert match_keyword("OK, accept the ride.", COMMAND_KEYWORDS) == "accept the ride"
+    assert match_keyword("I'll reaccept ride later", ("accept ride",)) is None
+
+
+def test_match_keyword_ignores_negated_phrase():
+    assert match_keyword("Don't accept the ride", COMMAND_KEYWORDS) is None
+    assert match_keyword("don't accept the ride, actually okay, accept the ride", COMMAND_KEYWORDS) == "accept the ride"
+    assert match_keyword("Do not accept the ride", COMMAND_KEYWORDS) is None
+
+
+def test_match_keyword_only_negates_the_word_before_the_command():
+    assert match_keyword("No problem, accept the ride", COMMAND_KEYWORDS) == "accept the ride"
+    assert match_keyword("Never mind, call the passenger", COMMAND_KEYWORDS) == "call the passenger"
+
+
+def test_transcript_confidence_is_duration_weighted():
+    segments = [
+        {"start": 0.0, "end": 1.0, "avg_logprob": 0.0, "no_speech_prob": 0.0},
+        {"start": 1.0, "end": 4.0, "avg_logprob": -100.0, "no_speech_prob": 0.0},
+    ]
+    assert abs(transcript_confidence(segments) - 0.25) < 1e-6
+    assert transcript_confidence([]) == 0.0
@@ -0,0 +1,58 @@
+import numpy as np
+
+from vad import dilate_mask, frame_energy_db, trim_silence
+
+SAMPLE_RATE = 16000
+FRAME = 480  # 30 ms
+
+
+def tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_dilate_keeps_length_and_position_for_masks_shorter_than_the_kernel():
+    mask = np.array([0] * 8 + [1] * 6, dtype=bool)
+    dilated = dilate_mask(mask, 7)
+    assert len(dilated) == len(mask)
+    assert dilated[1:].all() and not dilated[0]
+
+
+def test_dilate_extends_each_side():
+    mask = np.zeros(30, dtype=bool)
+    mask[15] = True
+    dilated = dilate_mask(mask, 3)
+    assert np.flatnonzero(dilated).tolist() == list(range(12, 19))
+
+
+def test_short_single_word_clip_keeps_the_word():
+    audio = np.concatenate([silence(0.24), tone(0.18)])  # 14 frames, under the padding kernel
+    trimmed, stats = trim_silence(audio, SAMPLE_RATE)
+    assert stats["has_speech"]
+    assert len(trimmed) <= len(audio)
+    # Every voiced sample survives
+    assert np.abs(trimmed).max() == np.abs(audio).max()
+    assert np.count_nonzero(trimmed) >= np.count_nonzero(audio)
+
+
+def test_long_pause_collapses_to_twice_the_padding():
+    audio = np.concatenate([tone(0.5), silence(2.0), tone(0.5)])
+    trimmed, stats = trim_silence(audio, SAMPLE_RATE, padding_ms=200)
+    assert stats["has_speech"]
+    assert 1.3 <= stats["kept_duration"] <= 1.6
+
+
+def test_all_silence_and_empty_input_have_no_speech():
+    for audio in (silence(1.0), np.zeros(0, dtype=np.float32)):
+        trimmed, stats = trim_silence(audio, SAMPLE_RATE)
+        assert len(trimmed) == 0 and not stats["has_speech"]
+        assert stats["kept_duration"] == 0.0
+
+
+def test_frame_energy_pads_the_last_frame():
+    levels = frame_energy_db(tone(0.05), FRAME)
+    assert len(levels) == 2
@@ -0,0 +1,85 @@
+# Energy-based voice activity detection run right after decode
+# Push-to-talk clips are mostly leading/trailing silence; trimming it here means
+# DeepFilterNet and every Whisper model only see the speech.
+import numpy as np
+
+
+def frame_energy_db(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """Per-frame RMS level in dBFS over non-overlapping frames (last partial frame zero-padded)"""
+    num_frames = max(1, -(-len(audio) // frame_length))
+    padded = np.zeros(num_frames * frame_length, dtype=np.float32)
+    padded[:len(audio)] = audio
+    frames = padded.reshape(num_frames, frame_length)
+    power = np.einsum("ij,ij->i", frames, frames) / frame_length
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def detect_speech(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    frame_ms: int = 30,
+    margin_db: float = 12.0,
+    min_level_db: float = -50.0,
+    max_level_db: float = -30.0
+) -> np.ndarray:
+    """Return a boolean speech mask per frame.
+
+    The threshold adapts to the clip: frames must be margin_db above the
+    estimated noise floor (10th percentile frame level), clamped to
+    [min_level_db, max_level_db]. The upper clamp means a clip with no pauses
+    at all (one loud word, or constant road noise) is kept rather than rejected.
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    levels = frame_energy_db(audio, frame_length)
+    noise_floor = np.percentile(levels, 10)
+    threshold = min(max(noise_floor + margin_db, min_level_db), max_level_db)
+    return levels > threshold
+
+
+def dilate_mask(mask: np.ndarray, frames: int) -> np.ndarray:
+    """Extend every speech frame by `frames` on both sides"""
+    if frames <= 0 or not mask.any():
+        return mask
+    kernel = np.ones(2 * frames + 1, dtype=np.int32)
+    # "same" would return len(kernel) samples for masks shorter than the kernel; slice "full" instead
+    return np.convolve(mask.astype(np.int32), kernel, mode="full")[frames:frames + len(mask)] > 0
+
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    frame_ms: int = 30,
+    margin_db: float = 12.0,
+    min_level_db: float = -50.0,
+    padding_ms: int = 200,
+    min_speech_ms: int = 150
+):
+    """Drop non-speech frames and report how much audio was kept.
+
+    The speech mask is dilated by padding_ms so word onsets and trailing
+    consonants are not clipped. Silences longer than twice padding_ms collapse
+    to that length, which keeps word boundaries intact for ASR while removing
+    dead air. Returns (trimmed_audio, stats); trimmed_audio is empty when no
+    speech was found.
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    raw_speech = detect_speech(audio, sample_rate, frame_ms, margin_db, min_level_db)
+    speech = dilate_mask(raw_speech, int(np.ceil(padding_ms / frame_ms)))
+
+    original_duration = len(audio) / sample_rate
+    voiced_duration = raw_speech.sum() * frame_ms / 1000
+    if voiced_duration * 1000 < min_speech_ms:
+        trimmed = audio[:0]
+    else:
+        sample_mask = np.repeat(speech, frame_length)[:len(audio)]
+        trimmed = audio[sample_mask]
+
+    kept_duration = len(trimmed) / sample_rate
+    stats = {
+        "original_duration": round(original_duration, 3),
+        "kept_duration": round(kept_duration, 3),
+        "voiced_duration": round(float(voiced_duration), 3),
+        "speech_ratio": round(kept_duration / original_duration, 4) if original_duration else 0.0,
+        "has_speech": len(trimmed) > 0
+    }
+    return trimmed, stats
@@ -0,0 +1,78 @@
+# Startup warm-up: push synthetic clips through every model before taking traffic
+# The first real request otherwise pays for CUDA/oneDNN kernel selection,
+# allocator growth, tokenizer caches and DeepFilterNet's first run.
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, Iterable
+
+import soundfile as sf
+import torch
+
+from audio_io import synthetic_clip
+
+WARMUP_DURATIONS = tuple(float(s) for s in os.getenv("WARMUP_DURATIONS", "1,5,15").split(","))
+
+
+def compile_whisper_encoder(model, mode: str = "default"):
+    """torch.compile the encoder of a WhisperForConditionalGeneration in place.
+
+    The processor always pads log-mel features to 30 s (3000 frames), so the
+    encoder sees one static shape and compiles once with dynamic=False. The
+    decoder's input grows token by token and stays eager. Returns True when
+    the encoder was compiled.
+    """
+    if not hasattr(torch, "compile"):
+        print("torch.compile is not available in this torch version, skipping")
+        return False
+    try:
+        whisper = model.model
+        whisper.encoder = torch.compile(whisper.encoder, mode=mode, dynamic=False)
+        print(f"Compiled Whisper encoder (mode={mode}, static 30 s input)")
+        return True
+    except Exception as e:
+        print(f"Could not compile Whisper encoder: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+async def run_warmup(
+    targets: Dict[str, Callable[[str], Awaitable]],
+    durations: Iterable[float] = WARMUP_DURATIONS,
+    sample_rate: int = 16000
+) -> dict:
+    """Run every target coroutine on a synthetic clip of each duration.
+
+    targets maps a name to an async callable taking a WAV path. A failing
+    target is reported but does not stop the others: a replica with a broken
+    country model can still serve the base model. Returns per-target timings
+    in seconds, keyed by clip duration.
+    """
+    report = {"durations": list(durations), "targets": {}, "errors": {}}
+    started = time.time()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = {}
+        for i, seconds in enumerate(durations):
+            path = os.path.join(temp_dir, f"warmup_{seconds:g}s.wav")
+            sf.write(path, synthetic_clip(seconds, sample_rate, seed=i), sample_rate, subtype='PCM_16')
+            paths[seconds] = path
+
+        for name, target in targets.items():
+            timings = {}
+            for seconds, path in paths.items():
+                clip_start = time.time()
+                try:
+                    await target(path)
+                except Exception as e:
+                    print(f"Warm-up of {name} failed on {seconds:g}s clip: {str(e)}")
+                    report["errors"][name] = str(e)
+                    break
+                timings[f"{seconds:g}s"] = round(time.time() - clip_start, 3)
+            report["targets"][name] = timings
+            print(f"Warm-up {name}: {timings}")
+
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    report["total_seconds"] = round(time.time() - started, 3)
+    return report